@@ -0,0 +1,48 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.user_routers import get_current_active_admin
+from app.models.models import User
+from app.utils.profiler import profile_threads
+from app.utils.timing import TimedRoute
+
+admin_router = APIRouter(prefix="/api/v1/admin", tags=["admin"], route_class=TimedRoute)
+
+# One profile per worker at a time; a second sampler would only skew the first
+_profile_lock = asyncio.Lock()
+
+
+@admin_router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+        seconds: float = Query(10, ge=1, le=120),
+        interval_ms: float = Query(10, ge=1, le=1000),
+        include_idle: bool = False,
+        current_user: User = Depends(get_current_active_admin)
+):
+    """
+    Sample the stacks of this worker for the given number of seconds and return
+    them as collapsed stacks ("frame;frame;frame count" per line).
+    """
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running on this worker")
+
+    try:
+        async with _profile_lock:
+            loop = asyncio.get_running_loop()
+            # The sampler runs in a thread so the event loop keeps serving (and is profiled)
+            collapsed, profiler = await loop.run_in_executor(
+                None, profile_threads, seconds, interval_ms / 1000, include_idle
+            )
+        return PlainTextResponse(
+            collapsed,
+            headers={
+                "X-Profile-Samples": str(profiler.samples),
+                "X-Profile-Overhead": f"{profiler.overhead:.4f}"
+            }
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,16 +1,27 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, Header
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+import os
 from sqlalchemy import select, func, case
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from app.core.config import get_db
 from app.api.user_routers import get_current_user, create_access_token
 from app.crud.invoice_crud import fetch_invoice, fetch_invoices_with_filters, insert_invoice, check_user_shop_access, \
-    update_invoice_db, delete_invoice_db
-from app.models.models import User, Invoice
-from app.schemas.schemas import InvoiceCreate, InvoiceResponse, InvoiceFilter, InvoiceUpdate
+    update_invoice_db, delete_invoice_db, peek_next_invoice_number, fetch_invoice_version, \
+    fetch_statement_chunk
+from app.crud.product_crud import fetch_product_stats
+from app.core.config import settings
+from app.models.models import User, Invoice, Shop
+from app.schemas.schemas import InvoiceCreate, InvoiceResponse, InvoiceFilter, InvoiceUpdate, \
+    InvoiceNumberPreview, ItemSuggestion, ProductStats
+from app.utils.autocomplete import autocomplete_registry
+from app.utils.pdf_renderer import get_pdf_cache, render_invoice_cached, invoice_to_render_data
+from app.utils.statement_pdf import render_statement
+from app.utils.timing import TimedRoute
 
-router = APIRouter(prefix="/api/v1")
+router = APIRouter(prefix="/api/v1", route_class=TimedRoute)
 
 
 @router.get("/invoices/last", response_model=InvoiceResponse)
@@ -32,6 +43,60 @@ async def get_last_invoice(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/invoices/numbers/next", response_model=InvoiceNumberPreview)
+async def preview_next_invoice_number(
+        shop_id: Optional[int] = None,
+        current_user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_db)
+):
+    """
+    Number shown on a new, unsaved invoice. Nothing is reserved: the number is
+    allocated by insert_invoice on save, so abandoned invoices leave no gaps.
+    """
+    if not shop_id and current_user.current_shop_id:
+        shop_id = current_user.current_shop_id
+    if not shop_id:
+        raise HTTPException(status_code=400, detail="Shop is not specified")
+
+    try:
+        has_access = await check_user_shop_access(session, current_user.id, shop_id)
+        if not has_access:
+            raise HTTPException(status_code=403, detail="No access to this shop")
+
+        return {"shop_id": shop_id, "number": await peek_next_invoice_number(session, shop_id)}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/items/autocomplete", response_model=List[ItemSuggestion])
+async def autocomplete_item_names(
+        prefix: str = Query(..., min_length=1, max_length=100),
+        shop_id: Optional[int] = None,
+        limit: int = Query(default=10, ge=1, le=50),
+        current_user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_db)
+):
+    """Previously used item names starting with prefix, most frequent first, with the last price"""
+    if not shop_id and current_user.current_shop_id:
+        shop_id = current_user.current_shop_id
+    if not shop_id:
+        raise HTTPException(status_code=400, detail="Shop is not specified")
+
+    try:
+        has_access = await check_user_shop_access(session, current_user.id, shop_id)
+        if not has_access:
+            raise HTTPException(status_code=403, detail="No access to this shop")
+
+        index = await autocomplete_registry.get(session, shop_id)
+        return index.suggest(prefix, limit)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/invoices/stats/summary")
 async def get_invoice_stats(
         shop_id: Optional[int] = None,
@@ -84,9 +149,97 @@ async def get_invoice_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/invoices/stats/products", response_model=List[ProductStats])
+async def get_product_stats(
+        shop_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = Query(default=20, ge=1, le=100),
+        current_user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_db)
+):
+    """Top products by revenue for a shop"""
+    if not shop_id and current_user.current_shop_id:
+        shop_id = current_user.current_shop_id
+    if not shop_id:
+        raise HTTPException(status_code=400, detail="Shop is not specified")
+
+    try:
+        has_access = await check_user_shop_access(session, current_user.id, shop_id)
+        if not has_access:
+            raise HTTPException(status_code=403, detail="No access to this shop")
+
+        return await fetch_product_stats(session, shop_id, start_date, end_date, limit)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/invoices/statement")
+async def get_invoice_statement(
+        start_date: datetime,
+        end_date: datetime,
+        shop_id: Optional[int] = None,
+        contact: Optional[str] = None,
+        current_user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_db)
+):
+    """Statement PDF with every invoice of a shop in a date range"""
+    if not shop_id and current_user.current_shop_id:
+        shop_id = current_user.current_shop_id
+    if not shop_id:
+        raise HTTPException(status_code=400, detail="Shop is not specified")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+
+    try:
+        has_access = await check_user_shop_access(session, current_user.id, shop_id)
+        if not has_access:
+            raise HTTPException(status_code=403, detail="No access to this shop")
+
+        shop = await session.get(Shop, shop_id)
+        if not shop:
+            raise HTTPException(status_code=404, detail="Shop not found")
+        shop_name = shop.name
+
+        async def fetch_chunk(cursor):
+            invoices = await fetch_statement_chunk(
+                session, shop_id, start_date, end_date, contact,
+                after=cursor, limit=settings.STATEMENT_CHUNK_SIZE
+            )
+            if not invoices:
+                return [], cursor
+            next_cursor = (invoices[-1].created_at, invoices[-1].id)
+            chunk = [invoice_to_render_data(invoice) for invoice in invoices]
+            # Drop rendered rows from the identity map to keep memory flat
+            session.expunge_all()
+            return chunk, next_cursor
+
+        subtitle = [
+            f"Магазин: {shop_name}",
+            f"Период: {start_date:%Y-%m-%d} — {end_date:%Y-%m-%d}",
+        ]
+        if contact:
+            subtitle.append(f"Контакт: {contact}")
+
+        path = await render_statement(fetch_chunk, "ВЫПИСКА ПО НАКЛАДНЫМ", subtitle)
+        return FileResponse(
+            path,
+            media_type="application/pdf",
+            filename=f"statement_{shop_id}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.pdf",
+            background=BackgroundTask(os.remove, path)
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post('/invoices/', response_model=InvoiceResponse, status_code=201)
 async def create_invoice(
         invoice_data: InvoiceCreate,
+        idempotency_key: Optional[str] = Header(None, max_length=64),
         current_user: User = Depends(get_current_user),
         session: AsyncSession = Depends(get_db)
 ):
@@ -97,7 +250,8 @@ async def create_invoice(
         invoice = await insert_invoice(
             session=session,
             invoice_data=invoice_data,
-            current_user=current_user
+            current_user=current_user,
+            idempotency_key=idempotency_key
         )
 
         if invoice.shop_id == current_user.current_shop_id:
@@ -109,6 +263,7 @@ async def create_invoice(
             new_token = create_access_token(current_user, user_shop_data)
             invoice.new_token = new_token
 
+        autocomplete_registry.record_items(invoice.shop_id, invoice.items)
         return invoice
 
     except HTTPException as e:
@@ -130,6 +285,9 @@ async def list_invoices(
         created_before: Optional[datetime] = None,
         min_amount: Optional[float] = None,
         max_amount: Optional[float] = None,
+        number_contains: Optional[str] = Query(default=None, max_length=20),
+        contact: Optional[str] = Query(default=None, max_length=100),
+        include_archived: bool = False,
         skip: int = Query(default=0, ge=0),
         limit: int = Query(default=100, le=100),
         current_user: User = Depends(get_current_user),
@@ -144,7 +302,10 @@ async def list_invoices(
         created_after=created_after,
         created_before=created_before,
         min_amount=min_amount,
-        max_amount=max_amount
+        max_amount=max_amount,
+        number_contains=number_contains,
+        contact=contact,
+        include_archived=include_archived
     )
     try:
         invoices = await fetch_invoices_with_filters(
@@ -176,6 +337,39 @@ async def get_invoice(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/invoices/{invoice_id}/pdf")
+async def get_invoice_pdf(
+        invoice_id: int,
+        request: Request,
+        current_user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_db)
+):
+    """Invoice rendered to PDF on the server, cached on disk per invoice version"""
+    try:
+        version = await fetch_invoice_version(session, invoice_id, current_user)
+        etag = f'"invoice-{invoice_id}-v{version}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        path = get_pdf_cache().get(invoice_id, version)
+        if not path:
+            invoice = await fetch_invoice(session, invoice_id, current_user)
+            path = await render_invoice_cached(invoice)
+
+        return FileResponse(
+            path,
+            media_type="application/pdf",
+            filename=f"invoice_{invoice_id}.pdf",
+            headers=headers
+        )
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.patch("/invoices/{invoice_id}", response_model=InvoiceResponse)
 async def update_invoice(
         invoice_id: int,
@@ -190,6 +384,8 @@ async def update_invoice(
             invoice_data,
             current_user
         )
+        if invoice_data.items:
+            autocomplete_registry.record_items(invoice.shop_id, invoice.items)
         return invoice
     except HTTPException as e:
         raise e
@@ -8,10 +8,11 @@ from app.models.models import User
 from app.crud.user_crud import get_user_shop_data, ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, verify_password, \
     get_current_user, get_password_hash
 from app.schemas.schemas import UserResponse, UserCreate, Token
+from app.utils.timing import TimedRoute
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 
-auth_router = APIRouter(prefix="/api/v1/auth", tags=["auth"])
+auth_router = APIRouter(prefix="/api/v1/auth", tags=["auth"], route_class=TimedRoute)
 
 
 @auth_router.post("/token", response_model=Token)
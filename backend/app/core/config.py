@@ -1,21 +1,76 @@
 # config.py
-from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from typing import AsyncGenerator, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncEngine
+from sqlalchemy.engine import make_url
 from pydantic_settings import BaseSettings
-from sqlalchemy import text
+from sqlalchemy import text, event
 import asyncio
+import logging
+import os
+
+from app.models.models import Base
 
 
 class Settings(BaseSettings):
-    DB_USER: str
-    DB_PASSWORD: str
-    DB_HOST: str
-    DB_NAME: str
-    DB_PORT: int
+    # "mysql" builds the URL from the DB_* fields, "sqlite" uses SQLITE_PATH.
+    # DB_URL, when set, is used as-is and wins over both profiles.
+    DB_PROFILE: str = "mysql"
+    DB_URL: Optional[str] = None
+    DB_USER: str = ""
+    DB_PASSWORD: str = ""
+    DB_HOST: str = "localhost"
+    DB_NAME: str = ""
+    DB_PORT: int = 3306
+    SQLITE_PATH: str = "invoices.db"
+    # Logs SQL through the sqlalchemy.engine logger, see logging_setup
+    DB_ECHO: bool = False
+
+    # Logging: records are queued and written by a background thread
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_FILE: Optional[str] = "logs/backend.log"
+    LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
+    LOG_QUEUE_SIZE: int = 10000
+
+    # Invoices older than this move to the *_archive tables
+    ARCHIVE_AFTER_DAYS: int = 365
+    ARCHIVE_BATCH_SIZE: int = 1000
+    # Idempotency keys of create requests are kept this long; a client replays
+    # an offline write well within it
+    IDEMPOTENCY_KEY_RETENTION_DAYS: int = 30
+
+    # Server-side PDF rendering
+    PDF_CACHE_DIR: str = "pdf_cache"
+    PDF_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    PDF_RENDER_WORKERS: int = 2
+    STATEMENT_CHUNK_SIZE: int = 200
+
+    PDF_FONT_PATH: str = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "..", "..", "..", "front", "fonts", "DejaVuSans.ttf")
+    )
+
+    # Item name autocomplete
+    AUTOCOMPLETE_MAX_SHOPS: int = 200
+    AUTOCOMPLETE_TTL_SECONDS: int = 900
+
+    # Readiness probe: the worker is reported unready above these limits
+    HEALTH_CACHE_SECONDS: float = 2.0
+    HEALTH_DB_TIMEOUT_SECONDS: float = 2.0
+    HEALTH_MAX_DB_LATENCY_MS: float = 500.0
+    HEALTH_MAX_LOOP_LAG_MS: float = 250.0
+
+    # Server-Timing traces: a sample of requests plus every slow one
+    TIMING_SAMPLE_RATE: float = 0.01
+    TIMING_SLOW_MS: float = 1000.0
+    TIMING_TRACE_FILE: str = "timing_traces.jsonl"
 
     @property
     def DATABASE_URL(self) -> str:
+        if self.DB_URL:
+            return self.DB_URL
+        if self.DB_PROFILE == "sqlite":
+            return f"sqlite+aiosqlite:///{self.SQLITE_PATH}"
         return f"mysql+aiomysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
     class Config:
@@ -23,13 +78,56 @@ class Settings(BaseSettings):
 
 
 settings = Settings()
-
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    pool_pre_ping=True,
-    pool_recycle=3600
-)
+logger = logging.getLogger(__name__)
+
+
+def engine_options(
+        database_url: str,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Dialect-specific keyword arguments for create_async_engine.
+
+    Pool sizing only applies to pooled dialects; SQLite runs without a pool
+    that accepts it, so pool_size and max_overflow are left out there.
+    """
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return {"connect_args": {"timeout": 30}}
+    options: Dict[str, Any] = {"pool_pre_ping": True, "pool_recycle": 3600}
+    if pool_size is not None:
+        options["pool_size"] = pool_size
+    if max_overflow is not None:
+        options["max_overflow"] = max_overflow
+    return options
+
+
+def _enable_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # ondelete="CASCADE" is only enforced with foreign keys switched on
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def build_engine(
+        database_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        **kwargs: Any
+) -> AsyncEngine:
+    """Create an async engine for any supported dialect"""
+    url = database_url or settings.DATABASE_URL
+    options = engine_options(url, pool_size=pool_size, max_overflow=max_overflow)
+    options.update(kwargs)
+    new_engine = create_async_engine(url, **options)
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _enable_sqlite_pragmas)
+    return new_engine
+
+
+engine = build_engine()
 
 async_session_factory = async_sessionmaker(
     engine,
@@ -40,11 +138,6 @@ async_session_factory = async_sessionmaker(
 )
 
 
-
-class Base(DeclarativeBase):
-    pass
-
-
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_factory() as session:
         try:
@@ -57,11 +150,11 @@ async def init_db() -> None:
     try:
         async with engine.begin() as conn:
             await conn.execute(text("SELECT 1"))
-            print("Database connection successful")
+            logger.info("Database connection successful")
             await conn.run_sync(Base.metadata.create_all)
-            print("Database tables initialized")
+            logger.info("Database tables initialized")
     except Exception as e:
-        print(f"Error initializing database: {str(e)}")
+        logger.exception("Error initializing database: %s", e)
         raise
 
 
@@ -70,4 +163,4 @@ async def cleanup_db() -> None:
         await engine.dispose()
         await asyncio.sleep(1)
     except Exception as e:
-        print(f"Error during cleanup: {str(e)}")
\ No newline at end of file
+        logger.exception("Error during cleanup: %s", e)
\ No newline at end of file
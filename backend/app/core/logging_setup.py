@@ -0,0 +1,144 @@
+"""
+Queued logging for the API workers.
+
+Loggers only put records on a bounded in-memory queue; a QueueListener thread
+formats them and writes them to stderr and a size-rotated file. Records below
+the configured level are rejected by the logger itself before anything is
+formatted, and a full queue drops records instead of blocking the event loop.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import traceback
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listeners: List[logging.handlers.QueueListener] = []
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the standard fields plus any extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread. Only the message is rendered here
+    (args may change after the call returns); formatting happens in the writer.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _build_formatter(fmt: str) -> logging.Formatter:
+    if fmt == "json":
+        return JSONFormatter()
+    return logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+def start_queued_handler(handlers: List[logging.Handler], queue_size: int) -> DroppingQueueHandler:
+    """Queue handler whose records are written by the given handlers on a background thread"""
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return DroppingQueueHandler(log_queue)
+
+
+def rotating_file_handler(path: str, formatter: logging.Formatter) -> logging.Handler:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=settings.LOG_MAX_BYTES, backupCount=settings.LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    handler.setFormatter(formatter)
+    return handler
+
+
+def queued_file_logger(name: str, path: str) -> logging.Logger:
+    """Logger writing bare messages to its own rotated file, e.g. JSON-lines traces"""
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(start_queued_handler(
+        [rotating_file_handler(path, logging.Formatter("%(message)s"))], settings.LOG_QUEUE_SIZE
+    ))
+    return logger
+
+
+def setup_logging(
+        level: Optional[str] = None,
+        levels: Optional[Dict[str, str]] = None,
+        log_file: Optional[str] = None,
+        console: bool = True
+) -> None:
+    """Route the root logger through the queue; call once per process before serving"""
+    level = (level or settings.LOG_LEVEL).upper()
+    log_file = log_file or settings.LOG_FILE
+    formatter = _build_formatter(settings.LOG_FORMAT)
+
+    handlers: List[logging.Handler] = []
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+    if log_file:
+        handlers.append(rotating_file_handler(log_file, formatter))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(start_queued_handler(handlers, settings.LOG_QUEUE_SIZE))
+    root.setLevel(level)
+    atexit.register(shutdown_logging)
+
+    # SQL statements are logged through the pipeline instead of engine echo
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if settings.DB_ECHO else logging.WARNING)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level.upper())
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer threads"""
+    while _listeners:
+        _listeners.pop().stop()
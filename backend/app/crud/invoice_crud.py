@@ -1,17 +1,81 @@
-from typing import List
+from datetime import datetime
+from typing import List, Union, Optional, Tuple
 from fastapi import HTTPException
-from sqlalchemy import select, and_, delete
+from sqlalchemy import select, and_, or_, delete, literal, update, insert, func, cast, String
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, selectinload
 
-from app.models.models import users_shops, User, Invoice, InvoiceItem, Shop
+from app.models.models import users_shops, User, Invoice, InvoiceItem, Shop, ArchivedInvoice, \
+    InvoiceSequence, InvoiceIdempotencyKey
+from app.crud.product_crud import resolve_product_ids, normalize_product_name
 from app.schemas.schemas import InvoiceCreate, InvoiceUpdate, InvoiceFilter
+from app.utils.timing import timed
+
+
+async def _find_idempotent_invoice(session: AsyncSession, user_id: int, idempotency_key: str) -> Optional[int]:
+    query = select(InvoiceIdempotencyKey.invoice_id).where(
+        InvoiceIdempotencyKey.user_id == user_id,
+        InvoiceIdempotencyKey.key == idempotency_key
+    )
+    result = await session.execute(query)
+    return result.scalar_one_or_none()
+
+
+async def _load_created_invoice(session: AsyncSession, invoice_id: int) -> Invoice:
+    query = select(Invoice).options(
+        selectinload(Invoice.shop),
+        selectinload(Invoice.items)
+    ).where(
+        Invoice.id == invoice_id
+    )
+
+    result = await session.execute(query)
+    return result.unique().scalar_one()
 
 
 async def insert_invoice(
         session: AsyncSession,
         invoice_data: InvoiceCreate,
-        current_user: User
+        current_user: User,
+        idempotency_key: Optional[str] = None
+) -> Invoice:
+    """
+    Create an invoice with its items.
+
+    With an idempotency key, a request replayed by an offline client returns the
+    invoice created by the first attempt instead of creating a duplicate.
+    """
+    # Read up front: a rollback below expires current_user, which cannot lazy-load in async code
+    user_id = current_user.id
+    if idempotency_key:
+        existing_id = await _find_idempotent_invoice(session, user_id, idempotency_key)
+        if existing_id is not None:
+            return await _load_created_invoice(session, existing_id)
+
+    try:
+        new_invoice = await _insert_invoice_rows(session, invoice_data, current_user, idempotency_key)
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+        # The same key was committed concurrently by another attempt. Under MySQL's
+        # REPEATABLE READ this transaction keeps reading the snapshot of its first
+        # query, so the key is looked up again in a new one.
+        await session.rollback()
+        existing_id = await _find_idempotent_invoice(session, user_id, idempotency_key)
+        if existing_id is None:
+            raise
+        return await _load_created_invoice(session, existing_id)
+
+    await session.commit()
+    return await _load_created_invoice(session, new_invoice.id)
+
+
+async def _insert_invoice_rows(
+        session: AsyncSession,
+        invoice_data: InvoiceCreate,
+        current_user: User,
+        idempotency_key: Optional[str]
 ) -> Invoice:
     async with session.begin_nested():
 
@@ -30,8 +94,11 @@ async def insert_invoice(
         if not shop:
             raise HTTPException(status_code=404, detail="Shop not found")
 
+        number = await reserve_invoice_numbers(session, invoice_data.shop_id)
+
         new_invoice = Invoice(
             shop_id=invoice_data.shop_id,
+            number=number,
             user_id=current_user.id,
             contact_info=invoice_data.contact_info,
             additional_info=invoice_data.additional_info,
@@ -43,9 +110,13 @@ async def insert_invoice(
         await session.flush()
 
         if hasattr(invoice_data, 'items'):
+            product_ids = await resolve_product_ids(
+                session, invoice_data.shop_id, (item_data.name for item_data in invoice_data.items)
+            )
             for item_data in invoice_data.items:
                 item = InvoiceItem(
                     invoice_id=new_invoice.id,
+                    product_id=product_ids.get(normalize_product_name(item_data.name)),
                     name=item_data.name,
                     quantity=item_data.quantity,
                     price=item_data.price,
@@ -53,19 +124,68 @@ async def insert_invoice(
                 )
                 session.add(item)
 
-    await session.commit()
+        if idempotency_key:
+            session.add(InvoiceIdempotencyKey(
+                user_id=current_user.id,
+                key=idempotency_key,
+                invoice_id=new_invoice.id
+            ))
+            await session.flush()
 
-    query = select(Invoice).options(
-        selectinload(Invoice.shop),
-        selectinload(Invoice.items)
-    ).where(
-        Invoice.id == new_invoice.id
-    )
+    return new_invoice
 
-    result = await session.execute(query)
-    invoice = result.unique().scalar_one()
 
-    return invoice
+async def _highest_invoice_number(session: AsyncSession, shop_id: int) -> int:
+    """
+    Highest number used by a shop's hot or archived invoices, where the sequence
+    row does not exist yet. An invoice without a number is shown with its id,
+    so the id counts as its number.
+    """
+    highest = 0
+    for model in (Invoice, ArchivedInvoice):
+        query = select(func.max(func.coalesce(model.number, model.id))).where(model.shop_id == shop_id)
+        highest = max(highest, (await session.execute(query)).scalar() or 0)
+    return highest
+
+
+async def reserve_invoice_numbers(
+        session: AsyncSession,
+        shop_id: int,
+        count: int = 1
+) -> int:
+    """
+    Reserve `count` consecutive invoice numbers for a shop and return the last one.
+
+    Runs in the caller's transaction: the UPDATE locks the sequence row until
+    commit, so concurrent clerks are serialised and a rollback leaves no gap.
+    """
+    bump = update(InvoiceSequence).where(
+        InvoiceSequence.shop_id == shop_id
+    ).values(last_number=InvoiceSequence.last_number + count)
+
+    result = await session.execute(bump)
+    if result.rowcount == 0:
+        current = await _highest_invoice_number(session, shop_id)
+        try:
+            async with session.begin_nested():
+                await session.execute(
+                    insert(InvoiceSequence).values(shop_id=shop_id, last_number=current + count)
+                )
+        except IntegrityError:
+            # Another request created the sequence row first
+            await session.execute(bump)
+
+    last_query = select(InvoiceSequence.last_number).where(InvoiceSequence.shop_id == shop_id)
+    return (await session.execute(last_query)).scalar_one()
+
+
+async def peek_next_invoice_number(session: AsyncSession, shop_id: int) -> int:
+    """The number the next invoice of a shop would get, without reserving it"""
+    last_query = select(InvoiceSequence.last_number).where(InvoiceSequence.shop_id == shop_id)
+    last_number = (await session.execute(last_query)).scalar_one_or_none()
+    if last_number is None:
+        last_number = await _highest_invoice_number(session, shop_id)
+    return last_number + 1
 
 
 async def check_user_shop_access(
@@ -73,14 +193,15 @@ async def check_user_shop_access(
         user_id: int,
         shop_id: int
 ) -> bool:
-    query = select(users_shops).where(
-        and_(
-            users_shops.c.user_id == user_id,
-            users_shops.c.shop_id == shop_id
+    with timed("acl"):
+        query = select(users_shops).where(
+            and_(
+                users_shops.c.user_id == user_id,
+                users_shops.c.shop_id == shop_id
+            )
         )
-    )
-    result = await session.execute(query)
-    return result.first() is not None
+        result = await session.execute(query)
+        return result.first() is not None
 
 
 async def update_invoice_db(
@@ -109,6 +230,7 @@ async def update_invoice_db(
             invoice.additional_info = invoice_data.additional_info
         if invoice_data.is_paid is not None:
             invoice.is_paid = invoice_data.is_paid
+        invoice.version = (invoice.version or 1) + 1
 
         if invoice_data.items:
             delete_stmt = delete(InvoiceItem).where(
@@ -116,10 +238,14 @@ async def update_invoice_db(
             )
             await session.execute(delete_stmt)
 
+            product_ids = await resolve_product_ids(
+                session, invoice.shop_id, (item_data.name for item_data in invoice_data.items)
+            )
             total_amount = 0
             for item_data in invoice_data.items:
                 item = InvoiceItem(
                     invoice_id=invoice.id,
+                    product_id=product_ids.get(normalize_product_name(item_data.name)),
                     name=item_data.name,
                     quantity=item_data.quantity,
                     price=item_data.price,
@@ -148,18 +274,20 @@ async def delete_invoice_db(
         invoice_id: int,
         current_user: User
 ) -> bool:
-    query = select(Invoice).where(Invoice.id == invoice_id)
+    query = select(Invoice.id).where(Invoice.id == invoice_id)
     result = await session.execute(query)
-    invoice = result.scalar_one_or_none()
 
-    if not invoice:
+    if result.first() is None:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
     # Check permissions
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Only admins can delete invoices")
 
-    await session.delete(invoice)
+    # Single statement; invoice_items go through ON DELETE CASCADE in the database
+    await session.execute(
+        delete(Invoice).where(Invoice.id == invoice_id).execution_options(synchronize_session=False)
+    )
     await session.commit()
     return True
 
@@ -178,6 +306,17 @@ async def fetch_invoice(
     result = await session.execute(query)
     invoice = result.unique().scalar_one_or_none()
 
+    if not invoice:
+        # Fall back to the cold storage filled by app.db.archive_db
+        archive_query = select(ArchivedInvoice).options(
+            joinedload(ArchivedInvoice.items),
+            joinedload(ArchivedInvoice.shop),
+            joinedload(ArchivedInvoice.user)
+        ).where(ArchivedInvoice.id == invoice_id)
+
+        result = await session.execute(archive_query)
+        invoice = result.unique().scalar_one_or_none()
+
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
@@ -188,53 +327,177 @@ async def fetch_invoice(
     return invoice
 
 
-async def fetch_invoices_with_filters(
+async def fetch_invoice_version(
         session: AsyncSession,
-        current_user: User,
-        filters: InvoiceFilter,
-        skip: int = 0,
-        limit: int = 100
-) -> List[Invoice]:
-    query = select(Invoice).options(
-        joinedload(Invoice.items),
-        joinedload(Invoice.shop),
-        joinedload(Invoice.user)
-    )
+        invoice_id: int,
+        current_user: User
+) -> int:
+    """Return the current version of a hot or archived invoice after the access check"""
+    row = None
+    for model in (Invoice, ArchivedInvoice):
+        query = select(model.shop_id, model.version).where(model.id == invoice_id)
+        row = (await session.execute(query)).first()
+        if row:
+            break
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Invoice not found")
 
-    shops_query = select(users_shops.c.shop_id).where(
-        users_shops.c.user_id == current_user.id
-    )
-    result = await session.execute(shops_query)
-    accessible_shops = [row[0] for row in result.fetchall()]
+    has_access = await check_user_shop_access(session, current_user.id, row.shop_id)
+    if not has_access:
+        raise HTTPException(status_code=403, detail="No access to this invoice")
+
+    return row.version
+
+
+async def fetch_statement_chunk(
+        session: AsyncSession,
+        shop_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        contact: Optional[str] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        limit: int = 200
+) -> List[Union[Invoice, ArchivedInvoice]]:
+    """
+    Next chunk of a shop's hot and archived invoices in (created_at, id) order,
+    using keyset pagination.
+
+    Archived invoices keep their ids, so both tables are paged with the same key
+    and the two chunks are merged.
+    """
+    invoices = []
+    for model in (Invoice, ArchivedInvoice):
+        query = select(model).options(
+            selectinload(model.items)
+        ).where(
+            model.shop_id == shop_id,
+            model.created_at >= start_date,
+            model.created_at <= end_date
+        )
+
+        if contact:
+            query = query.where(model.contact_info.contains(contact, autoescape=True))
 
-    query = query.where(Invoice.shop_id.in_(accessible_shops))
+        if after:
+            last_created_at, last_id = after
+            query = query.where(or_(
+                model.created_at > last_created_at,
+                and_(model.created_at == last_created_at, model.id > last_id)
+            ))
+
+        query = query.order_by(model.created_at, model.id).limit(limit)
+        result = await session.execute(query)
+        invoices.extend(result.scalars().all())
+
+    invoices.sort(key=lambda invoice: (invoice.created_at, invoice.id))
+    return invoices[:limit]
+
+
+def _apply_invoice_filters(query, model, filters: InvoiceFilter, accessible_shops: List[int]):
+    """Apply list filters to a query over Invoice or ArchivedInvoice"""
+    query = query.where(model.shop_id.in_(accessible_shops))
 
     if filters.shop_id:
-        if filters.shop_id not in accessible_shops:
-            raise HTTPException(status_code=403, detail="No access to this shop")
-        query = query.where(Invoice.shop_id == filters.shop_id)
+        query = query.where(model.shop_id == filters.shop_id)
 
     if filters.is_paid is not None:
-        query = query.where(Invoice.is_paid == filters.is_paid)
+        query = query.where(model.is_paid == filters.is_paid)
 
     if filters.created_after:
-        query = query.where(Invoice.created_at >= filters.created_after)
+        query = query.where(model.created_at >= filters.created_after)
 
     if filters.created_before:
-        query = query.where(Invoice.created_at <= filters.created_before)
+        query = query.where(model.created_at <= filters.created_before)
 
     if filters.min_amount is not None:
-        query = query.where(Invoice.total_amount >= filters.min_amount)
+        query = query.where(model.total_amount >= filters.min_amount)
 
     if filters.max_amount is not None:
-        query = query.where(Invoice.total_amount <= filters.max_amount)
+        query = query.where(model.total_amount <= filters.max_amount)
 
-    query = query.order_by(Invoice.created_at.desc())
+    if filters.number_contains:
+        query = query.where(cast(model.number, String).contains(filters.number_contains, autoescape=True))
 
-    query = query.offset(skip).limit(limit)
+    if filters.contact:
+        query = query.where(model.contact_info.contains(filters.contact, autoescape=True))
 
-    result = await session.execute(query)
-    invoices = result.unique().scalars().all()
+    return query
+
+
+async def _fetch_invoices_with_archive(
+        session: AsyncSession,
+        filters: InvoiceFilter,
+        accessible_shops: List[int],
+        skip: int,
+        limit: int
+) -> List[Union[Invoice, ArchivedInvoice]]:
+    """Page over hot and archived invoices together, newest first"""
+    hot_ids = _apply_invoice_filters(
+        select(Invoice.id, Invoice.created_at, literal(False).label("archived")),
+        Invoice, filters, accessible_shops
+    )
+    cold_ids = _apply_invoice_filters(
+        select(ArchivedInvoice.id, ArchivedInvoice.created_at, literal(True).label("archived")),
+        ArchivedInvoice, filters, accessible_shops
+    )
+    page = hot_ids.union_all(cold_ids).subquery()
+    page_query = select(page.c.id, page.c.archived).order_by(
+        page.c.created_at.desc(), page.c.id.desc()
+    ).offset(skip).limit(limit)
+
+    rows = (await session.execute(page_query)).all()
+    hot_page = [row.id for row in rows if not row.archived]
+    cold_page = [row.id for row in rows if row.archived]
+
+    loaded = {}
+    for model, ids in ((Invoice, hot_page), (ArchivedInvoice, cold_page)):
+        if not ids:
+            continue
+        result = await session.execute(
+            select(model).options(
+                selectinload(model.items),
+                joinedload(model.shop),
+                joinedload(model.user)
+            ).where(model.id.in_(ids))
+        )
+        for invoice in result.unique().scalars().all():
+            loaded[(model is ArchivedInvoice, invoice.id)] = invoice
+
+    return [loaded[(bool(row.archived), row.id)] for row in rows if (bool(row.archived), row.id) in loaded]
+
+
+async def fetch_invoices_with_filters(
+        session: AsyncSession,
+        current_user: User,
+        filters: InvoiceFilter,
+        skip: int = 0,
+        limit: int = 100
+) -> List[Invoice]:
+    shops_query = select(users_shops.c.shop_id).where(
+        users_shops.c.user_id == current_user.id
+    )
+    result = await session.execute(shops_query)
+    accessible_shops = [row[0] for row in result.fetchall()]
+
+    if filters.shop_id and filters.shop_id not in accessible_shops:
+        raise HTTPException(status_code=403, detail="No access to this shop")
+
+    if filters.include_archived:
+        invoices = await _fetch_invoices_with_archive(session, filters, accessible_shops, skip, limit)
+    else:
+        query = select(Invoice).options(
+            joinedload(Invoice.items),
+            joinedload(Invoice.shop),
+            joinedload(Invoice.user)
+        )
+        query = _apply_invoice_filters(query, Invoice, filters, accessible_shops)
+        # id breaks ties so consecutive pages neither repeat nor skip invoices
+        query = query.order_by(Invoice.created_at.desc(), Invoice.id.desc())
+        query = query.offset(skip).limit(limit)
+
+        result = await session.execute(query)
+        invoices = result.unique().scalars().all()
 
     for invoice in invoices:
         if hasattr(invoice, 'created_at') and invoice.created_at:
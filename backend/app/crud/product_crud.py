@@ -0,0 +1,113 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Product, Invoice, InvoiceItem
+
+PRODUCT_NAME_LENGTH = 255
+
+
+def normalize_product_name(name: str) -> str:
+    """Key used to deduplicate item names: collapsed whitespace, case-folded"""
+    return " ".join(name.split()).casefold()[:PRODUCT_NAME_LENGTH]
+
+
+async def _select_product_ids(session: AsyncSession, shop_id: int, keys: Iterable[str]) -> Dict[str, int]:
+    query = select(Product.name_key, Product.id).where(
+        Product.shop_id == shop_id,
+        Product.name_key.in_(list(keys))
+    )
+    result = await session.execute(query)
+    return {name_key: product_id for name_key, product_id in result.all()}
+
+
+async def resolve_product_ids(
+        session: AsyncSession,
+        shop_id: int,
+        names: Iterable[str]
+) -> Dict[str, int]:
+    """
+    Map normalized item names to product ids, creating missing products.
+
+    Returns a dict keyed by normalize_product_name(name).
+    """
+    wanted: Dict[str, str] = {}
+    for name in names:
+        key = normalize_product_name(name or "")
+        if key:
+            wanted.setdefault(key, name.strip()[:PRODUCT_NAME_LENGTH])
+
+    if not wanted:
+        return {}
+
+    product_ids = await _select_product_ids(session, shop_id, wanted)
+    missing = [
+        {"shop_id": shop_id, "name": display_name, "name_key": key}
+        for key, display_name in wanted.items()
+        if key not in product_ids
+    ]
+    if not missing:
+        return product_ids
+
+    try:
+        async with session.begin_nested():
+            await session.execute(insert(Product).values(missing))
+    except IntegrityError:
+        # A concurrent request created some of them; insert the rest one by one
+        for row in missing:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(Product).values(row))
+            except IntegrityError:
+                pass
+
+    return await _select_product_ids(session, shop_id, wanted)
+
+
+async def fetch_product_stats(
+        session: AsyncSession,
+        shop_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 20
+) -> List[dict]:
+    """Top products of a shop by revenue, grouped by the integer product_id"""
+    stats = select(
+        InvoiceItem.product_id,
+        func.sum(InvoiceItem.quantity).label("quantity"),
+        func.sum(InvoiceItem.total).label("revenue"),
+        func.count(func.distinct(InvoiceItem.invoice_id)).label("invoices")
+    ).join(
+        Invoice, Invoice.id == InvoiceItem.invoice_id
+    ).where(
+        Invoice.shop_id == shop_id,
+        InvoiceItem.product_id.is_not(None)
+    )
+
+    if start_date:
+        stats = stats.where(Invoice.created_at >= start_date)
+    if end_date:
+        stats = stats.where(Invoice.created_at <= end_date)
+
+    stats = stats.group_by(InvoiceItem.product_id).subquery()
+
+    query = select(
+        Product.id, Product.name, stats.c.quantity, stats.c.revenue, stats.c.invoices
+    ).join(
+        stats, stats.c.product_id == Product.id
+    ).order_by(stats.c.revenue.desc()).limit(limit)
+
+    result = await session.execute(query)
+    return [
+        {
+            "product_id": row.id,
+            "name": row.name,
+            "quantity": float(row.quantity or 0),
+            "revenue": float(row.revenue or 0),
+            "invoices": row.invoices
+        }
+        for row in result.all()
+    ]
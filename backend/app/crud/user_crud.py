@@ -10,15 +10,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from app.core.config import get_db
 from app.models.models import User, Invoice
+from app.utils.timing import timed
 from ..schemas.schemas import TokenData
 from fastapi import APIRouter, Depends
 
-DB_USER: str = os.environ["DB_USER"]
-DB_PASSWORD: str = os.environ["DB_PASSWORD"]
-DB_HOST: str = os.environ["DB_HOST"]
-DB_NAME: str = os.environ["DB_NAME"]
-DB_PORT: int = int(os.environ["DB_PORT"])
-
 SECRET_KEY: str = os.environ["SECRET_KEY"]
 ALGORITHM: str = os.environ["ALGORITHM"]
 ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.environ["ACCESS_TOKEN_EXPIRE_MINUTES"])  # Convert to int
@@ -109,7 +104,8 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with timed("auth"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int = payload.get("user_id")
         user_shop_id: Optional[int] = payload.get("user_shop_id")
         last_invoice_id: Optional[int] = payload.get("last_invoice_id")
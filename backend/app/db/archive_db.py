@@ -0,0 +1,148 @@
+"""
+Hot/cold archival of old invoices.
+
+Moves invoices older than ARCHIVE_AFTER_DAYS, together with their items, from
+`invoices`/`invoice_items` into `invoices_archive`/`invoice_items_archive`.
+Each batch is copied and deleted in its own transaction, so the job can be
+interrupted and restarted at any point.
+
+The job also deletes idempotency keys older than IDEMPOTENCY_KEY_RETENTION_DAYS;
+by then no client replays the request they guard.
+
+Usage:
+    python -m app.db.archive_db --older-than-days 365 --batch-size 1000
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import engine, settings
+from app.models.models import ArchivedInvoice, ArchivedInvoiceItem, Invoice, InvoiceIdempotencyKey, InvoiceItem
+
+INVOICE_COLUMNS = [
+    "id", "number", "created_at", "contact_info", "additional_info",
+    "total_amount", "is_paid", "version", "shop_id", "user_id"
+]
+ITEM_COLUMNS = ["id", "name", "quantity", "price", "total", "invoice_id", "product_id"]
+
+
+def _cutoff(days: int) -> datetime:
+    """Naive UTC moment `days` ago; MySQL DATETIME columns store naive UTC"""
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+
+
+async def _archive_batch(engine_instance: AsyncEngine, invoice_ids: List[int]) -> int:
+    """Copy one batch of invoices to the archive and remove it from the hot tables"""
+    invoices = Invoice.__table__
+    items = InvoiceItem.__table__
+
+    async with engine_instance.begin() as conn:
+        await conn.execute(
+            insert(ArchivedInvoice.__table__).from_select(
+                INVOICE_COLUMNS,
+                select(*(invoices.c[name] for name in INVOICE_COLUMNS)).where(invoices.c.id.in_(invoice_ids))
+            )
+        )
+        await conn.execute(
+            insert(ArchivedInvoiceItem.__table__).from_select(
+                ITEM_COLUMNS,
+                select(*(items.c[name] for name in ITEM_COLUMNS)).where(items.c.invoice_id.in_(invoice_ids))
+            )
+        )
+        await conn.execute(delete(items).where(items.c.invoice_id.in_(invoice_ids)))
+        result = await conn.execute(delete(invoices).where(invoices.c.id.in_(invoice_ids)))
+        return result.rowcount
+
+
+async def archive_invoices(
+        engine_instance: Optional[AsyncEngine] = None,
+        older_than_days: Optional[int] = None,
+        batch_size: Optional[int] = None
+) -> int:
+    """Archive invoices created before the cutoff, returning how many were moved"""
+    current_engine = engine_instance or engine
+    older_than_days = older_than_days if older_than_days is not None else settings.ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = _cutoff(older_than_days)
+
+    async with current_engine.connect() as conn:
+        max_id = (await conn.execute(select(func.max(Invoice.id)))).scalar()
+    if max_id is None:
+        return 0
+
+    archived = 0
+    last_id = 0
+    while True:
+        async with current_engine.connect() as conn:
+            # The newest row always stays hot so auto-increment never reuses archived ids
+            result = await conn.execute(
+                select(Invoice.id)
+                .where(Invoice.created_at < cutoff, Invoice.id > last_id, Invoice.id < max_id)
+                .order_by(Invoice.id)
+                .limit(batch_size)
+            )
+            invoice_ids = [row[0] for row in result.fetchall()]
+
+        if not invoice_ids:
+            break
+
+        archived += await _archive_batch(current_engine, invoice_ids)
+        last_id = invoice_ids[-1]
+        print(f"Archived {archived} invoices (up to id {last_id})")
+
+    return archived
+
+
+async def expire_idempotency_keys(
+        engine_instance: Optional[AsyncEngine] = None,
+        retention_days: Optional[int] = None,
+        batch_size: Optional[int] = None
+) -> int:
+    """Delete idempotency keys created before the retention window, returning how many were deleted"""
+    current_engine = engine_instance or engine
+    retention_days = retention_days if retention_days is not None else settings.IDEMPOTENCY_KEY_RETENTION_DAYS
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = _cutoff(retention_days)
+
+    deleted = 0
+    while True:
+        async with current_engine.begin() as conn:
+            result = await conn.execute(
+                select(InvoiceIdempotencyKey.id)
+                .where(InvoiceIdempotencyKey.created_at < cutoff)
+                .order_by(InvoiceIdempotencyKey.id)
+                .limit(batch_size)
+            )
+            key_ids = [row[0] for row in result.fetchall()]
+            if not key_ids:
+                break
+            result = await conn.execute(delete(InvoiceIdempotencyKey).where(InvoiceIdempotencyKey.id.in_(key_ids)))
+            deleted += result.rowcount
+
+    return deleted
+
+
+async def run_archival(older_than_days: Optional[int], batch_size: Optional[int]) -> None:
+    try:
+        archived = await archive_invoices(older_than_days=older_than_days, batch_size=batch_size)
+        print(f"Archival completed: {archived} invoices moved to the archive")
+        expired = await expire_idempotency_keys(batch_size=batch_size)
+        print(f"Expired {expired} idempotency keys")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old invoices into the archive tables")
+    parser.add_argument("--older-than-days", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_archival(args.older_than_days, args.batch_size))
+    except KeyboardInterrupt:
+        print("\nArchival cancelled by user")
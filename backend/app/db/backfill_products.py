@@ -0,0 +1,122 @@
+"""
+Backfill of the products catalog from existing invoice_items.
+
+Walks invoice_items without a product_id in id order, creates one product per
+distinct normalized name and shop, and links the items to it. Each chunk is
+committed separately, so the job can be stopped and resumed.
+
+Usage:
+    python -m app.db.backfill_products --chunk-size 5000
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from sqlalchemy import inspect, select, text, update
+
+from app.core.config import async_session_factory, engine
+from app.crud.product_crud import normalize_product_name, resolve_product_ids
+from app.models.models import Invoice, InvoiceItem, Product
+
+
+def _add_missing_product_column(sync_conn) -> None:
+    """Databases created before the catalog existed lack product_id on the hot and archived items"""
+    inspector = inspect(sync_conn)
+    tables = set(inspector.get_table_names())
+
+    # Same foreign key, and index where the model has one, as create_all makes
+    for table, indexed in (("invoice_items", True), ("invoice_items_archive", False)):
+        if table not in tables or "product_id" in {column["name"] for column in inspector.get_columns(table)}:
+            continue
+
+        if sync_conn.dialect.name == "sqlite":
+            # SQLite cannot add a table constraint, only a column-level reference
+            sync_conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN product_id INTEGER NULL "
+                "REFERENCES products (id) ON DELETE SET NULL"
+            ))
+            if indexed:
+                sync_conn.execute(text(f"CREATE INDEX ix_{table}_product_id ON {table} (product_id)"))
+        else:
+            # MySQL ignores a column-level REFERENCES, so the key is added as a table constraint
+            index = f"ADD INDEX ix_{table}_product_id (product_id), " if indexed else ""
+            sync_conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN product_id INTEGER NULL, {index}"
+                "ADD FOREIGN KEY (product_id) REFERENCES products (id) ON DELETE SET NULL"
+            ))
+        print(f"Added {table}.product_id")
+
+
+async def prepare_schema() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Product.__table__.create, checkfirst=True)
+        await conn.run_sync(_add_missing_product_column)
+
+
+async def backfill_products(chunk_size: int = 5000) -> int:
+    """Link every unlinked invoice item to a product, returning how many were linked"""
+    linked = 0
+    last_id = 0
+
+    while True:
+        async with async_session_factory() as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(InvoiceItem.id, InvoiceItem.name, Invoice.shop_id)
+                    .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+                    .where(InvoiceItem.id > last_id, InvoiceItem.product_id.is_(None))
+                    .order_by(InvoiceItem.id)
+                    .limit(chunk_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+
+                # shop_id -> name key -> item ids
+                groups: Dict[int, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+                names: Dict[Tuple[int, str], str] = {}
+                for item_id, name, shop_id in rows:
+                    key = normalize_product_name(name)
+                    if key:
+                        groups[shop_id][key].append(item_id)
+                        names.setdefault((shop_id, key), name)
+
+                for shop_id, items_by_key in groups.items():
+                    product_ids = await resolve_product_ids(
+                        session, shop_id, (names[(shop_id, key)] for key in items_by_key)
+                    )
+                    for key, item_ids in items_by_key.items():
+                        await session.execute(
+                            update(InvoiceItem)
+                            .where(InvoiceItem.id.in_(item_ids))
+                            .values(product_id=product_ids[key])
+                            .execution_options(synchronize_session=False)
+                        )
+                        linked += len(item_ids)
+
+                last_id = rows[-1][0]
+
+        print(f"Linked {linked} items to products (up to item id {last_id})")
+
+    return linked
+
+
+async def run_backfill(chunk_size: int) -> None:
+    try:
+        await prepare_schema()
+        linked = await backfill_products(chunk_size)
+        print(f"Backfill completed: {linked} items linked")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the products catalog from invoice_items")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_backfill(args.chunk_size))
+    except KeyboardInterrupt:
+        print("\nBackfill cancelled by user")
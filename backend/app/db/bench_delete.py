@@ -0,0 +1,156 @@
+"""
+Benchmark of invoice deletion with many items.
+
+Creates invoices with a fixed number of items each and deletes them with
+two strategies:
+
+    orm - load the invoice with its items and session.delete() it, which is
+          what delete_invoice_db used to do (one DELETE per item)
+    set - delete_invoice_db: a single DELETE on invoices, items removed by
+          ON DELETE CASCADE in the database
+
+Run against a scratch database, the tables are created if missing.
+
+Usage:
+    python -m app.db.bench_delete --invoices 20 --items 500
+    python -m app.db.bench_delete --database-url sqlite+aiosqlite:///bench.db
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import selectinload
+
+from app.core.config import build_engine
+from app.crud.invoice_crud import delete_invoice_db
+from app.db.manage_db import create_tables_async
+from app.models.models import Invoice, InvoiceItem, Shop, User
+
+
+async def create_owner(engine_instance: AsyncEngine) -> tuple:
+    """Shop and superuser the benchmark invoices belong to"""
+    async with engine_instance.begin() as conn:
+        suffix = (await conn.execute(select(func.coalesce(func.max(User.id), 0)))).scalar() + 1
+        shop_id = (await conn.execute(
+            insert(Shop).values(name=f"Bench shop {suffix}", is_active=True)
+        )).inserted_primary_key[0]
+        user_id = (await conn.execute(
+            insert(User).values(
+                login=f"bench_delete_{suffix}",
+                email=f"bench_delete_{suffix}@example.com",
+                password="-",
+                is_active=True,
+                is_superuser=True
+            )
+        )).inserted_primary_key[0]
+    return shop_id, user_id
+
+
+async def create_invoices(
+        engine_instance: AsyncEngine,
+        shop_id: int,
+        user_id: int,
+        invoices: int,
+        items: int
+) -> List[int]:
+    invoice_ids = []
+    async with engine_instance.begin() as conn:
+        for _ in range(invoices):
+            invoice_id = (await conn.execute(
+                insert(Invoice).values(
+                    shop_id=shop_id,
+                    user_id=user_id,
+                    contact_info="Benchmark",
+                    total_amount=Decimal("1.00") * items,
+                    is_paid=False
+                )
+            )).inserted_primary_key[0]
+            rows = [
+                {
+                    "invoice_id": invoice_id,
+                    "name": f"Item {n}",
+                    "quantity": Decimal("1"),
+                    "price": Decimal("1.00"),
+                    "total": Decimal("1.00")
+                }
+                for n in range(items)
+            ]
+            for start in range(0, len(rows), 250):
+                await conn.execute(insert(InvoiceItem).values(rows[start:start + 250]))
+            invoice_ids.append(invoice_id)
+    return invoice_ids
+
+
+async def delete_orm(session: AsyncSession, invoice_id: int, user: User) -> None:
+    invoice = (await session.execute(
+        select(Invoice).options(selectinload(Invoice.items)).where(Invoice.id == invoice_id)
+    )).scalar_one()
+    await session.delete(invoice)
+    await session.commit()
+
+
+async def delete_set(session: AsyncSession, invoice_id: int, user: User) -> None:
+    await delete_invoice_db(session, invoice_id, user)
+
+
+STRATEGIES = {"orm": delete_orm, "set": delete_set}
+
+
+async def run_benchmark(invoices: int, items: int, database_url: Optional[str] = None) -> None:
+    bench_engine = build_engine(database_url, echo=False)
+    session_factory = async_sessionmaker(bench_engine, class_=AsyncSession, expire_on_commit=False)
+
+    statements = {"count": 0}
+
+    @event.listens_for(bench_engine.sync_engine, "before_cursor_execute")
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements["count"] += 1
+
+    try:
+        await create_tables_async(bench_engine)
+        shop_id, user_id = await create_owner(bench_engine)
+
+        for name, strategy in STRATEGIES.items():
+            invoice_ids = await create_invoices(bench_engine, shop_id, user_id, invoices, items)
+            timings = []
+            statements["count"] = 0
+
+            async with session_factory() as session:
+                user = await session.get(User, user_id)
+                for invoice_id in invoice_ids:
+                    started = time.perf_counter()
+                    await strategy(session, invoice_id, user)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    session.expunge_all()
+                    session.add(user)
+
+            async with bench_engine.connect() as conn:
+                left = (await conn.execute(
+                    select(func.count()).select_from(InvoiceItem).where(InvoiceItem.invoice_id.in_(invoice_ids))
+                )).scalar()
+
+            print(
+                f"{name}: {invoices} invoices x {items} items, "
+                f"median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms, "
+                f"{statements['count'] / invoices:.1f} statements per delete, {left} items left"
+            )
+    finally:
+        await bench_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ORM cascade and set-based invoice deletion")
+    parser.add_argument("--invoices", type=int, default=20)
+    parser.add_argument("--items", type=int, default=500, help="Items per invoice")
+    parser.add_argument("--database-url", default=None, help="Defaults to the configured database")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_benchmark(args.invoices, args.items, args.database_url))
+    except KeyboardInterrupt:
+        print("\nBenchmark cancelled by user")
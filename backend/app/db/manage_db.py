@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncEngine
 import asyncio
-from typing import Optional
-from sqlalchemy import text
+from typing import Optional, Dict
+from sqlalchemy import text, inspect
 
 # Import your models and database configuration
 from app.models.models import Base, User, Shop, Invoice, InvoiceItem
@@ -14,14 +14,22 @@ async def drop_all_tables_async(engine_instance: Optional[AsyncEngine] = None) -
 
     try:
         async with current_engine.begin() as conn:
+            dialect = conn.dialect.name
+
             # Disable foreign key checks
-            await conn.execute(text("SET FOREIGN_KEY_CHECKS = 0;"))
+            if dialect == "mysql":
+                await conn.execute(text("SET FOREIGN_KEY_CHECKS = 0;"))
+            elif dialect == "sqlite":
+                await conn.execute(text("PRAGMA foreign_keys = OFF;"))
 
             # Drop all tables
             await conn.run_sync(Base.metadata.drop_all)
 
             # Re-enable foreign key checks
-            await conn.execute(text("SET FOREIGN_KEY_CHECKS = 1;"))
+            if dialect == "mysql":
+                await conn.execute(text("SET FOREIGN_KEY_CHECKS = 1;"))
+            elif dialect == "sqlite":
+                await conn.execute(text("PRAGMA foreign_keys = ON;"))
 
         print("All tables successfully dropped")
     except Exception as e:
@@ -42,20 +50,29 @@ async def create_tables_async(engine_instance: Optional[AsyncEngine] = None) ->
         raise
 
 
+def _collect_table_columns(sync_conn) -> Dict[str, int]:
+    """Map every table name to its column count using the SQLAlchemy inspector"""
+    inspector = inspect(sync_conn)
+    return {
+        table: len(inspector.get_columns(table))
+        for table in inspector.get_table_names()
+    }
+
+
 async def verify_tables_async(engine_instance: Optional[AsyncEngine] = None) -> None:
     """Verify that all required tables were created correctly"""
     current_engine = engine_instance or engine
-    expected_tables = {'users', 'shops', 'users_shops', 'invoices', 'invoice_items'}
+    expected_tables = {
+        'users', 'shops', 'users_shops', 'invoices', 'invoice_items', 'invoice_sequences',
+        'invoices_archive', 'invoice_items_archive', 'products', 'invoice_idempotency_keys'
+    }
 
     try:
         async with current_engine.connect() as conn:
-            # Get list of all tables in the database
-            result = await conn.execute(text(
-                "SELECT table_name FROM information_schema.tables "
-                "WHERE table_schema = :schema AND table_type = 'BASE TABLE';"
-            ), {"schema": "faragjdatabase"})
+            # Get list of all tables in the database (works for every dialect)
+            table_columns = await conn.run_sync(_collect_table_columns)
 
-            existing_tables = {row[0] for row in result.fetchall()}
+            existing_tables = set(table_columns)
 
             # Check if all expected tables exist
             missing_tables = expected_tables - existing_tables
@@ -65,14 +82,9 @@ async def verify_tables_async(engine_instance: Optional[AsyncEngine] = None) ->
                 print("All required tables are present")
 
             # Print table details
-            print("\nTable details:")
-            for table in existing_tables:
-                result = await conn.execute(text(
-                    "SELECT COUNT(*) FROM information_schema.columns "
-                    "WHERE table_schema = :schema AND table_name = :table;"
-                ), {"schema": "faragjdatabase", "table": table})
-                column_count = result.scalar()
-                print(f"- {table}: {column_count} columns")
+            print(f"\nTable details ({conn.dialect.name}):")
+            for table in sorted(existing_tables):
+                print(f"- {table}: {table_columns[table]} columns")
 
     except Exception as e:
         print(f"Error verifying tables: {str(e)}")
@@ -0,0 +1,100 @@
+"""
+Schema upgrade for per-shop invoice numbers.
+
+Databases created before invoice numbers existed lack invoices.number,
+invoices.version, the (shop_id, number) unique constraint and the
+invoice_sequences table, and create_all does not alter existing tables. This
+job adds them, then numbers every legacy invoice, hot or archived, with its
+id. Ids are unique across shops, so the numbers cannot collide, and each shop
+continues after its highest legacy id. Each chunk is committed separately, so
+the job can be stopped and resumed.
+
+Run it once before starting the API on an existing database.
+
+Usage:
+    python -m app.db.migrate_invoice_numbers --chunk-size 10000
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import func, inspect, select, text, update
+
+from app.core.config import engine
+from app.models.models import ArchivedInvoice, Invoice, InvoiceSequence
+
+NUMBER_CONSTRAINT = "uq_invoices_shop_number"
+
+
+def _add_missing_columns(sync_conn) -> None:
+    inspector = inspect(sync_conn)
+    tables = set(inspector.get_table_names())
+
+    for table in (Invoice.__tablename__, ArchivedInvoice.__tablename__):
+        if table not in tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table)}
+        if "number" not in columns:
+            sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN number INTEGER NULL"))
+            print(f"Added {table}.number")
+        if "version" not in columns:
+            sync_conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+            print(f"Added {table}.version")
+
+    constraints = {constraint["name"] for constraint in inspector.get_unique_constraints(Invoice.__tablename__)}
+    constraints |= {index["name"] for index in inspector.get_indexes(Invoice.__tablename__)}
+    if NUMBER_CONSTRAINT not in constraints:
+        # A unique index, so it also works on SQLite, which cannot add constraints to a table
+        sync_conn.execute(text(
+            f"CREATE UNIQUE INDEX {NUMBER_CONSTRAINT} ON {Invoice.__tablename__} (shop_id, number)"
+        ))
+        print(f"Added {NUMBER_CONSTRAINT}")
+
+
+async def prepare_schema() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(InvoiceSequence.__table__.create, checkfirst=True)
+        await conn.run_sync(_add_missing_columns)
+
+
+async def backfill_numbers(model, chunk_size: int = 10000) -> int:
+    """Number the invoices of one table that have no number yet with their id"""
+    async with engine.connect() as conn:
+        max_id = (await conn.execute(select(func.max(model.id)))).scalar()
+    if max_id is None:
+        return 0
+
+    numbered = 0
+    last_id = 0
+    while last_id < max_id:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                update(model)
+                .where(model.id > last_id, model.id <= last_id + chunk_size, model.number.is_(None))
+                .values(number=model.id)
+            )
+            numbered += result.rowcount
+        last_id += chunk_size
+        print(f"Numbered {numbered} invoices in {model.__tablename__} (up to id {min(last_id, max_id)})")
+
+    return numbered
+
+
+async def run_migration(chunk_size: int) -> None:
+    try:
+        await prepare_schema()
+        numbered = await backfill_numbers(Invoice, chunk_size)
+        numbered += await backfill_numbers(ArchivedInvoice, chunk_size)
+        print(f"Migration completed: {numbered} legacy invoices numbered")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add invoice numbers to an existing database")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_migration(args.chunk_size))
+    except KeyboardInterrupt:
+        print("\nMigration cancelled by user")
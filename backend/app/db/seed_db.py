@@ -0,0 +1,388 @@
+"""
+Synthetic data seeder for performance work.
+
+Generates shops, users, users_shops assignments, invoices and invoice items
+with realistic distributions. Every chunk of invoices is generated from its own
+RNG derived from the global seed, so the contents of the rows do not depend on
+how chunks are scheduled across the parallel connections. Invoice ids are
+assigned explicitly; invoice_items ids are left to the database and, with more
+than one worker, follow the order in which chunks commit. Dates are spread back
+from a fixed reference time rather than the current one, so the same seed gives
+the same rows on every run.
+
+Invoices are numbered per shop in id order, and every shop gets its
+invoice_sequences row, so invoices created after seeding continue the numbering.
+
+Usage:
+    python -m app.db.seed_db --shops 200 --users 600 --invoices 2000000 --seed 42
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional, Tuple
+
+import bcrypt
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import build_engine
+from app.db.manage_db import create_tables_async, drop_all_tables_async
+from app.models.models import Invoice, InvoiceItem, InvoiceSequence, Shop, User, users_shops
+
+CENT = Decimal("0.01")
+MILLI = Decimal("0.001")
+# Day of the newest invoices, naive UTC like the created_at column
+DEFAULT_REFERENCE_TIME = datetime(2025, 1, 1)
+
+PRODUCT_BASES = [
+    "Хлеб", "Молоко", "Кефир", "Сахар", "Мука", "Рис", "Гречка", "Масло", "Яйца", "Сыр",
+    "Колбаса", "Чай", "Кофе", "Соль", "Макароны", "Картофель", "Лук", "Морковь", "Яблоки",
+    "Бананы", "Курица", "Говядина", "Рыба", "Сметана", "Творог", "Печенье", "Конфеты",
+    "Вода", "Сок", "Лимонад", "Мыло", "Шампунь", "Порошок", "Бумага", "Салфетки",
+    "Батарейки", "Лампочка", "Кабель", "Скотч", "Пакет",
+]
+PRODUCT_VARIANTS = [
+    "", " 0.5 кг", " 1 кг", " 5 кг", " 0.5 л", " 1 л", " 1.5 л", " премиум", " эконом",
+    " фасованный", " весовой", " упак.",
+]
+CONTACTS = [
+    "ИП Ахметов", "ТОО Береке", "Кафе Нур", "Магазин Айгерим", "Столовая №5", "ИП Ким",
+    "ТОО Астана-Трейд", "Розница", "Оптовый клиент", "Школа №12",
+]
+
+
+class SeedConfig:
+    """Parameters of a seeding run"""
+
+    def __init__(
+            self,
+            shops: int,
+            users: int,
+            invoices: int,
+            seed: int,
+            days: int,
+            chunk_size: int,
+            workers: int,
+            reference_time: datetime = DEFAULT_REFERENCE_TIME
+    ):
+        # Every shop is given a user, and every invoice a shop and a user
+        if shops < 1 or users < 1:
+            raise ValueError("At least one shop and one user are needed")
+        self.shops = shops
+        self.users = users
+        self.invoices = invoices
+        self.seed = seed
+        self.days = days
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.reference_time = reference_time
+
+
+def _chunk_rng(seed: int, label: str, index: int) -> random.Random:
+    """Independent deterministic RNG for one unit of work"""
+    return random.Random(f"{seed}:{label}:{index}")
+
+
+def _zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    return [1.0 / math.pow(rank, exponent) for rank in range(1, count + 1)]
+
+
+def build_product_catalog(seed: int) -> Tuple[List[str], List[float], Dict[str, Decimal]]:
+    """Build item names with Zipf popularity and a stable base price per name"""
+    rng = _chunk_rng(seed, "catalog", 0)
+    names = [base + variant for base in PRODUCT_BASES for variant in PRODUCT_VARIANTS]
+    rng.shuffle(names)
+    base_prices = {
+        name: Decimal(str(min(rng.lognormvariate(6.2, 0.9), 50000))).quantize(CENT, ROUND_HALF_UP)
+        for name in names
+    }
+    return names, _zipf_weights(len(names)), base_prices
+
+
+def build_shop_weights(config: SeedConfig) -> List[float]:
+    """Pareto-distributed shop activity: a few busy shops, a long quiet tail"""
+    rng = _chunk_rng(config.seed, "shops", 0)
+    return [rng.paretovariate(1.16) for _ in range(config.shops)]
+
+
+def build_assignments(config: SeedConfig, shop_ids: List[int], user_ids: List[int]) -> Dict[int, List[int]]:
+    """Assign every user to 1-3 shops and make sure every shop has a user"""
+    rng = _chunk_rng(config.seed, "assignments", 0)
+    shop_users: Dict[int, List[int]] = {shop_id: [] for shop_id in shop_ids}
+
+    for index, shop_id in enumerate(shop_ids):
+        shop_users[shop_id].append(user_ids[index % len(user_ids)])
+
+    for user_id in user_ids:
+        for shop_id in rng.sample(shop_ids, k=min(len(shop_ids), rng.choice((1, 1, 1, 2, 3)))):
+            if user_id not in shop_users[shop_id]:
+                shop_users[shop_id].append(user_id)
+
+    return shop_users
+
+
+def _chunk_shops(rng: random.Random, count: int, shop_ids: List[int], shop_weights: List[float]) -> List[int]:
+    """Shop of every invoice of a chunk; the first draw from the chunk's RNG"""
+    return rng.choices(shop_ids, weights=shop_weights, k=count)
+
+
+def plan_invoice_numbers(
+        config: SeedConfig,
+        chunk_count: int,
+        shop_ids: List[int],
+        shop_weights: List[float]
+) -> Tuple[List[Dict[int, int]], Dict[int, int]]:
+    """
+    First invoice number of every shop in each chunk, and the last number of
+    every shop, so chunks can be numbered independently of their scheduling
+    """
+    first_numbers = []
+    next_number = {shop_id: 1 for shop_id in shop_ids}
+    for chunk_index in range(chunk_count):
+        first_numbers.append(dict(next_number))
+        count = min(config.chunk_size, config.invoices - chunk_index * config.chunk_size)
+        rng = _chunk_rng(config.seed, "invoices", chunk_index)
+        for shop_id, shop_count in Counter(_chunk_shops(rng, count, shop_ids, shop_weights)).items():
+            next_number[shop_id] += shop_count
+    return first_numbers, {shop_id: number - 1 for shop_id, number in next_number.items()}
+
+
+def _random_timestamp(rng: random.Random, now: datetime, days: int) -> datetime:
+    """Timestamp skewed towards recent days, weekdays and business hours"""
+    age_days = min(days - 1, int(rng.expovariate(2.0 / days)))
+    day = now - timedelta(days=age_days)
+    if day.weekday() == 6 and rng.random() < 0.6:
+        day -= timedelta(days=1)
+    hour = min(21, max(8, int(rng.gauss(14, 3))))
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+
+
+def generate_invoice_chunk(
+        config: SeedConfig,
+        chunk_index: int,
+        first_invoice_id: int,
+        count: int,
+        first_numbers: Dict[int, int],
+        shop_ids: List[int],
+        shop_weights: List[float],
+        shop_users: Dict[int, List[int]],
+        shop_paid_ratio: Dict[int, float],
+        catalog: Tuple[List[str], List[float], Dict[str, Decimal]]
+) -> Tuple[List[dict], List[dict]]:
+    """Generate invoice and item rows for one chunk"""
+    rng = _chunk_rng(config.seed, "invoices", chunk_index)
+    names, name_weights, base_prices = catalog
+    next_number = dict(first_numbers)
+
+    invoice_rows = []
+    item_rows = []
+    chosen_shops = _chunk_shops(rng, count, shop_ids, shop_weights)
+
+    for offset, shop_id in enumerate(chosen_shops):
+        invoice_id = first_invoice_id + offset
+        item_count = min(60, 1 + int(rng.lognormvariate(0.9, 0.8)))
+        total_amount = Decimal("0")
+
+        for name in rng.choices(names, weights=name_weights, k=item_count):
+            if rng.random() < 0.15:
+                quantity = Decimal(str(round(rng.uniform(0.1, 5.0), 3))).quantize(MILLI)
+            else:
+                quantity = Decimal(min(100, int(rng.expovariate(0.4)) + 1))
+            price = (base_prices[name] * Decimal(str(rng.uniform(0.9, 1.1)))).quantize(CENT, ROUND_HALF_UP)
+            total = (quantity * price).quantize(CENT, ROUND_HALF_UP)
+            total_amount += total
+            item_rows.append({
+                "invoice_id": invoice_id,
+                "name": name,
+                "quantity": quantity,
+                "price": price,
+                "total": total
+            })
+
+        invoice_rows.append({
+            "id": invoice_id,
+            "number": next_number[shop_id],
+            "shop_id": shop_id,
+            "user_id": rng.choice(shop_users[shop_id]),
+            "created_at": _random_timestamp(rng, config.reference_time, config.days),
+            "contact_info": rng.choice(CONTACTS) if rng.random() < 0.8 else f"+7 7{rng.randrange(10 ** 9):09d}",
+            "additional_info": None if rng.random() < 0.9 else "Доставка",
+            "total_amount": total_amount,
+            "is_paid": rng.random() < shop_paid_ratio[shop_id]
+        })
+        next_number[shop_id] += 1
+
+    return invoice_rows, item_rows
+
+
+async def _insert_rows(conn, table, rows: List[dict], batch_size: int) -> None:
+    """Insert rows as multi-row INSERT ... VALUES statements"""
+    for start in range(0, len(rows), batch_size):
+        await conn.execute(insert(table).values(rows[start:start + batch_size]))
+
+
+async def seed_shops_and_users(engine_instance: AsyncEngine, config: SeedConfig) -> Tuple[List[int], List[int]]:
+    """Insert shops and users, returning their ids"""
+    password_hash = bcrypt.hashpw(b"seed", bcrypt.gensalt()).decode()
+
+    async with engine_instance.begin() as conn:
+        first_shop = (await conn.execute(select(func.coalesce(func.max(Shop.id), 0)))).scalar() + 1
+        first_user = (await conn.execute(select(func.coalesce(func.max(User.id), 0)))).scalar() + 1
+
+        shop_rows = [
+            {"id": first_shop + i, "name": f"Shop {first_shop + i}", "is_active": True}
+            for i in range(config.shops)
+        ]
+        user_rows = [
+            {
+                "id": first_user + i,
+                "login": f"seed_user_{config.seed}_{first_user + i}",
+                "email": f"seed_user_{config.seed}_{first_user + i}@example.com",
+                "password": password_hash,
+                "is_active": True,
+                "is_superuser": False
+            }
+            for i in range(config.users)
+        ]
+        await _insert_rows(conn, Shop.__table__, shop_rows, config.chunk_size)
+        await _insert_rows(conn, User.__table__, user_rows, config.chunk_size)
+
+    return [row["id"] for row in shop_rows], [row["id"] for row in user_rows]
+
+
+async def seed_assignments(engine_instance: AsyncEngine, config: SeedConfig, shop_users: Dict[int, List[int]]) -> None:
+    rows = [
+        {"user_id": user_id, "shop_id": shop_id}
+        for shop_id, user_ids in shop_users.items()
+        for user_id in user_ids
+    ]
+    async with engine_instance.begin() as conn:
+        await _insert_rows(conn, users_shops, rows, config.chunk_size)
+
+
+async def seed_invoices(
+        engine_instance: AsyncEngine,
+        config: SeedConfig,
+        shop_ids: List[int],
+        shop_users: Dict[int, List[int]]
+) -> None:
+    """Insert invoices and items in chunks over parallel connections"""
+    async with engine_instance.connect() as conn:
+        first_invoice = (await conn.execute(select(func.coalesce(func.max(Invoice.id), 0)))).scalar() + 1
+
+    rng = _chunk_rng(config.seed, "paid_ratio", 0)
+    shop_paid_ratio = {shop_id: rng.betavariate(8, 2) for shop_id in shop_ids}
+    shop_weights = build_shop_weights(config)
+    catalog = build_product_catalog(config.seed)
+
+    chunk_count = math.ceil(config.invoices / config.chunk_size)
+    first_numbers, last_numbers = plan_invoice_numbers(config, chunk_count, shop_ids, shop_weights)
+    queue: asyncio.Queue = asyncio.Queue()
+    for chunk_index in range(chunk_count):
+        queue.put_nowait(chunk_index)
+
+    progress = {"invoices": 0, "items": 0}
+    started = time.perf_counter()
+
+    async def worker() -> None:
+        while True:
+            try:
+                chunk_index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            start = chunk_index * config.chunk_size
+            count = min(config.chunk_size, config.invoices - start)
+            invoice_rows, item_rows = generate_invoice_chunk(
+                config, chunk_index, first_invoice + start, count, first_numbers[chunk_index],
+                shop_ids, shop_weights, shop_users, shop_paid_ratio, catalog
+            )
+
+            async with engine_instance.begin() as conn:
+                await _insert_rows(conn, Invoice.__table__, invoice_rows, config.chunk_size)
+                await _insert_rows(conn, InvoiceItem.__table__, item_rows, config.chunk_size)
+
+            progress["invoices"] += len(invoice_rows)
+            progress["items"] += len(item_rows)
+            elapsed = time.perf_counter() - started
+            print(
+                f"Chunk {chunk_index + 1}/{chunk_count}: "
+                f"{progress['invoices']} invoices, {progress['items']} items "
+                f"({progress['invoices'] / elapsed:.0f} invoices/s)"
+            )
+
+    await asyncio.gather(*(worker() for _ in range(config.workers)))
+
+    sequence_rows = [{"shop_id": shop_id, "last_number": number} for shop_id, number in last_numbers.items()]
+    async with engine_instance.begin() as conn:
+        await _insert_rows(conn, InvoiceSequence.__table__, sequence_rows, config.chunk_size)
+
+
+async def seed_database(config: SeedConfig, reset: bool = False, database_url: Optional[str] = None) -> None:
+    """Run a full seeding pass"""
+    seed_engine = build_engine(
+        database_url,
+        echo=False,
+        pool_size=config.workers,
+        max_overflow=0
+    )
+
+    try:
+        if reset:
+            print("Dropping existing tables...")
+            await drop_all_tables_async(seed_engine)
+        await create_tables_async(seed_engine)
+
+        print(f"Seeding {config.shops} shops and {config.users} users...")
+        shop_ids, user_ids = await seed_shops_and_users(seed_engine, config)
+        shop_users = build_assignments(config, shop_ids, user_ids)
+        await seed_assignments(seed_engine, config, shop_users)
+
+        print(f"Seeding {config.invoices} invoices with {config.workers} connections...")
+        await seed_invoices(seed_engine, config, shop_ids, shop_users)
+        print("Seeding completed successfully!")
+    finally:
+        await seed_engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic invoices")
+    parser.add_argument("--shops", type=int, default=100)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--invoices", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=730, help="Spread invoices over this many past days")
+    parser.add_argument(
+        "--reference-time", type=datetime.fromisoformat, default=DEFAULT_REFERENCE_TIME,
+        help="Day of the newest invoices, naive UTC (default: %(default)s)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Rows per multi-row INSERT")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel database connections")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first")
+    args = parser.parse_args()
+    if args.shops < 1 or args.users < 1:
+        parser.error("--shops and --users must be at least 1")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    seed_config = SeedConfig(
+        shops=args.shops,
+        users=args.users,
+        invoices=args.invoices,
+        seed=args.seed,
+        days=args.days,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        reference_time=args.reference_time
+    )
+    try:
+        asyncio.run(seed_database(seed_config, reset=args.reset))
+    except KeyboardInterrupt:
+        print("\nSeeding cancelled by user")
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Table, Numeric, MetaData
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Table, Numeric, MetaData, \
+    UniqueConstraint
 from sqlalchemy.orm import relationship, DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.sql import func
 
@@ -45,7 +46,8 @@ class User(Base):
     invoices: Mapped[List["Invoice"]] = relationship(
         "Invoice",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
 
@@ -73,18 +75,85 @@ class Shop(Base):
     invoices: Mapped[List["Invoice"]] = relationship(
         "Invoice",
         back_populates="shop",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+
+class Product(Base):
+    """Deduplicated item name of a shop, referenced by invoice items"""
+    __tablename__ = "products"
+    __table_args__ = (
+        UniqueConstraint("shop_id", "name_key", name="uq_products_shop_name_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    shop_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("shops.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Case- and whitespace-normalized name used for deduplication
+    name_key: Mapped[str] = mapped_column(String(255), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+
+class InvoiceSequence(Base):
+    """Last invoice number handed out for a shop"""
+    __tablename__ = "invoice_sequences"
+
+    shop_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("shops.id", ondelete="CASCADE"),
+        primary_key=True,
+        autoincrement=False
+    )
+    last_number: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class InvoiceIdempotencyKey(Base):
+    """Client-generated key of a create request; a replayed request returns the invoice created first"""
+    __tablename__ = "invoice_idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_invoice_idempotency_user_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    key: Mapped[str] = mapped_column(String(64), nullable=False)
+    invoice_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("invoices.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
     )
 
 
 class Invoice(Base):
     """Invoice model representing sales documents"""
     __tablename__ = "invoices"
+    __table_args__ = (
+        UniqueConstraint("shop_id", "number", name="uq_invoices_shop_number"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # Per-shop human-facing number allocated from InvoiceSequence
+    number: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
-        server_default=func.now()
+        server_default=func.now(),
+        index=True
     )
     contact_info: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     additional_info: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -94,6 +163,8 @@ class Invoice(Base):
         default=0
     )
     is_paid: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Bumped on every update, used to key rendered documents
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
     # Foreign Keys
     shop_id: Mapped[int] = mapped_column(
@@ -110,10 +181,12 @@ class Invoice(Base):
     # Relationships
     shop: Mapped["Shop"] = relationship("Shop", back_populates="invoices")
     user: Mapped["User"] = relationship("User", back_populates="invoices")
+    # Rows are removed by ON DELETE CASCADE; unloaded items are never fetched just to delete them
     items: Mapped[List["InvoiceItem"]] = relationship(
         "InvoiceItem",
         back_populates="invoice",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
 
@@ -145,6 +218,97 @@ class InvoiceItem(Base):
         ForeignKey("invoices.id", ondelete="CASCADE"),
         nullable=False
     )
+    # The name column stays as a snapshot, product_id links to the catalog
+    product_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("products.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True
+    )
+
+    # Relationship
+    invoice: Mapped["Invoice"] = relationship("Invoice", back_populates="items")
+
+
+class ArchivedInvoice(Base):
+    """Cold copy of an invoice moved out of the hot table by the archival job"""
+    __tablename__ = "invoices_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    number: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    contact_info: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    additional_info: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    total_amount: Mapped[float] = mapped_column(
+        Numeric(10, 2),
+        nullable=False,
+        default=0
+    )
+    is_paid: Mapped[bool] = mapped_column(Boolean, default=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
+    # Foreign Keys
+    shop_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("shops.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    user_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    # Relationships
+    shop: Mapped["Shop"] = relationship("Shop")
+    user: Mapped["User"] = relationship("User")
+    items: Mapped[List["ArchivedInvoiceItem"]] = relationship(
+        "ArchivedInvoiceItem",
+        back_populates="invoice",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+
+class ArchivedInvoiceItem(Base):
+    """Cold copy of an invoice item"""
+    __tablename__ = "invoice_items_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    quantity: Mapped[float] = mapped_column(
+        Numeric(10, 3),
+        nullable=False,
+        default=1
+    )
+    price: Mapped[float] = mapped_column(
+        Numeric(10, 2),
+        nullable=False,
+        default=0
+    )
+    total: Mapped[float] = mapped_column(
+        Numeric(10, 2),
+        nullable=False,
+        default=0
+    )
+
+    # Foreign Key
+    invoice_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("invoices_archive.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    product_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("products.id", ondelete="SET NULL"),
+        nullable=True
+    )
 
     # Relationship
-    invoice: Mapped["Invoice"] = relationship("Invoice", back_populates="items")
\ No newline at end of file
+    invoice: Mapped["ArchivedInvoice"] = relationship("ArchivedInvoice", back_populates="items")
\ No newline at end of file
@@ -110,10 +110,15 @@ class InvoiceFilter(BaseModelConfig):
     created_before: Optional[datetime] = None
     min_amount: Optional[float] = None
     max_amount: Optional[float] = None
+    # Substring of the per-shop invoice number
+    number_contains: Optional[str] = None
+    contact: Optional[str] = None
+    include_archived: bool = False
 
 
 class InvoiceResponse(BaseModel):
     id: int
+    number: Optional[int] = None
     created_at: datetime
     contact_info: Optional[str] = None
     additional_info: Optional[str] = None
@@ -127,6 +132,26 @@ class InvoiceResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class InvoiceNumberPreview(BaseModel):
+    """Number the next invoice is expected to get; nothing is reserved"""
+    shop_id: int
+    number: int
+
+
+class ItemSuggestion(BaseModel):
+    name: str
+    price: float
+    uses: int
+
+
+class ProductStats(BaseModel):
+    product_id: int
+    name: str
+    quantity: float
+    revenue: float
+    invoices: int
+
+
 class InvoiceItemUpdate(BaseModel):
     name: str
     quantity: float
@@ -0,0 +1,160 @@
+import asyncio
+import heapq
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.product_crud import normalize_product_name as normalize_name
+from app.models.models import Invoice, InvoiceItem
+
+
+class ShopPrefixIndex:
+    """Item names of one shop kept in sorted order for prefix lookups, ranked by frequency"""
+
+    # Results for very short prefixes cover most of the index, so they are memoised
+    CACHED_PREFIX_LENGTH = 2
+    CACHED_RESULTS = 50
+
+    def __init__(self):
+        self.keys: List[str] = []
+        # key -> [display name, uses, last price]
+        self.entries: Dict[str, List[Any]] = {}
+        self.loaded_at = time.monotonic()
+        self._short_prefix_cache: Dict[str, List[Dict[str, Any]]] = {}
+
+    def load(self, rows: Iterable[Any]) -> None:
+        """Bulk fill from (name, uses, last price) rows, sorting the keys once"""
+        for name, uses, price in rows:
+            key = normalize_name(name)
+            if key and key not in self.entries:
+                self.entries[key] = [name.strip(), uses, float(price)]
+            elif key:
+                self.entries[key][1] += uses
+        self.keys = sorted(self.entries)
+        self._short_prefix_cache.clear()
+
+    def add(self, name: str, price: float, uses: int = 1) -> None:
+        key = normalize_name(name)
+        if not key:
+            return
+
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [name.strip(), uses, price]
+            insort(self.keys, key)
+        else:
+            entry[0] = name.strip()
+            entry[1] += uses
+            entry[2] = price
+
+        for length in range(1, self.CACHED_PREFIX_LENGTH + 1):
+            self._short_prefix_cache.pop(key[:length], None)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        key = normalize_name(prefix)
+        if not key:
+            return []
+
+        cacheable = len(key) <= self.CACHED_PREFIX_LENGTH
+        if cacheable and key in self._short_prefix_cache:
+            return self._short_prefix_cache[key][:limit]
+
+        start = bisect_left(self.keys, key)
+        end = bisect_left(self.keys, key + "\uffff", lo=start)
+        top = heapq.nlargest(
+            max(limit, self.CACHED_RESULTS) if cacheable else limit,
+            self.keys[start:end],
+            key=lambda k: self.entries[k][1]
+        )
+        suggestions = [
+            {"name": self.entries[k][0], "price": float(self.entries[k][2]), "uses": self.entries[k][1]}
+            for k in top
+        ]
+
+        if cacheable:
+            self._short_prefix_cache[key] = suggestions
+        return suggestions[:limit]
+
+
+class AutocompleteRegistry:
+    """Lazily loaded per-shop indexes with LRU eviction of cold shops"""
+
+    def __init__(self, max_shops: int, ttl_seconds: int):
+        self.max_shops = max_shops
+        self.ttl_seconds = ttl_seconds
+        self._indexes: "OrderedDict[int, ShopPrefixIndex]" = OrderedDict()
+        self._loading: Dict[int, asyncio.Future] = {}
+
+    async def _load(self, session: AsyncSession, shop_id: int) -> ShopPrefixIndex:
+        stats = select(
+            InvoiceItem.name,
+            func.count().label("uses"),
+            func.max(InvoiceItem.id).label("last_id")
+        ).join(
+            Invoice, Invoice.id == InvoiceItem.invoice_id
+        ).where(
+            Invoice.shop_id == shop_id
+        ).group_by(InvoiceItem.name).subquery()
+
+        query = select(stats.c.name, stats.c.uses, InvoiceItem.price).join(
+            InvoiceItem, InvoiceItem.id == stats.c.last_id
+        )
+        result = await session.execute(query)
+
+        index = ShopPrefixIndex()
+        index.load(result.all())
+        return index
+
+    async def get(self, session: AsyncSession, shop_id: int) -> ShopPrefixIndex:
+        index = self._indexes.get(shop_id)
+        # Stale indexes are reloaded so changes made through other workers show up
+        if index is not None and time.monotonic() - index.loaded_at < self.ttl_seconds:
+            self._indexes.move_to_end(shop_id)
+            return index
+
+        pending = self._loading.get(shop_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[shop_id] = future
+        try:
+            index = await self._load(session, shop_id)
+            self._indexes[shop_id] = index
+            self._indexes.move_to_end(shop_id)
+            while len(self._indexes) > self.max_shops:
+                self._indexes.popitem(last=False)
+            future.set_result(index)
+            return index
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; mark it retrieved so it is not logged as unhandled
+            future.exception()
+            raise
+        finally:
+            del self._loading[shop_id]
+
+    def record_items(self, shop_id: int, items: Iterable[Any]) -> None:
+        """Feed freshly saved items into an already loaded index"""
+        index = self._indexes.get(shop_id)
+        if index is None:
+            return
+        for item in items:
+            index.add(item.name, float(item.price))
+
+    def evict(self, shop_id: Optional[int] = None) -> None:
+        if shop_id is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(shop_id, None)
+
+
+autocomplete_registry = AutocompleteRegistry(
+    max_shops=settings.AUTOCOMPLETE_MAX_SHOPS,
+    ttl_seconds=settings.AUTOCOMPLETE_TTL_SECONDS
+)
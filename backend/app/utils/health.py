@@ -0,0 +1,153 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a periodic sleeper.
+
+    Readiness uses recent_ms, the median of the last few samples: a single
+    blocking call shows up in one sample only and does not take the worker out
+    of rotation, while lag lasting over half of the recent window does. max_ms
+    over the whole window is only reported.
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 20, recent: int = 3):
+        self.interval = interval
+        self.recent = recent
+        self._samples: deque = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def current_ms(self) -> float:
+        return self._samples[-1] * 1000 if self._samples else 0.0
+
+    @property
+    def recent_ms(self) -> float:
+        recent = list(self._samples)[-self.recent:]
+        return statistics.median(recent) * 1000 if recent else 0.0
+
+    @property
+    def max_ms(self) -> float:
+        return max(self._samples) * 1000 if self._samples else 0.0
+
+
+def pool_status(engine_instance: AsyncEngine) -> Dict[str, Any]:
+    """Checked-out and overflow counts of the engine pool, where the pool keeps them"""
+    pool = engine_instance.pool
+    if not hasattr(pool, "checkedout"):
+        return {"class": type(pool).__name__}
+
+    size = pool.size()
+    max_overflow = getattr(pool, "_max_overflow", 0)
+    checked_out = pool.checkedout()
+    return {
+        "class": type(pool).__name__,
+        "size": size,
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": max_overflow,
+        # A negative max_overflow means the pool is unbounded
+        "saturated": max_overflow >= 0 and checked_out >= size + max_overflow
+    }
+
+
+class ReadinessProbe:
+    """
+    Readiness check of one worker: event-loop lag, pool saturation and a timed
+    SELECT 1. The result is cached for a short window and concurrent probes
+    share one check, so load balancer polling does not add database load.
+    """
+
+    def __init__(self, engine_instance: AsyncEngine, lag_monitor: LoopLagMonitor):
+        self.engine = engine_instance
+        self.lag_monitor = lag_monitor
+        self._result: Optional[Tuple[bool, Dict[str, Any]]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _select_one(self) -> None:
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _database_round_trip(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            # Covers waiting for a pooled connection as well as the query itself
+            await asyncio.wait_for(self._select_one(), timeout=settings.HEALTH_DB_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return {"status": "timeout"}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+        return {"status": "connected", "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    async def _check(self) -> Tuple[bool, Dict[str, Any]]:
+        pool = pool_status(self.engine)
+        loop_lag = {
+            "current_ms": round(self.lag_monitor.current_ms, 2),
+            "recent_ms": round(self.lag_monitor.recent_ms, 2),
+            "max_ms": round(self.lag_monitor.max_ms, 2)
+        }
+        reasons = []
+
+        if pool.get("saturated"):
+            # Waiting for a connection would only queue the probe behind real requests
+            database = {"status": "skipped"}
+            reasons.append("pool saturated")
+        else:
+            database = await self._database_round_trip()
+            if database["status"] != "connected":
+                reasons.append(f"database {database['status']}")
+            elif database["latency_ms"] > settings.HEALTH_MAX_DB_LATENCY_MS:
+                reasons.append("database slow")
+
+        if loop_lag["recent_ms"] > settings.HEALTH_MAX_LOOP_LAG_MS:
+            reasons.append("event loop lagging")
+
+        ready = not reasons
+        return ready, {
+            "status": "ready" if ready else "not ready",
+            "reasons": reasons,
+            "database": database,
+            "pool": pool,
+            "event_loop_lag": loop_lag
+        }
+
+    async def check(self) -> Tuple[bool, Dict[str, Any]]:
+        async with self._lock:
+            age = time.monotonic() - self._checked_at
+            if self._result is None or age >= settings.HEALTH_CACHE_SECONDS:
+                self._result = await self._check()
+                self._checked_at = time.monotonic()
+                age = 0.0
+
+        ready, body = self._result
+        return ready, {**body, "cached_for_s": round(age, 2)}
@@ -0,0 +1,240 @@
+import asyncio
+import io
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from app.core.config import settings
+
+FONT_NAME = 'DejaVu'
+
+_styles: Optional[Dict[str, ParagraphStyle]] = None
+_pool: Optional[ProcessPoolExecutor] = None
+_cache: Optional["PDFCache"] = None
+
+
+def register_font(font_path: str) -> None:
+    """Register the Cyrillic-capable TTF font once per process"""
+    if FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return
+    if not os.path.exists(font_path):
+        raise FileNotFoundError(f"Font not found: {font_path}")
+    pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+
+
+def _get_styles(font_path: str) -> Dict[str, ParagraphStyle]:
+    """Register the font and build paragraph styles once per worker process"""
+    global _styles
+    if _styles is None:
+        register_font(font_path)
+
+        base = getSampleStyleSheet()
+        normal = ParagraphStyle('CustomNormal', parent=base['Normal'], fontName=FONT_NAME,
+                                fontSize=12, spaceBefore=6, spaceAfter=6)
+        _styles = {
+            'header': ParagraphStyle('CustomHeader', parent=base['Heading1'], fontName=FONT_NAME,
+                                     fontSize=16, spaceAfter=30, alignment=1),
+            'normal': normal,
+            'total': ParagraphStyle('Total', parent=normal, fontSize=14, alignment=2),
+        }
+    return _styles
+
+
+def invoice_table_style() -> TableStyle:
+    return TableStyle([
+        ('FONT', (0, 0), (-1, -1), FONT_NAME),
+        ('FONTSIZE', (0, 0), (-1, -1), 12),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 2, colors.black),
+        ('LINEABOVE', (0, 1), (-1, 1), 2, colors.black),
+        ('LINEBEFORE', (1, 1), (1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('ALIGN', (1, 1), (1, -1), 'LEFT'),
+        ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+    ])
+
+
+def invoice_elements(invoice_data: Dict[str, Any], styles: Dict[str, ParagraphStyle]) -> list:
+    """Flowables for one invoice, same layout as the client InMemoryPDFGenerator"""
+    elements = [
+        Paragraph("НАКЛАДНАЯ", styles['header']),
+        Paragraph(f"Номер: {invoice_data.get('number', '')}", styles['normal']),
+        Paragraph(f"Дата: {invoice_data.get('created_at', '')}", styles['normal']),
+        Paragraph(f"Контакт: {invoice_data.get('contact', '')}", styles['normal']),
+        Spacer(1, 0.5 * cm),
+    ]
+
+    if invoice_data.get('additional_info'):
+        elements.append(Paragraph("Дополнительная информация:", styles['normal']))
+        elements.append(Paragraph(invoice_data['additional_info'], styles['normal']))
+        elements.append(Spacer(1, 0.5 * cm))
+
+    table_data = [['№', 'Наименование', 'Количество', 'Цена', 'Сумма']]
+    for idx, item in enumerate(invoice_data.get('items', []), 1):
+        table_data.append([
+            str(idx),
+            item['name'],
+            str(item['quantity']),
+            f"{item['price']:.2f}",
+            f"{item['total']:.2f}"
+        ])
+
+    table = Table(table_data, colWidths=[1 * cm, 8 * cm, 3 * cm, 3 * cm, 3 * cm], repeatRows=1)
+    table.setStyle(invoice_table_style())
+    elements.append(table)
+    elements.append(Spacer(1, 0.5 * cm))
+
+    payment_status = "Оплачено" if invoice_data.get('is_paid') else "Не оплачено"
+    elements.append(Paragraph(f"Итого: {invoice_data.get('total', 0):.2f}", styles['total']))
+    elements.append(Paragraph(f"Статус оплаты: {payment_status}", styles['total']))
+    return elements
+
+
+def render_invoice_pdf(invoice_data: Dict[str, Any], font_path: str) -> bytes:
+    """Render one invoice to PDF bytes. Runs inside the process pool."""
+    styles = _get_styles(font_path)
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
+    doc.build(invoice_elements(invoice_data, styles))
+    return buffer.getvalue()
+
+
+def invoice_to_render_data(invoice) -> Dict[str, Any]:
+    """Plain, picklable representation of an Invoice/ArchivedInvoice for the renderer"""
+    return {
+        'number': invoice.number or invoice.id,
+        'created_at': invoice.created_at.strftime("%Y-%m-%d") if invoice.created_at else '',
+        'contact': invoice.contact_info or '',
+        'additional_info': invoice.additional_info or '',
+        'total': float(invoice.total_amount or 0),
+        'is_paid': bool(invoice.is_paid),
+        'items': [
+            {
+                'name': item.name,
+                'quantity': Decimal(str(item.quantity)).normalize(),
+                'price': float(item.price),
+                'total': float(item.total),
+            }
+            for item in invoice.items
+        ]
+    }
+
+
+class PDFCache:
+    """On-disk cache of rendered PDFs with LRU eviction by total size"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+
+        os.makedirs(directory, exist_ok=True)
+        # Rebuild recency from modification times left by previous workers
+        files = [entry for entry in os.scandir(directory) if entry.is_file() and entry.name.endswith('.pdf')]
+        for entry in sorted(files, key=lambda e: e.stat().st_mtime):
+            size = entry.stat().st_size
+            self._entries[entry.name] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def file_name(invoice_id: int, version: int) -> str:
+        return f"invoice_{invoice_id}_v{version}.pdf"
+
+    def get(self, invoice_id: int, version: int) -> Optional[str]:
+        """Return the cached file path and mark it as recently used"""
+        name = self.file_name(invoice_id, version)
+        path = os.path.join(self.directory, name)
+        if name not in self._entries:
+            if not os.path.exists(path):
+                return None
+            # Rendered by another worker sharing the directory
+            self._entries[name] = os.path.getsize(path)
+            self.total_bytes += self._entries[name]
+        elif not os.path.exists(path):
+            self._forget(name)
+            return None
+
+        self._entries.move_to_end(name)
+        os.utime(path)
+        return path
+
+    def put(self, invoice_id: int, version: int, content: bytes) -> str:
+        """Store a rendered PDF, drop stale versions and evict down to max_bytes"""
+        prefix = f"invoice_{invoice_id}_v"
+        for stale in [name for name in self._entries if name.startswith(prefix)]:
+            self._remove(stale)
+
+        name = self.file_name(invoice_id, version)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        self._entries[name] = len(content)
+        self.total_bytes += len(content)
+
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+        return path
+
+    def _forget(self, name: str) -> None:
+        self.total_bytes -= self._entries.pop(name, 0)
+
+    def _remove(self, name: str) -> None:
+        self._forget(name)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def get_pdf_cache() -> PDFCache:
+    global _cache
+    if _cache is None:
+        _cache = PDFCache(settings.PDF_CACHE_DIR, settings.PDF_CACHE_MAX_BYTES)
+    return _cache
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PDF_RENDER_WORKERS)
+    return _pool
+
+
+async def render_invoice_cached(invoice) -> str:
+    """Return the path of the cached PDF for an invoice, rendering it if needed"""
+    cache = get_pdf_cache()
+    version = getattr(invoice, 'version', 1) or 1
+    path = cache.get(invoice.id, version)
+    if path:
+        return path
+
+    loop = asyncio.get_running_loop()
+    content = await loop.run_in_executor(
+        get_pdf_pool(), render_invoice_pdf, invoice_to_render_data(invoice), settings.PDF_FONT_PATH
+    )
+    return cache.put(invoice.id, version, content)
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
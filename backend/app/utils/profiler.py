@@ -0,0 +1,85 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Tuple
+
+# Leaf functions of a thread that is waiting rather than running Python code
+IDLE_FUNCTIONS = {"select", "poll", "epoll", "kqueue", "control", "wait", "_worker", "accept"}
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that snapshots the stacks of all other threads with
+    sys._current_frames() at a fixed interval. The profiled threads are never
+    interrupted or traced, so the cost is one stack walk per thread per sample.
+    """
+
+    def __init__(self, interval: float = 0.01, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self._labels: Dict[object, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _sample(self, own_thread_id: int, thread_names: Dict[int, str]) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            if not self.include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> None:
+        """Sample for the given number of seconds; blocks the calling thread"""
+        own_thread_id = threading.get_ident()
+        cpu_started = time.thread_time()
+        started = time.perf_counter()
+        deadline = started + seconds
+        next_sample = started
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                time.sleep(next_sample - now)
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._sample(own_thread_id, thread_names)
+            next_sample += self.interval
+
+        self.wall_seconds = time.perf_counter() - started
+        self.cpu_seconds = time.thread_time() - cpu_started
+
+    @property
+    def overhead(self) -> float:
+        """Share of one CPU spent by the sampler itself"""
+        return self.cpu_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl, speedscope and similar tools"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_threads(seconds: float, interval: float, include_idle: bool = False) -> Tuple[str, SamplingProfiler]:
+    profiler = SamplingProfiler(interval=interval, include_idle=include_idle)
+    profiler.run(seconds)
+    return profiler.collapsed(), profiler
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import tempfile
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+
+from app.core.config import settings
+from app.utils.pdf_renderer import FONT_NAME, register_font
+
+ChunkFetcher = Callable[[Optional[Any]], Awaitable[Tuple[List[Dict[str, Any]], Optional[Any]]]]
+
+
+class StatementWriter:
+    """
+    Draws a multi-invoice statement straight onto a canvas, page by page.
+
+    Unlike platypus documents nothing is laid out ahead of time: each invoice
+    is drawn as soon as it arrives, so only the current chunk of invoices and
+    no flowables are held in memory. The canvas still keeps every finished page
+    until save(), so memory grows linearly with the page count (about 7 MB
+    for 1,000 pages), and the file is complete only once the last page is drawn.
+    """
+
+    MARGIN = 2 * cm
+    LINE = 13
+    FONT_SIZE = 9
+
+    def __init__(self, path: str, title: str, subtitle_lines: List[str]):
+        self.canvas = Canvas(path, pagesize=A4, pageCompression=1)
+        self.width, self.height = A4
+        self.title = title
+        self.subtitle_lines = subtitle_lines
+        self.page = 0
+        self.y = 0.0
+
+        self.invoice_count = 0
+        self.total_amount = 0.0
+        self.paid_amount = 0.0
+
+        # Right edges of the item columns: quantity, price, sum
+        right = self.width - self.MARGIN
+        self.columns = (right - 7 * cm, right - 3.5 * cm, right)
+        self._start_page()
+
+    def _start_page(self) -> None:
+        if self.page:
+            self._draw_footer()
+            self.canvas.showPage()
+        self.page += 1
+        self.y = self.height - self.MARGIN
+
+        self.canvas.setFont(FONT_NAME, 14)
+        self.canvas.drawCentredString(self.width / 2, self.y, self.title)
+        self.y -= 2 * self.LINE
+        self.canvas.setFont(FONT_NAME, self.FONT_SIZE)
+        for line in self.subtitle_lines:
+            self.canvas.drawString(self.MARGIN, self.y, line)
+            self.y -= self.LINE
+        self.y -= self.LINE / 2
+
+    def _draw_footer(self) -> None:
+        self.canvas.setFont(FONT_NAME, 8)
+        self.canvas.drawRightString(self.width - self.MARGIN, self.MARGIN / 2, f"Страница {self.page}")
+
+    def _ensure_space(self, lines: int) -> None:
+        if self.y - lines * self.LINE < self.MARGIN:
+            self._start_page()
+
+    def _fit(self, text: str, max_width: float) -> str:
+        if stringWidth(text, FONT_NAME, self.FONT_SIZE) <= max_width:
+            return text
+        while text and stringWidth(text + '…', FONT_NAME, self.FONT_SIZE) > max_width:
+            text = text[:-1]
+        return text + '…'
+
+    def add_invoice(self, invoice: Dict[str, Any]) -> None:
+        items = invoice.get('items', [])
+        # Keep an invoice header together with at least its first item line
+        self._ensure_space(min(len(items), 1) + 2)
+
+        c = self.canvas
+        status = "Оплачено" if invoice.get('is_paid') else "Не оплачено"
+        c.setFont(FONT_NAME, self.FONT_SIZE + 1)
+        header = f"№ {invoice.get('number', '')}   {invoice.get('created_at', '')}   {invoice.get('contact', '')}"
+        c.drawString(self.MARGIN, self.y, self._fit(header, self.columns[1] - self.MARGIN))
+        c.drawRightString(self.columns[2], self.y, f"{status}   {invoice.get('total', 0):.2f}")
+        c.setFont(FONT_NAME, self.FONT_SIZE)
+        self.y -= self.LINE
+
+        name_width = self.columns[0] - self.MARGIN - 2 * cm
+        for item in items:
+            self._ensure_space(1)
+            c.drawString(self.MARGIN + 0.5 * cm, self.y, self._fit(item['name'], name_width))
+            c.drawRightString(self.columns[0], self.y, str(item['quantity']))
+            c.drawRightString(self.columns[1], self.y, f"{item['price']:.2f}")
+            c.drawRightString(self.columns[2], self.y, f"{item['total']:.2f}")
+            self.y -= self.LINE
+
+        c.line(self.MARGIN, self.y + self.LINE / 2, self.width - self.MARGIN, self.y + self.LINE / 2)
+        self.y -= self.LINE / 2
+
+        self.invoice_count += 1
+        self.total_amount += invoice.get('total', 0)
+        if invoice.get('is_paid'):
+            self.paid_amount += invoice.get('total', 0)
+
+    def finish(self) -> None:
+        self._ensure_space(4)
+        c = self.canvas
+        c.setFont(FONT_NAME, self.FONT_SIZE + 2)
+        self.y -= self.LINE
+        for label, value in (
+                ("Накладных", f"{self.invoice_count}"),
+                ("Итого", f"{self.total_amount:.2f}"),
+                ("Оплачено", f"{self.paid_amount:.2f}"),
+                ("К оплате", f"{self.total_amount - self.paid_amount:.2f}"),
+        ):
+            c.drawRightString(self.columns[1], self.y, f"{label}:")
+            c.drawRightString(self.columns[2], self.y, value)
+            self.y -= self.LINE + 2
+        self._draw_footer()
+        c.save()
+
+
+async def render_statement(
+        fetch_chunk: ChunkFetcher,
+        title: str,
+        subtitle_lines: List[str]
+) -> str:
+    """
+    Render a statement into a temporary file and return its path.
+
+    Drawing happens in a worker thread; every chunk of invoices is pulled from
+    the event loop on demand via fetch_chunk(cursor) -> (invoices, next_cursor).
+    Returns after the whole statement is rendered.
+    """
+    loop = asyncio.get_running_loop()
+    fd, path = tempfile.mkstemp(prefix="statement_", suffix=".pdf")
+    os.close(fd)
+
+    def build() -> None:
+        register_font(settings.PDF_FONT_PATH)
+        writer = StatementWriter(path, title, subtitle_lines)
+        cursor = None
+        while True:
+            invoices, cursor = asyncio.run_coroutine_threadsafe(fetch_chunk(cursor), loop).result()
+            if not invoices:
+                break
+            for invoice in invoices:
+                writer.add_invoice(invoice)
+        writer.finish()
+
+    try:
+        await loop.run_in_executor(None, build)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
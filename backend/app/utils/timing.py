@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.logging_setup import queued_file_logger
+
+# Order of the metrics in the Server-Timing header
+PHASES = ("auth", "acl", "sql", "deps", "handler", "serialize")
+
+_current: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+_trace_logger: Optional[logging.Logger] = None
+logger = logging.getLogger(__name__)
+
+
+class RequestTimings:
+    """Milliseconds spent in each phase of one request; phases may overlap (sql runs inside the others)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self.sql_queries = 0
+        self.total = 0.0
+
+    def add(self, phase: str, elapsed_ms: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed_ms
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = time.perf_counter()
+
+    def span(self, phase: str, start: str, end: str) -> None:
+        if start in self.marks and end in self.marks:
+            self.add(phase, (self.marks[end] - self.marks[start]) * 1000)
+
+    def finish(self) -> None:
+        self.total = (time.perf_counter() - self.started) * 1000
+
+    def header(self) -> str:
+        metrics = []
+        for phase in PHASES:
+            if phase not in self.phases:
+                continue
+            metric = f"{phase};dur={self.phases[phase]:.1f}"
+            if phase == "sql":
+                metric += f';desc="{self.sql_queries} queries"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={self.total:.1f}")
+        return ", ".join(metrics)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Add the duration of the block to a phase of the current request, if it is being timed"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, (time.perf_counter() - started) * 1000)
+
+
+def _query_finished(conn) -> None:
+    started = conn.info["query_started"].pop()
+    timings = _current.get()
+    if timings is not None:
+        timings.add("sql", (time.perf_counter() - started) * 1000)
+        timings.sql_queries += 1
+
+
+def install_sql_timing(engine_instance: AsyncEngine) -> None:
+    """Accumulate cursor execution time of the engine into the sql phase, failed queries included"""
+
+    @event.listens_for(engine_instance.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine_instance.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        _query_finished(conn)
+
+    @event.listens_for(engine_instance.sync_engine, "handle_error")
+    def handle_error(exception_context):
+        # A failed query gets no after_cursor_execute; without this its start
+        # time would stay on the connection, which the pool reuses
+        conn = exception_context.connection
+        if conn is not None and exception_context.cursor is not None and conn.info.get("query_started"):
+            _query_finished(conn)
+
+
+def _time_endpoint(endpoint: Callable) -> Callable:
+    if not asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def timed_endpoint(*args, **kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.mark("handler_started")
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timings is not None:
+                timings.mark("handler_finished")
+
+    return timed_endpoint
+
+
+class TimedRoute(APIRoute):
+    """
+    Route that splits its time into dependency resolution (JWT, session),
+    the endpoint itself and response validation/serialization.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _time_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def timed_route_handler(request: Request) -> Response:
+            timings = _current.get()
+            if timings is None:
+                return await route_handler(request)
+
+            timings.mark("route_started")
+            try:
+                return await route_handler(request)
+            finally:
+                timings.mark("route_finished")
+                timings.span("deps", "route_started", "handler_started")
+                timings.span("handler", "handler_started", "handler_finished")
+                timings.span("serialize", "handler_finished", "route_finished")
+
+        return timed_route_handler
+
+
+def _get_trace_logger() -> logging.Logger:
+    global _trace_logger
+    if _trace_logger is None:
+        _trace_logger = queued_file_logger("app.timing.traces", settings.TIMING_TRACE_FILE)
+    return _trace_logger
+
+
+def record_trace(request: Request, status_code: int, timings: RequestTimings) -> None:
+    """Append a sampled request, and every slow one, to the JSON-lines trace file"""
+    if timings.total < settings.TIMING_SLOW_MS and random.random() >= settings.TIMING_SAMPLE_RATE:
+        return
+    _get_trace_logger().info(json.dumps({
+        "ts": time.time(),
+        "method": request.method,
+        "path": request.url.path,
+        "status": status_code,
+        "total_ms": round(timings.total, 2),
+        "phases": {phase: round(value, 2) for phase, value in timings.phases.items()},
+        "sql_queries": timings.sql_queries
+    }))
+
+
+async def server_timing_middleware(request: Request, call_next: Callable) -> Response:
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+
+    timings.finish()
+    response.headers["Server-Timing"] = timings.header()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s %s %s %s", request.method, request.url.path, response.status_code, timings.header())
+    record_trace(request, response.status_code, timings)
+    return response
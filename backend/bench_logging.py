@@ -0,0 +1,117 @@
+"""
+Request throughput of the API with debug logging enabled.
+
+Drives the ASGI app in-process (no network, no database: /health/live) with a
+number of concurrent clients, and logs extra debug records per request the
+way request/response dumps do. Every mode writes with the configured
+LOG_FORMAT to a size-rotated file, so only the queue differs. Compared modes:
+
+    sync         - root logger writing straight to the rotated file
+    queued       - setup_logging() pipeline at DEBUG
+    queued-info  - setup_logging() pipeline at INFO, debug records filtered out
+
+The size counts the rotated backups too; records dropped by a full queue are
+reported, since a queued mode that drops records also writes less.
+
+Usage:
+    python bench_logging.py --requests 20000 --concurrency 50 --records 5
+"""
+import argparse
+import asyncio
+import glob
+import logging
+import os
+import tempfile
+import time
+
+from app.core.config import settings
+from app.core.logging_setup import (
+    DroppingQueueHandler, _build_formatter, rotating_file_handler, setup_logging, shutdown_logging
+)
+from run import app
+
+bench_logger = logging.getLogger("bench.requests")
+PAYLOAD = {"contact": "ИП Ахметов", "items": [{"name": "Хлеб", "quantity": 2, "price": 150.0}] * 10}
+
+
+def configure(mode: str, log_file: str) -> None:
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+    if mode == "sync":
+        root.addHandler(rotating_file_handler(log_file, _build_formatter(settings.LOG_FORMAT)))
+        root.setLevel(logging.DEBUG)
+    else:
+        setup_logging("DEBUG" if mode == "queued" else "INFO", log_file=log_file, console=False)
+
+
+async def call(path: str, records: int) -> None:
+    for n in range(records):
+        bench_logger.debug("request %s body %s", n, PAYLOAD)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0),
+        "server": ("bench", 80)
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def run_mode(mode: str, requests: int, concurrency: int, records: int) -> None:
+    fd, log_file = tempfile.mkstemp(prefix=f"bench_{mode}_", suffix=".log")
+    os.close(fd)
+    configure(mode, log_file)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait("/health/live")
+
+    async def client() -> None:
+        while not queue.empty():
+            await call(queue.get_nowait(), records)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    dropped = sum(handler.dropped for handler in logging.getLogger().handlers
+                  if isinstance(handler, DroppingQueueHandler))
+    shutdown_logging()
+    for handler in logging.getLogger().handlers:
+        handler.close()
+    # The active file plus its rotated backups (log_file.1, log_file.2, ...)
+    log_files = glob.glob(glob.escape(log_file) + "*")
+    size = sum(os.path.getsize(path) for path in log_files)
+    for path in log_files:
+        os.remove(path)
+    print(f"{mode:12} {requests / elapsed:8.0f} req/s  ({elapsed:.2f} s, {size / 1024 / 1024:.1f} MB logged, "
+          f"{dropped} records dropped)")
+
+
+async def main(args: argparse.Namespace) -> None:
+    for mode in args.modes:
+        await run_mode(mode, args.requests, args.concurrency, args.records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API throughput with debug logging")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--records", type=int, default=5, help="Extra debug records per request")
+    parser.add_argument("--modes", nargs="+", default=["sync", "queued", "queued-info"])
+    asyncio.run(main(parser.parse_args()))
@@ -1,10 +1,24 @@
+import logging
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.api.user_routers import auth_router
 from app.api.invoice_routers import router as invoice_router
-from app.core.config import init_db, cleanup_db
+from app.api.admin_routers import admin_router
+from app.core.config import engine, init_db, cleanup_db, settings
+from app.core.logging_setup import setup_logging
+from app.utils.health import LoopLagMonitor, ReadinessProbe
+from app.utils.pdf_renderer import shutdown_pdf_pool
+from app.utils.timing import install_sql_timing, server_timing_middleware
+
+setup_logging()
+logger = logging.getLogger("app")
+
+loop_lag_monitor = LoopLagMonitor()
+readiness_probe = ReadinessProbe(engine, loop_lag_monitor)
+install_sql_timing(engine)
 
 
 @asynccontextmanager
@@ -14,22 +28,25 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     try:
-        print("Starting up database connection...")
+        logger.info("Starting up database connection...")
         await init_db()
-        print("Database initialized successfully!")
+        logger.info("Database initialized successfully!")
+        loop_lag_monitor.start()
     except Exception as e:
-        print(f"Error initializing database: {e}")
+        logger.exception("Error initializing database: %s", e)
         raise
 
     yield
 
     # Shutdown
     try:
-        print("Cleaning up database connections...")
+        await loop_lag_monitor.stop()
+        logger.info("Cleaning up database connections...")
         await cleanup_db()
-        print("Cleanup completed!")
+        shutdown_pdf_pool()
+        logger.info("Cleanup completed!")
     except Exception as e:
-        print(f"Error during cleanup: {e}")
+        logger.exception("Error during cleanup: %s", e)
 
 
 app = FastAPI(
@@ -56,9 +73,13 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# Outermost, so "total" also covers CORS handling
+app.middleware("http")(server_timing_middleware)
+
 # Routers
 app.include_router(invoice_router)
 app.include_router(auth_router)
+app.include_router(admin_router)
 
 
 @app.get("/", tags=["Root"])
@@ -72,12 +93,17 @@ async def root():
 
 
 @app.get("/health", tags=["Health"])
+@app.get("/health/live", tags=["Health"])
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "database": "connected"
-    }
+    """Liveness: the process is up and serving requests, dependencies are not checked"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness: database round trip, pool saturation and event-loop lag, 503 when not ready"""
+    ready, body = await readiness_probe.check()
+    return JSONResponse(status_code=200 if ready else 503, content=body)
 
 
 if __name__ == "__main__":
@@ -86,6 +112,7 @@ if __name__ == "__main__":
         host="127.0.0.1",
         port=8000,
         reload=True,
-        log_level="debug",
+        log_level=settings.LOG_LEVEL.lower(),
+        log_config=None,  # uvicorn loggers go through setup_logging
         workers=1  # Убрана запятая
     )  # Комментарий перенесен за пределы параметров
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Filtering and sorting of HistoryView rows: the former chain of list
+comprehensions, re-parsing dates and totals per row, versus InvoiceFilterIndex.
+
+Rows are synthetic display rows in the format HistoryView builds from the API.
+
+Usage:
+    python bench_history_filter.py --rows 50000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from utils.invoice_index import InvoiceFilterIndex
+
+CONTACTS = ["ООО Ромашка", "ИП Петров", "Магазин у дома", "Анна", "Олег Иванович", "Склад 2"]
+
+
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    start = date(2024, 1, 1)
+    return [
+        {
+            'number': str(i + 1),
+            'date': (start + timedelta(days=random.randint(0, 700))).isoformat(),
+            'contact': f"{random.choice(CONTACTS)} {random.randint(1, 99)}",
+            'total': f"{random.uniform(10, 5000):.2f}",
+            'is_paid': random.random() < 0.5,
+            'shop_id': 1,
+            'is_pending': False
+        }
+        for i in range(count)
+    ]
+
+
+def filter_sequential(rows: List[Dict[str, Any]], f: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """What search_invoices did before the index"""
+    data = [row for row in rows if row.get('shop_id', 1) == 1]
+    if f.get('number'):
+        data = [row for row in data if f['number'] in row['number'].lower()]
+    if f.get('date_from'):
+        date_from = datetime.strptime(f['date_from'], "%Y-%m-%d")
+        data = [row for row in data if datetime.strptime(row['date'], "%Y-%m-%d") >= date_from]
+    if f.get('date_to'):
+        date_to = datetime.strptime(f['date_to'], "%Y-%m-%d")
+        data = [row for row in data if datetime.strptime(row['date'], "%Y-%m-%d") <= date_to]
+    if f.get('contact'):
+        data = [row for row in data if f['contact'] in row['contact'].lower()]
+    if f.get('min_total') is not None:
+        data = [row for row in data if float(row['total']) >= f['min_total']]
+    if f.get('max_total') is not None:
+        data = [row for row in data if float(row['total']) <= f['max_total']]
+    if f.get('is_paid') is not None:
+        data = [row for row in data if row['is_paid'] == f['is_paid']]
+    return data
+
+
+def filter_indexed(index: InvoiceFilterIndex, f: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return index.filter(
+        shop_id=1,
+        number=f.get('number'),
+        date_from=date.fromisoformat(f['date_from']) if f.get('date_from') else None,
+        date_to=date.fromisoformat(f['date_to']) if f.get('date_to') else None,
+        contact=f.get('contact'),
+        min_total=f.get('min_total'),
+        max_total=f.get('max_total'),
+        is_paid=f.get('is_paid')
+    )
+
+
+def measure(label: str, run: Callable[[], Any], repeat: int) -> None:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<34} median {statistics.median(timings):7.2f} ms   max {max(timings):7.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HistoryView filtering: list comprehensions vs column index")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(1)
+    rows = make_rows(args.rows)
+    filters = {
+        'date_from': '2024-03-01', 'date_to': '2025-03-01', 'contact': 'ип',
+        'min_total': 100.0, 'max_total': 4000.0, 'is_paid': False
+    }
+
+    started = time.perf_counter()
+    index = InvoiceFilterIndex(rows)
+    print(f"index build for {args.rows} rows: {(time.perf_counter() - started) * 1000:.1f} ms")
+    assert filter_indexed(index, filters) == filter_sequential(rows, filters)
+
+    measure("filter, list comprehensions", lambda: filter_sequential(rows, filters), args.repeat)
+    measure("filter, index single pass", lambda: filter_indexed(index, filters), args.repeat)
+    measure("sort by date, strptime key",
+            lambda: sorted(rows, key=lambda x: datetime.strptime(x['date'], "%Y-%m-%d"), reverse=True),
+            args.repeat)
+    measure("sort by date, cached order",
+            lambda: index.sort_rows(rows, 'date', True, None), args.repeat)
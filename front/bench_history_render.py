@@ -0,0 +1,93 @@
+"""
+Frame time of HistoryView under bursts of updates: a refresh scheduled per
+mutation (the former Clock.schedule_once(update_display) calls) versus the
+coalescing RenderScheduler.
+
+Each frame applies a burst of mutations, as when a page arrives while the list
+is sorted and filtered, and then runs one Clock tick. A render assigns the rows
+to a ListProperty like update_display does to the RecycleView's data, which
+copies them; layout and drawing are not included, so real frames differ more.
+
+Usage:
+    python bench_history_render.py --rows 5000 --burst 8
+"""
+import os
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+import argparse
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from kivy.config import Config
+
+# No frame rate cap, so a tick measures work rather than sleeping
+Config.set('graphics', 'maxfps', '0')
+
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.properties import ListProperty
+
+from utils.render_scheduler import RenderScheduler
+
+
+class InvoiceList(EventDispatcher):
+    """Stand-in for the RecycleView: its data is a ListProperty too"""
+    data = ListProperty()
+
+
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    return [
+        {'number': str(i + 1), 'date': '2025-01-01', 'contact': f"Контакт {i % 97}",
+         'total': f"{i * 1.5:.2f}", 'is_paid': i % 2 == 0, 'is_pending': False}
+        for i in range(count)
+    ]
+
+
+def run_frames(frames: int, burst: int, mutate: Callable[[], None]) -> List[float]:
+    timings = []
+    for _ in range(frames):
+        started = time.perf_counter()
+        for _ in range(burst):
+            mutate()
+        Clock.tick()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label: str, timings: List[float], renders: int, frames: int) -> None:
+    print(f"{label:<26} median {statistics.median(timings):7.2f} ms   max {max(timings):7.2f} ms"
+          f"   renders/frame {renders / frames:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HistoryView burst updates: per-mutation refresh vs coalesced")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--burst", type=int, default=8, help="mutations per frame")
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    invoice_list = InvoiceList()
+    renders = 0
+
+    def render(*_):
+        global renders
+        renders += 1
+        invoice_list.data = rows
+
+    Clock.tick()
+    timings = run_frames(args.frames, args.burst, lambda: Clock.schedule_once(render, 0))
+    report("refresh per mutation", timings, renders, args.frames)
+
+    renders = 0
+    scheduler = RenderScheduler(render, lambda: True)
+    timings = run_frames(args.frames, args.burst, scheduler.request)
+    report("coalesced scheduler", timings, renders, args.frames)
+
+    renders = 0
+    hidden = RenderScheduler(render, lambda: False)
+    timings = run_frames(args.frames, args.burst, hidden.request)
+    report("coalesced, screen hidden", timings, renders, args.frames)
@@ -0,0 +1,108 @@
+"""
+Latency of sequences of small API calls: a new connection and thread per call
+(what UrlRequest does) versus the pooled keep-alive HTTPTransport.
+
+A local HTTP/1.1 server answers every request with a small JSON body, so the
+numbers show per-call connection and thread overhead rather than server time.
+
+Usage:
+    python bench_http.py --calls 500
+    python bench_http.py --calls 200 --url http://localhost:8000/health/live
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+from urllib.parse import urlsplit
+
+from utils.http_transport import HTTPTransport
+
+BODY = json.dumps({"id": 1, "number": 1, "total_amount": 150.0, "is_paid": False}).encode()
+
+
+class SmallJSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def call_per_connection(url: str) -> None:
+    """New thread and new TCP connection per call, like UrlRequest"""
+    done = threading.Event()
+
+    def run():
+        parts = urlsplit(url)
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+        connection.request("GET", parts.path or "/")
+        json.loads(connection.getresponse().read())
+        connection.close()
+        done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    done.wait()
+
+
+def make_pooled_call(transport: HTTPTransport) -> Callable[[str], None]:
+    def call(url: str) -> None:
+        done = threading.Event()
+        transport.request(
+            url,
+            on_success=lambda req, result: done.set(),
+            on_failure=lambda req, result: done.set(),
+            on_error=lambda req, error: done.set()
+        )
+        done.wait()
+
+    return call
+
+
+def measure(name: str, call: Callable[[str], None], url: str, calls: int) -> None:
+    call(url)  # warm-up
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for _ in range(calls):
+        call_started = time.perf_counter()
+        call(url)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"{name:16} {calls} calls in {elapsed:.2f} s: median {statistics.median(latencies):.2f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call connections vs pooled keep-alive transport")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--url", default=None, help="Endpoint to call instead of the built-in server")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SmallJSONHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/invoices/1"
+
+    transport = HTTPTransport(deliver=lambda callback: callback())
+    try:
+        measure("per-call", call_per_connection, url, args.calls)
+        measure("pooled", make_pooled_call(transport), url, args.calls)
+    finally:
+        transport.close()
+        if server is not None:
+            server.shutdown()
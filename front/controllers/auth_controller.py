@@ -1,8 +1,11 @@
 import json
 from functools import partial
 from typing import Optional, Callable, Any
-from kivy.network.urlrequest import UrlRequest
+from front.utils.http_transport import TransportResponse
+from front.utils.invoice_cache import invoice_details_cache
+from front.utils.local_store import get_local_store
 from .base_api_controller import BaseAPIController
+from .sync_controller import get_sync_controller
 import logging
 import base64
 
@@ -15,6 +18,7 @@ class AuthAPIController(BaseAPIController):
         self.token: Optional[str] = None
         self.current_shop_id: Optional[int] = None
         self.last_invoice_id: Optional[int] = None
+        self.username: Optional[str] = None
         self.headers = {
             "Content-Type": "application/x-www-form-urlencoded"
         }
@@ -32,18 +36,29 @@ class AuthAPIController(BaseAPIController):
             payload = base64.urlsafe_b64decode(parts[1] + padding)
             return json.loads(payload)
         except Exception as e:
-            logger.warning(f"Failed to extract token payload: {e}")
+            logger.warning("Failed to extract token payload: %s", e)
             return {}
 
-    def _handle_token_response(self, req: UrlRequest, result: Any, success_callback: Optional[Callable[[Any], None]]):
+    def _handle_token_response(self, req: TransportResponse, result: Any, success_callback: Optional[Callable[[Any], None]]):
         """Handle successful token response (login/register)."""
         self.token = result.get('access_token')
+        # Another user may have logged in on this device
+        invoice_details_cache.clear()
 
         if self.token:
             # Extract payload directly from token
             payload = self._extract_token_payload(self.token)
             self.current_shop_id = payload.get("user_shop_id")
             self.last_invoice_id = payload.get("last_invoice_id")
+            self.username = payload.get("sub")
+
+            # Local pages and queued writes belong to the login that made them
+            store = get_local_store()
+            if store:
+                store.owner = self.username
+            sync_controller = get_sync_controller()
+            if sync_controller:
+                sync_controller.kick()
 
             logger.info(
                 f"Token received and processed. Shop ID: {self.current_shop_id}, Last Invoice ID: {self.last_invoice_id}")
@@ -74,7 +89,7 @@ class AuthAPIController(BaseAPIController):
         """
         login_url = "/api/v1/auth/token"
         form_data = f"username={username}&password={password}"
-        logger.debug(f"Attempting to login user: {username}")
+        logger.debug("Attempting to login user: %s", username)
 
         self._make_request(
             endpoint=login_url,
@@ -1,14 +1,48 @@
 # controllers/base_api_controller.py
 from typing import Callable, Optional, Dict, Any
-from kivy.network.urlrequest import UrlRequest
-from functools import partial
+from kivy.clock import Clock
+from front.utils.http_transport import RequestHandle, TransportResponse, get_transport
+from front.utils.invoice_cache import invoice_details_cache
+from front.utils.local_store import get_local_store
 import json
 import logging
+import time
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Request bodies are cut to this many characters in debug output
+MAX_LOGGED_BODY = 500
+
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """'sql;dur=12.3;desc="4 queries", total;dur=20.1' -> {'sql': 12.3, 'total': 20.1}"""
+    phases = {}
+    for metric in (header or "").split(","):
+        name, *params = [part.strip() for part in metric.split(";")]
+        for param in params:
+            if param.startswith("dur="):
+                try:
+                    phases[name] = float(param[4:])
+                except ValueError:
+                    pass
+    return phases
+
+
+class APIError(str):
+    """Error message passed to error callbacks, carrying the HTTP status (None if the server was not reached)"""
+
+    def __new__(cls, message: str, status: Optional[int] = None):
+        error = super().__new__(cls, message)
+        error.status = status
+        return error
+
+
+def is_retryable_error(error: Any) -> bool:
+    """True for failures worth replaying later: no connection, timeouts, rate limiting and server errors"""
+    if not isinstance(error, APIError):
+        return False
+    return error.status is None or error.status in (408, 429) or error.status >= 500
 
 
 class BaseAPIController:
@@ -24,12 +58,31 @@ class BaseAPIController:
         }
         if self.auth_controller and getattr(self.auth_controller, 'token', None):
             headers["Authorization"] = f"Bearer {self.auth_controller.token}"
-        logger.debug(f"Generated headers: {headers}")
         return headers
 
-    def _handle_error(self, req: UrlRequest, error: Exception, error_callback: Optional[Callable[[str], None]]):
+    def _log_timing(self, req: TransportResponse, method: str, endpoint: str, started: float):
+        """Log the client-side duration next to the server's Server-Timing breakdown."""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        # No status when the request failed in the transport, without a response
+        status = req.resp_status if req.resp_status is not None else "failed"
+        headers = {key.lower(): value for key, value in (req.resp_headers or {}).items()}
+        server = parse_server_timing(headers.get("server-timing"))
+        if not server:
+            logger.info("%s %s %s: %.0f ms", method, endpoint, status, elapsed)
+            return
+
+        breakdown = " ".join(f"{name}={value:.1f}" for name, value in server.items() if name != "total")
+        server_total = server.get("total", 0.0)
+        logger.info(
+            "%s %s %s: %.0f ms, server %.1f ms [%s], network and client %.0f ms",
+            method, endpoint, status, elapsed, server_total, breakdown, max(elapsed - server_total, 0.0)
+        )
+
+    def _handle_error(self, req: TransportResponse, error: Exception, error_callback: Optional[Callable[[str], None]]):
         """Handle errors from HTTP requests."""
-        logger.error(f"Request error: {error}")
+        logger.error("Request error: %s", error)
         error_message = str(error)
 
         if req.result:
@@ -41,7 +94,7 @@ class BaseAPIController:
                     error_data = json.loads(req.result)
                     error_message = error_data.get('detail', error_message)
                 else:
-                    logger.warning(f"Unexpected result type: {type(req.result)}")
+                    logger.warning("Unexpected result type: %s", type(req.result))
             except json.JSONDecodeError:
                 logger.warning("Failed to decode error response as JSON")
             except Exception as e:
@@ -49,7 +102,76 @@ class BaseAPIController:
                 error_message = f"Error processing response: {str(e)}"
 
         if error_callback:
-            error_callback(error_message)
+            error_callback(APIError(error_message, req.resp_status))
+
+    def _fetch_invoice_details(
+            self,
+            invoice_id: int,
+            success_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+            error_callback: Optional[Callable[[str], None]] = None,
+            revalidated_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        """
+        Serve invoice details from the shared cache when possible.
+
+        A cached copy is delivered right away; if it is older than the cache's
+        fresh window it is revalidated in the background and revalidated_callback
+        receives the server copy when it differs.
+        """
+        cached = invoice_details_cache.get(invoice_id)
+        if cached is not None:
+            payload, age = cached
+            logger.debug("Invoice %s served from cache (%.1f s old)", invoice_id, age)
+            if success_callback:
+                Clock.schedule_once(lambda dt: success_callback(payload), 0)
+            if age < invoice_details_cache.fresh_seconds:
+                return
+
+        generation = invoice_details_cache.generation(invoice_id)
+
+        def on_loaded(req, result):
+            if not isinstance(result, dict):
+                logger.error("Unexpected response format: %s", result)
+                if cached is None and error_callback:
+                    error_callback("Unexpected response format from server")
+                return
+            invoice_details_cache.put(invoice_id, result, generation)
+            if cached is None:
+                if success_callback:
+                    success_callback(result)
+            elif result != cached[0] and revalidated_callback:
+                revalidated_callback(result)
+
+        def on_failed(error):
+            if cached is None:
+                if error_callback:
+                    error_callback(error)
+            else:
+                logger.warning("Revalidation of invoice %s failed: %s", invoice_id, error)
+
+        self._make_request(
+            endpoint=f"/api/v1/invoices/{invoice_id}",
+            method='GET',
+            headers=self._get_headers(),
+            success_callback=on_loaded,
+            error_callback=on_failed
+        )
+
+    @staticmethod
+    def _invalidate_invoice(invoice_id: Any) -> None:
+        """Drop the cached details of an invoice changed or deleted through this client"""
+        try:
+            invoice_details_cache.invalidate(int(invoice_id))
+        except (TypeError, ValueError):
+            pass
+
+    @classmethod
+    def _forget_deleted_invoice(cls, invoice_id: Any) -> None:
+        """Drop a deleted invoice from the details cache and the local store"""
+        cls._invalidate_invoice(invoice_id)
+        store = get_local_store()
+        if store:
+            store.forget_invoice(invoice_id)
 
     def _make_request(
             self,
@@ -57,21 +179,41 @@ class BaseAPIController:
             method: str = 'GET',
             req_body: Optional[str] = None,
             headers: Optional[Dict[str, str]] = None,
-            success_callback: Optional[Callable[[UrlRequest, Any], None]] = None,
+            success_callback: Optional[Callable[[TransportResponse, Any], None]] = None,
             error_callback: Optional[Callable[[str], None]] = None
-    ):
-        """General method to make HTTP requests."""
+    ) -> RequestHandle:
+        """General method to make HTTP requests over the shared keep-alive transport."""
         url = f"{self.base_url}{endpoint}"
-        logger.debug(f"Making {method} request to {url}")
-        logger.debug(f"Request body: {req_body}")
-        logger.debug(f"Request headers: {headers or self._get_headers()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            body = req_body if isinstance(req_body, str) else repr(req_body)
+            logged_headers = {
+                key: ("***" if key.lower() == "authorization" else value)
+                for key, value in (headers or self._get_headers()).items()
+            }
+            logger.debug("Making %s request to %s, headers %s, body %s",
+                         method, url, logged_headers, body[:MAX_LOGGED_BODY])
+
+        started = time.perf_counter()
+
+        def on_success(req, result):
+            self._log_timing(req, method, endpoint, started)
+            if success_callback:
+                success_callback(req, result)
 
-        UrlRequest(
+        def on_failure(req, error):
+            self._log_timing(req, method, endpoint, started)
+            self._handle_error(req, error, error_callback=error_callback)
+
+        def on_error(req, error):
+            self._log_timing(req, method, endpoint, started)
+            self._handle_error(req, error, error_callback=error_callback)
+
+        return get_transport().request(
             url,
-            req_body=req_body,
             method=method,
-            req_headers=headers or self._get_headers(),
-            on_success=lambda req, result: success_callback(req, result) if success_callback else None,
-            on_error=partial(self._handle_error, error_callback=error_callback),
-            on_failure=partial(self._handle_error, error_callback=error_callback)
-        )
+            body=req_body,
+            headers=headers or self._get_headers(),
+            on_success=on_success,
+            on_failure=on_failure,
+            on_error=on_error
+        )
\ No newline at end of file
@@ -59,8 +59,8 @@ class HistoryAPIController(BaseAPIController):
         query_string = self._prepare_filters(filters)
         if query_string:
             endpoint += query_string
-            logger.debug(f"Fetching invoices with filters: {filters}")
-            logger.debug(f"Constructed endpoint: {endpoint}")
+            logger.debug("Fetching invoices with filters: %s", filters)
+            logger.debug("Constructed endpoint: %s", endpoint)
 
         def success_wrapper(req, result):
             """Handle successful response with format validation"""
@@ -69,15 +69,15 @@ class HistoryAPIController(BaseAPIController):
                     if isinstance(result, (list, dict)):
                         success_callback(result)
                     else:
-                        logger.error(f"Unexpected response format: {result}")
+                        logger.error("Unexpected response format: %s", result)
                         if error_callback:
                             error_callback("Unexpected response format from server")
             except Exception as e:
-                logger.error(f"Error in success callback: {e}")
+                logger.error("Error in success callback: %s", e)
                 if error_callback:
                     error_callback(str(e))
 
-        self._make_request(
+        return self._make_request(
             endpoint=endpoint,
             method='GET',
             headers=self._get_headers(),
@@ -110,7 +110,7 @@ class HistoryAPIController(BaseAPIController):
         if query_string:
             endpoint += query_string
 
-        logger.debug(f"Fetching invoice stats with filters: {filters}")
+        logger.debug("Fetching invoice stats with filters: %s", filters)
 
         def success_wrapper(req, result):
             """Handle successful response with format validation"""
@@ -119,11 +119,11 @@ class HistoryAPIController(BaseAPIController):
                     if isinstance(result, dict):
                         success_callback(result)
                     else:
-                        logger.error(f"Unexpected response format: {result}")
+                        logger.error("Unexpected response format: %s", result)
                         if error_callback:
                             error_callback("Unexpected response format from server")
             except Exception as e:
-                logger.error(f"Error in success callback: {e}")
+                logger.error("Error in success callback: %s", e)
                 if error_callback:
                     error_callback(str(e))
 
@@ -154,11 +154,11 @@ class HistoryAPIController(BaseAPIController):
                             self.auth_controller.last_invoice_id = result.get('id')
                         success_callback(result)
                     else:
-                        logger.error(f"Unexpected response format: {result}")
+                        logger.error("Unexpected response format: %s", result)
                         if error_callback:
                             error_callback("Unexpected response format from server")
             except Exception as e:
-                logger.error(f"Error in success callback: {e}")
+                logger.error("Error in success callback: %s", e)
                 if error_callback:
                     error_callback(str(e))
 
@@ -183,10 +183,13 @@ class HistoryAPIController(BaseAPIController):
             return
 
         endpoint = f"/api/v1/invoices/{invoice_id}"
-        logger.debug(f"Attempting to delete invoice with ID: {invoice_id}")
+        logger.debug("Attempting to delete invoice with ID: %s", invoice_id)
+
+        self._invalidate_invoice(invoice_id)
 
         def success_wrapper(req, result):
             """Handle successful deletion and update last_invoice_id if needed"""
+            self._forget_deleted_invoice(invoice_id)
             if self.auth_controller and hasattr(self.auth_controller, 'last_invoice_id'):
                 if self.auth_controller.last_invoice_id == invoice_id:
                     self.auth_controller.last_invoice_id = None
@@ -205,36 +208,73 @@ class HistoryAPIController(BaseAPIController):
             self,
             invoice_id: int,
             success_callback: Optional[Callable[[Any], None]] = None,
-            error_callback: Optional[Callable[[str], None]] = None
+            error_callback: Optional[Callable[[str], None]] = None,
+            revalidated_callback: Optional[Callable[[Any], None]] = None
     ):
-        """Retrieve detailed information about a specific invoice."""
+        """Retrieve detailed information about a specific invoice, cached client-side."""
         if not isinstance(invoice_id, int):
             if error_callback:
                 error_callback("Invalid invoice ID")
             return
 
-        endpoint = f"/api/v1/invoices/{invoice_id}"
-        logger.debug(f"Fetching details for invoice ID: {invoice_id}")
+        logger.debug("Fetching details for invoice ID: %s", invoice_id)
 
-        def success_wrapper(req, result):
-            """Handle successful response with format validation"""
+        def success_wrapper(result):
+            """Run the callback, reporting its failures like the other requests"""
             try:
                 if success_callback:
-                    if isinstance(result, dict):
-                        success_callback(result)
-                    else:
-                        logger.error(f"Unexpected response format: {result}")
-                        if error_callback:
-                            error_callback("Unexpected response format from server")
+                    success_callback(result)
             except Exception as e:
-                logger.error(f"Error in success callback: {e}")
+                logger.error("Error in success callback: %s", e)
                 if error_callback:
                     error_callback(str(e))
 
+        self._fetch_invoice_details(
+            invoice_id,
+            success_callback=success_wrapper,
+            error_callback=error_callback,
+            revalidated_callback=revalidated_callback
+        )
+
+    def get_statement_pdf(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+            contact: Optional[str] = None,
+            shop_id: Optional[int] = None,
+            success_callback: Optional[Callable[[bytes], None]] = None,
+            error_callback: Optional[Callable[[str], None]] = None
+    ):
+        """Download a statement PDF for all invoices in a date range."""
+        params = {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat()
+        }
+        if contact:
+            params['contact'] = contact
+        if shop_id:
+            params['shop_id'] = shop_id
+        elif self.auth_controller and getattr(self.auth_controller, 'current_shop_id', None):
+            params['shop_id'] = self.auth_controller.current_shop_id
+
+        endpoint = "/api/v1/invoices/statement?" + urlencode(params, quote_via=quote)
+        logger.debug("Fetching statement with params: %s", params)
+
+        headers = self._get_headers()
+        headers["Accept"] = "application/pdf"
+
+        def success_wrapper(req, result):
+            if not isinstance(result, (bytes, bytearray)):
+                if error_callback:
+                    error_callback("Unexpected response format from server")
+                return
+            if success_callback:
+                success_callback(bytes(result))
+
         self._make_request(
             endpoint=endpoint,
             method='GET',
-            headers=self._get_headers(),
+            headers=headers,
             success_callback=success_wrapper,
             error_callback=error_callback
         )
\ No newline at end of file
@@ -1,7 +1,11 @@
 # controllers/invoice_api_controller.py
 from datetime import timedelta, datetime
 from typing import Dict, Any, Optional, Callable
-from .base_api_controller import BaseAPIController
+from urllib.parse import urlencode, quote
+from front.utils.local_store import (
+    PendingWrite, WRITE_CREATE, WRITE_UPDATE, get_local_store, new_idempotency_key, page_key
+)
+from .base_api_controller import BaseAPIController, is_retryable_error
 import json
 import logging
 
@@ -16,11 +20,18 @@ class InvoiceAPIController(BaseAPIController):
             self,
             invoice_data: Dict[str, Any],
             success_callback: Optional[Callable[[Any], None]] = None,
-            error_callback: Optional[Callable[[str], None]] = None
+            error_callback: Optional[Callable[[str], None]] = None,
+            queued_callback: Optional[Callable[[PendingWrite], None]] = None
     ):
-        """Create a new invoice."""
-        endpoint = "/api/v1/invoices/"
-        logger.debug(f"Creating invoice with data: {invoice_data}")
+        """
+        Create a new invoice.
+
+        The request carries an Idempotency-Key, so a retry after a lost response
+        does not create a second invoice. With queued_callback, an invoice that
+        could not reach the server is kept in the local write queue for replay
+        and queued_callback receives the queued write instead of an error.
+        """
+        logger.debug("Creating invoice with data: %s", invoice_data)
 
         # Get shop_id from auth_controller or invoice_data
         default_shop_id = getattr(self.auth_controller, 'current_shop_id', None)
@@ -54,13 +65,33 @@ class InvoiceAPIController(BaseAPIController):
                 del api_invoice_data["shop_id"]
 
         except (ValueError, TypeError, KeyError) as e:
-            logger.error(f"Invalid invoice data: {e}")
+            logger.error("Invalid invoice data: %s", e)
             if error_callback:
                 error_callback(f"Invalid invoice data: {e}")
             return
 
-        logger.debug(f"Prepared invoice data for API: {api_invoice_data}")
+        logger.debug("Prepared invoice data for API: %s", api_invoice_data)
+        idempotency_key = new_idempotency_key()
+
+        def handle_create_error(error):
+            store = get_local_store()
+            if queued_callback and store and is_retryable_error(error):
+                pending = store.enqueue_write(WRITE_CREATE, api_invoice_data, idempotency_key=idempotency_key)
+                if pending:
+                    queued_callback(pending)
+                    return
+            if error_callback:
+                error_callback(error)
+
+        self._post_invoice(api_invoice_data, idempotency_key, success_callback, handle_create_error)
 
+    def _post_invoice(
+            self,
+            api_invoice_data: Dict[str, Any],
+            idempotency_key: str,
+            success_callback: Optional[Callable[[Any], None]] = None,
+            error_callback: Optional[Callable[[str], None]] = None
+    ):
         def handle_create_success(req, result):
             """Handle successful invoice creation and update auth controller if needed."""
             # Update last_invoice_id in auth_controller if available
@@ -71,19 +102,37 @@ class InvoiceAPIController(BaseAPIController):
                 if 'new_token' in result:
                     self.auth_controller.token = result['new_token']
 
+            store = get_local_store()
+            if store and isinstance(result, dict):
+                store.remember_invoice(result, page_key({'shop_id': result.get('shop_id')}))
+
             if success_callback:
                 success_callback(result)
 
-        req_body = json.dumps(api_invoice_data)
+        headers = self._get_headers()
+        headers["Idempotency-Key"] = idempotency_key
         self._make_request(
-            endpoint=endpoint,
+            endpoint="/api/v1/invoices/",
             method='POST',
-            req_body=req_body,
-            headers=self._get_headers(),
+            req_body=json.dumps(api_invoice_data),
+            headers=headers,
             success_callback=handle_create_success,
             error_callback=error_callback
         )
 
+    def replay_write(
+            self,
+            write: PendingWrite,
+            success_callback: Optional[Callable[[Any], None]] = None,
+            error_callback: Optional[Callable[[str], None]] = None
+    ):
+        """Send a write from the local queue again, with the idempotency key it was queued with."""
+        logger.debug("Replaying queued %s %s", write.kind, write.idempotency_key)
+        if write.kind == WRITE_CREATE:
+            self._post_invoice(write.payload, write.idempotency_key, success_callback, error_callback)
+        else:
+            self._patch_invoice(write.invoice_id, write.payload, success_callback, error_callback)
+
 
     def get_invoice_stats(
             self,
@@ -107,7 +156,7 @@ class InvoiceAPIController(BaseAPIController):
         if params:
             endpoint = f"{endpoint}?{'&'.join(params)}"
 
-        logger.debug(f"Fetching invoice stats with params: {params}")
+        logger.debug("Fetching invoice stats with params: %s", params)
 
         self._make_request(
             endpoint=endpoint,
@@ -122,11 +171,11 @@ class InvoiceAPIController(BaseAPIController):
             invoice_id: int,
             invoice_data: Dict[str, Any],
             success_callback: Optional[Callable[[Any], None]] = None,
-            error_callback: Optional[Callable[[str], None]] = None
+            error_callback: Optional[Callable[[str], None]] = None,
+            queued_callback: Optional[Callable[[PendingWrite], None]] = None
     ):
-        """Update an existing invoice."""
-        endpoint = f"/api/v1/invoices/{invoice_id}"
-        logger.debug(f"Updating invoice ID: {invoice_id} with data: {invoice_data}")
+        """Update an existing invoice, queueing it locally like create_invoice when offline."""
+        logger.debug("Updating invoice ID: %s with data: %s", invoice_id, invoice_data)
 
         # Prepare update data
         try:
@@ -148,20 +197,48 @@ class InvoiceAPIController(BaseAPIController):
                 ]
             }
         except (ValueError, TypeError, KeyError) as e:
-            logger.error(f"Invalid invoice update data: {e}")
+            logger.error("Invalid invoice update data: %s", e)
             if error_callback:
                 error_callback(f"Invalid invoice update data: {e}")
             return
 
-        logger.debug(f"Prepared update data for API: {update_data}")
+        logger.debug("Prepared update data for API: %s", update_data)
+
+        def handle_update_error(error):
+            store = get_local_store()
+            if queued_callback and store and is_retryable_error(error):
+                pending = store.enqueue_write(WRITE_UPDATE, update_data, invoice_id=invoice_id)
+                if pending:
+                    queued_callback(pending)
+                    return
+            if error_callback:
+                error_callback(error)
+
+        self._patch_invoice(invoice_id, update_data, success_callback, handle_update_error)
+
+    def _patch_invoice(
+            self,
+            invoice_id: int,
+            update_data: Dict[str, Any],
+            success_callback: Optional[Callable[[Any], None]] = None,
+            error_callback: Optional[Callable[[str], None]] = None
+    ):
+        self._invalidate_invoice(invoice_id)
+
+        def success_wrapper(req, result):
+            self._invalidate_invoice(invoice_id)
+            store = get_local_store()
+            if store and isinstance(result, dict):
+                store.remember_invoice(result)
+            if success_callback:
+                success_callback(result)
 
-        req_body = json.dumps(update_data)
         self._make_request(
-            endpoint=endpoint,
+            endpoint=f"/api/v1/invoices/{invoice_id}",
             method='PATCH',
-            req_body=req_body,
+            req_body=json.dumps(update_data),
             headers=self._get_headers(),
-            success_callback=lambda req, result: success_callback(result) if success_callback else None,
+            success_callback=success_wrapper,
             error_callback=error_callback
         )
 
@@ -169,17 +246,66 @@ class InvoiceAPIController(BaseAPIController):
             self,
             invoice_id: int,
             success_callback: Optional[Callable[[Any], None]] = None,
-            error_callback: Optional[Callable[[str], None]] = None
+            error_callback: Optional[Callable[[str], None]] = None,
+            revalidated_callback: Optional[Callable[[Any], None]] = None
     ):
         """Retrieve detailed information about a specific invoice."""
-        endpoint = f"/api/v1/invoices/{invoice_id}"
-        logger.debug(f"Fetching invoice details for ID: {invoice_id}")
+        logger.debug("Fetching invoice details for ID: %s", invoice_id)
+        self._fetch_invoice_details(
+            invoice_id,
+            success_callback=success_callback,
+            error_callback=error_callback,
+            revalidated_callback=revalidated_callback
+        )
+
+    def get_item_suggestions(
+            self,
+            prefix: str,
+            shop_id: Optional[int] = None,
+            limit: int = 8,
+            success_callback: Optional[Callable[[Any], None]] = None,
+            error_callback: Optional[Callable[[str], None]] = None
+    ):
+        """Item names used before in the shop, most frequent first, with last price."""
+        params = {"prefix": prefix, "limit": limit}
+        if shop_id:
+            params["shop_id"] = shop_id
+        endpoint = "/api/v1/items/autocomplete?" + urlencode(params, quote_via=quote)
 
         self._make_request(
             endpoint=endpoint,
             method='GET',
             headers=self._get_headers(),
             success_callback=lambda req, result: success_callback(result) if success_callback else None,
+            error_callback=error_callback or (lambda error: logger.warning("Autocomplete failed: %s", error))
+        )
+
+    def get_invoice_pdf(
+            self,
+            invoice_id: int,
+            success_callback: Optional[Callable[[bytes], None]] = None,
+            error_callback: Optional[Callable[[str], None]] = None
+    ):
+        """Download the invoice PDF rendered and cached by the server."""
+        endpoint = f"/api/v1/invoices/{invoice_id}/pdf"
+        logger.debug("Fetching rendered PDF for invoice ID: %s", invoice_id)
+
+        headers = self._get_headers()
+        headers["Accept"] = "application/pdf"
+
+        def handle_success(req, result):
+            if not isinstance(result, (bytes, bytearray)):
+                if error_callback:
+                    error_callback("Unexpected response format from server")
+                return
+            if success_callback:
+                success_callback(bytes(result))
+
+        self._make_request(
+            endpoint=endpoint,
+            method='GET',
+            headers=headers,
+            success_callback=handle_success,
             error_callback=error_callback
         )
 
@@ -192,17 +318,23 @@ class InvoiceAPIController(BaseAPIController):
     ):
         """Update the payment status of an invoice."""
         endpoint = f"/api/v1/invoices/{invoice_id}/status"
-        logger.debug(f"Updating invoice ID: {invoice_id} payment status to: {is_paid}")
+        logger.debug("Updating invoice ID: %s payment status to: %s", invoice_id, is_paid)
 
         data = {"is_paid": is_paid}
         req_body = json.dumps(data)
+        self._invalidate_invoice(invoice_id)
+
+        def success_wrapper(req, result):
+            self._invalidate_invoice(invoice_id)
+            if success_callback:
+                success_callback(result)
 
         self._make_request(
             endpoint=endpoint,
             method='PATCH',
             req_body=req_body,
             headers=self._get_headers(),
-            success_callback=lambda req, result: success_callback(result) if success_callback else None,
+            success_callback=success_wrapper,
             error_callback=error_callback
         )
 
@@ -214,12 +346,18 @@ class InvoiceAPIController(BaseAPIController):
     ):
         """Delete a specific invoice."""
         endpoint = f"/api/v1/invoices/{invoice_id}"
-        logger.debug(f"Attempting to delete invoice ID: {invoice_id}")
+        logger.debug("Attempting to delete invoice ID: %s", invoice_id)
+        self._invalidate_invoice(invoice_id)
+
+        def success_wrapper(req, result):
+            self._forget_deleted_invoice(invoice_id)
+            if success_callback:
+                success_callback()
 
         self._make_request(
             endpoint=endpoint,
             method='DELETE',
             headers=self._get_headers(),
-            success_callback=lambda req, result: success_callback() if success_callback else None,
+            success_callback=success_wrapper,
             error_callback=error_callback
         )
\ No newline at end of file
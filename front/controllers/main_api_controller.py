@@ -11,39 +11,35 @@ class MainViewApiController(BaseAPIController):
             success_callback: Optional[Callable[[str], None]] = None,
             error_callback: Optional[Callable[[str], None]] = None
     ):
-        """Get the next invoice number by fetching the last invoice and incrementing its ID."""
-        endpoint = "/api/v1/invoices/last"
-        logger.debug("Fetching last invoice number")
+        """
+        Preview of the next invoice number for the current shop.
+
+        Nothing is reserved: the server allocates the number when the invoice is saved.
+        """
+        endpoint = "/api/v1/invoices/numbers/next"
+        shop_id = getattr(self.auth_controller, 'current_shop_id', None)
+        if shop_id:
+            endpoint += f"?shop_id={shop_id}"
+        logger.debug("Fetching next invoice number")
 
         def handle_success(req, result):
-            """Handle successful last invoice fetch and calculate next number."""
+            """Pass on the previewed number."""
             try:
-                if isinstance(result, dict) and 'id' in result:
-                    last_id = int(result['id'])
-                    next_number = str(last_id + 1) # Pad with zeros to maintain consistent format
-
+                if isinstance(result, dict) and 'number' in result:
+                    next_number = str(int(result['number']))
                     if success_callback:
                         success_callback(next_number)
-
-                    # Optionally update auth controller if needed
-                    if self.auth_controller and hasattr(self.auth_controller, 'last_invoice_id'):
-                        self.auth_controller.last_invoice_id = last_id
                 else:
-                    raise ValueError("Invalid response format: 'id' field not found")
+                    raise ValueError("Invalid response format: 'number' field not found")
 
             except (ValueError, TypeError) as e:
-                logger.error(f"Error processing invoice number: {e}")
+                logger.error("Error processing invoice number: %s", e)
                 if error_callback:
                     error_callback(f"Error processing invoice number: {e}")
 
         def handle_error(error_msg):
-            """Handle case where no last invoice exists."""
-            logger.warning(f"Error fetching last invoice: {error_msg}")
-            # If no last invoice exists, start from 1
-            if "404" in str(error_msg) or "No last invoice found" in str(error_msg):
-                if success_callback:
-                    success_callback("0001")
-            elif error_callback:
+            logger.warning("Error fetching invoice number: %s", error_msg)
+            if error_callback:
                 error_callback(str(error_msg))
 
         self._make_request(
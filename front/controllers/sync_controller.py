@@ -0,0 +1,141 @@
+# controllers/sync_controller.py
+from typing import Any, Callable, List, Optional
+from kivy.clock import Clock
+from front.utils.local_store import LocalInvoiceStore, PendingWrite
+from .base_api_controller import is_retryable_error
+from .invoice_api_controller import InvoiceAPIController
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SyncController:
+    """
+    Replays the local write queue once the server is reachable again.
+
+    Queued writes go out in batches of batch_size, all of a batch at once over
+    the pooled transport, each with the idempotency key it was queued with, so
+    a write whose response was lost is not applied twice. While the server is
+    unreachable the poll interval backs off from interval to max_interval;
+    kick() retries right away, e.g. after a login or any successful request.
+    """
+
+    def __init__(
+            self,
+            store: LocalInvoiceStore,
+            auth_controller: Any,
+            batch_size: int = 10,
+            interval: float = 15.0,
+            max_interval: float = 300.0
+    ):
+        self.store = store
+        self.api_controller = InvoiceAPIController(auth_controller=auth_controller)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_interval = max_interval
+        self._delay = interval
+        self._in_flight = 0
+        self._batch_failed = False
+        self._event = None
+        # Called on the main thread with (write, server result) for every write that left
+        # the queue; the result is None when the server rejected the write
+        self.listeners: List[Callable[[PendingWrite, Any], None]] = []
+
+    def start(self) -> None:
+        self._schedule(0)
+
+    def stop(self) -> None:
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def kick(self) -> None:
+        """Replay now instead of waiting out the backoff"""
+        self._delay = self.interval
+        if not self._in_flight:
+            self._schedule(0)
+
+    def _schedule(self, delay: float) -> None:
+        self.stop()
+        self._event = Clock.schedule_once(self._replay_batch, delay)
+
+    def _replay_batch(self, dt: float) -> None:
+        self._event = None
+        if self._in_flight:
+            return
+        if not getattr(self.api_controller.auth_controller, 'token', None):
+            self._schedule(self.interval)
+            return
+
+        batch = self.store.pending_writes(limit=self.batch_size)
+        if not batch:
+            self._schedule(self.interval)
+            return
+
+        logger.info("Replaying %d queued invoice writes", len(batch))
+        self._in_flight = len(batch)
+        self._batch_failed = False
+        for write in batch:
+            self.api_controller.replay_write(
+                write,
+                success_callback=lambda result, write=write: self._on_replayed(write, result),
+                error_callback=lambda error, write=write: self._on_failed(write, error)
+            )
+
+    def _notify(self, write: PendingWrite, result: Any) -> None:
+        for listener in self.listeners:
+            try:
+                listener(write, result)
+            except Exception:
+                logger.exception("Sync listener failed")
+
+    def _on_replayed(self, write: PendingWrite, result: Any) -> None:
+        self.store.complete_write(write.seq)
+        self._notify(write, result)
+        self._write_done()
+
+    def _on_failed(self, write: PendingWrite, error: str) -> None:
+        # An expired session is not the write's fault; it goes out again after the next login
+        retryable = is_retryable_error(error) or getattr(error, 'status', None) == 401
+        self.store.fail_write(write.seq, str(error), rejected=not retryable)
+        if retryable:
+            self._batch_failed = True
+        else:
+            logger.error("Server rejected queued %s %s: %s", write.kind, write.idempotency_key, error)
+            self._notify(write, None)
+        self._write_done()
+
+    def _write_done(self) -> None:
+        self._in_flight -= 1
+        if self._in_flight:
+            return
+        if self._batch_failed:
+            logger.warning("Server unreachable, next replay in %.0f s", self._delay)
+            self._schedule(self._delay)
+            self._delay = min(self._delay * 2, self.max_interval)
+        else:
+            # The next batch follows straight away until the queue is drained
+            self._delay = self.interval
+            self._schedule(0)
+
+
+_sync_controller: Optional[SyncController] = None
+
+
+def start_sync(store: LocalInvoiceStore, auth_controller: Any) -> SyncController:
+    global _sync_controller
+    if _sync_controller is None:
+        _sync_controller = SyncController(store, auth_controller)
+        _sync_controller.start()
+    return _sync_controller
+
+
+def get_sync_controller() -> Optional[SyncController]:
+    return _sync_controller
+
+
+def stop_sync() -> None:
+    global _sync_controller
+    if _sync_controller is not None:
+        _sync_controller.stop()
+        _sync_controller = None
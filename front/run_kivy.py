@@ -1,19 +1,28 @@
+import time
+
+# Reference point for the cold-start measurement, taken before Kivy is imported
+STARTED_AT = time.perf_counter()
+
+import logging
+import os
 from kivy.app import App
-from kivy.lang import Builder
-from kivy.uix.screenmanager import ScreenManager
+from kivy.clock import Clock
 from kivy.core.window import Window
-from kivy.metrics import dp
-from front.views.analytics_view import AnalyticsView
-from front.views.auth_view import AuthView
-from front.views.history_view import HistoryView
-from front.views.main_view import MainView
-from front.views.invoice_view import InvoiceView
 from front.controllers.auth_controller import AuthAPIController
+from front.controllers.sync_controller import start_sync, stop_sync
+from front.utils.http_transport import shutdown_transport
+from front.utils.local_store import close_local_store, open_local_store
+from front.utils.log_setup import setup_logging, shutdown_logging
+from front.utils.print_spooler import start_print_spooler, stop_print_spooler
+from front.utils.screen_registry import LazyScreenManager, ScreenRegistry, StartupProfiler
+
+logger = logging.getLogger("front.startup")
 
 
 class InvoiceApp(App):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        setup_logging(os.path.join(self.user_data_dir, 'logs', 'client.log'))
 
         # Установка минимальных размеров
         Window.minimum_width = 600
@@ -33,34 +42,39 @@ class InvoiceApp(App):
         Window.rotation = 0
 
     def build(self):
+        # INVOICE_PROFILE_STARTUP=1 logs the time spent per KV file and screen
+        self.startup_profiler = StartupProfiler(enabled=os.environ.get("INVOICE_PROFILE_STARTUP") == "1")
+        self.startup_profiler.steps.append(("imports", (time.perf_counter() - STARTED_AT) * 1000))
 
-        Builder.load_file('views/kv_view/styles.kv')
-        Builder.load_file('views/kv_view/date_picker.kv')
-        Builder.load_file('views/kv_view/invoice_table.kv')
-        Builder.load_file('views/kv_view/invoice_history_item.kv')
-        Builder.load_file('views/kv_view/auth.kv')
-        Builder.load_file('views/kv_view/main.kv')
-        Builder.load_file('views/kv_view/invoice.kv')
-        Builder.load_file('views/kv_view/history.kv')
-        Builder.load_file('views/kv_view/analytics.kv')
-
-        sm = ScreenManager()
+        # Only the login screen is built now, the rest on first navigation
         auth_controller = AuthAPIController()
+        registry = ScreenRegistry(auth_controller=auth_controller, profiler=self.startup_profiler)
+        sm = LazyScreenManager(registry)
+        registry.load_shared_kv()
+        registry.build(sm, 'auth')
+
+        # Invoices saved while offline are kept here and replayed once the server answers
+        store = open_local_store(os.path.join(self.user_data_dir, 'invoices.sqlite3'))
+        if store:
+            start_sync(store, auth_controller)
+        # Receipts not printed before the app was closed are printed now
+        start_print_spooler(os.path.join(self.user_data_dir, 'print_jobs.json'))
+        return sm
 
-        auth_view = AuthView(sm)
-        auth_view.auth_controller = auth_controller
-
-        MainView(sm)
-
-        invoice_view = InvoiceView(sm)
-        invoice_view.auth_controller = auth_controller
-
-        history_view = HistoryView(sm)
-        history_view.auth_controller = auth_controller
+    def on_start(self):
+        # Runs on the next frame, i.e. once the first frame has been drawn
+        Clock.schedule_once(self._log_first_frame, 0)
 
-        AnalyticsView(sm)
+    def _log_first_frame(self, dt):
+        logger.info("Cold start: first frame after %.0f ms", (time.perf_counter() - STARTED_AT) * 1000)
+        self.startup_profiler.report("Startup profile: first frame")
 
-        return sm
+    def on_stop(self):
+        stop_sync()
+        stop_print_spooler()
+        shutdown_transport()
+        close_local_store()
+        shutdown_logging()
 
 
 if __name__ == '__main__':
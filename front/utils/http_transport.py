@@ -0,0 +1,183 @@
+"""
+Pooled keep-alive HTTP transport for the API controllers.
+
+Requests run on a small fixed pool of worker threads that reuse persistent
+HTTP/1.1 connections per host, so a sequence of API calls does not open a new
+TCP connection and spawn a new thread each time like UrlRequest does. Response
+bodies are JSON-decoded on the worker thread; callbacks are delivered on the
+Kivy main thread through Clock.
+"""
+import http.client
+import json
+import logging
+import queue
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean a reused keep-alive connection was closed by the server meanwhile
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+def deliver_on_main_thread(callback: Callable[[], None]) -> None:
+    from kivy.clock import Clock
+    Clock.schedule_once(lambda dt: callback(), 0)
+
+
+class TransportResponse:
+    """Same attributes the controllers used to read from UrlRequest"""
+
+    def __init__(self, url: str, method: str):
+        self.url = url
+        self.method = method
+        self.resp_status: Optional[int] = None
+        self.resp_headers: Dict[str, str] = {}
+        self.result: Any = None
+
+
+class RequestHandle:
+    """Returned by request(); cancel() drops the callbacks of a request that is no longer needed"""
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class HTTPTransport:
+    def __init__(
+            self,
+            max_connections: int = 4,
+            timeout: float = 30,
+            deliver: Callable[[Callable[[], None]], None] = deliver_on_main_thread
+    ):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.deliver = deliver
+        # One worker per connection, so at most max_connections sockets are in use
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="http")
+        self._idle: Dict[Tuple[str, str, int], "queue.LifoQueue"] = {}
+        self._lock = threading.Lock()
+
+    def _idle_queue(self, key: Tuple[str, str, int]) -> "queue.LifoQueue":
+        with self._lock:
+            if key not in self._idle:
+                self._idle[key] = queue.LifoQueue()
+            return self._idle[key]
+
+    def _acquire(self, key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._idle_queue(key).get_nowait(), True
+        except queue.Empty:
+            scheme, host, port = key
+            connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connection = connection_class(host, port, timeout=self.timeout)
+            connection.connect()
+            # Small requests on a reused connection must not wait for delayed ACKs
+            connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return connection, False
+
+    def _send(self, method: str, url: str, body: Optional[bytes], headers: Dict[str, str]):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        while True:
+            connection, reused = self._acquire(key)
+            try:
+                connection.request(method, path or "/", body=body, headers=headers)
+                response = connection.getresponse()
+                content = response.read()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._idle_queue(key).put(connection)
+            return response, content
+
+    def _perform(
+            self,
+            handle: RequestHandle,
+            url: str,
+            method: str,
+            body: Optional[bytes],
+            headers: Dict[str, str],
+            on_success: Optional[Callable],
+            on_failure: Optional[Callable],
+            on_error: Optional[Callable]
+    ) -> None:
+        resp = TransportResponse(url, method)
+        try:
+            response, content = self._send(method, url, body, headers)
+            resp.resp_status = response.status
+            resp.resp_headers = dict(response.getheaders())
+            resp.result = content
+            if content and response.getheader("Content-Type", "").startswith("application/json"):
+                resp.result = json.loads(content.decode("utf-8"))
+        except Exception as e:
+            logger.debug("%s %s failed: %s", method, url, e)
+            if on_error and not handle.cancelled:
+                self.deliver(lambda error=e: None if handle.cancelled else on_error(resp, error))
+            return
+
+        # Same split as UrlRequest: statuses from 400 up go to on_failure
+        callback = on_success if resp.resp_status < 400 else on_failure
+        if callback and not handle.cancelled:
+            self.deliver(lambda: None if handle.cancelled else callback(resp, resp.result))
+
+    def request(
+            self,
+            url: str,
+            method: str = "GET",
+            body: Optional[Any] = None,
+            headers: Optional[Dict[str, str]] = None,
+            on_success: Optional[Callable[[TransportResponse, Any], None]] = None,
+            on_failure: Optional[Callable[[TransportResponse, Any], None]] = None,
+            on_error: Optional[Callable[[TransportResponse, Exception], None]] = None
+    ) -> RequestHandle:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        handle = RequestHandle()
+        self._executor.submit(
+            self._perform, handle, url, method, body, dict(headers or {}), on_success, on_failure, on_error
+        )
+        return handle
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().close()
+            self._idle.clear()
+
+
+_transport: Optional[HTTPTransport] = None
+
+
+def get_transport() -> HTTPTransport:
+    """Transport shared by all controllers, so they share the connection pool"""
+    global _transport
+    if _transport is None:
+        _transport = HTTPTransport()
+    return _transport
+
+
+def shutdown_transport() -> None:
+    global _transport
+    if _transport is not None:
+        _transport.close()
+        _transport = None
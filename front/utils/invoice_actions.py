@@ -1,14 +1,65 @@
-from typing import Dict, Any, List
-from utils.share_pdf import PDFManager
-from utils.printer_manager import ThermalPrinter, logger  # Updated import to use our optimized class
+import logging
+import os
+import threading
+from typing import Dict, Any, List, Optional
+
+from front.utils.print_spooler import PRINT_DONE, PRINT_FAILED, PRINT_RETRY, get_print_spooler
+
+logger = logging.getLogger(__name__)
+
+# Import reportlab in the background right after login, so the first share
+# does not pay for it; printing loads pyserial on the print spooler thread.
+# Set INVOICE_WARM_UP=0 to disable.
+WARM_UP_AFTER_LOGIN = os.environ.get("INVOICE_WARM_UP", "1") != "0"
+
+_subsystem_lock = threading.RLock()
+
+# Shared by every screen using the mixin, so a warm-up before those screens exist counts
+_invoice_manager = None
+
+
+def get_invoice_manager():
+    global _invoice_manager
+    if _invoice_manager is None:
+        with _subsystem_lock:
+            if _invoice_manager is None:
+                from utils.share_pdf import PDFManager
+                _invoice_manager = PDFManager()
+    return _invoice_manager
+
+
+def warm_up_subsystems() -> None:
+    """
+    Load the PDF subsystem on a background thread.
+
+    Independent of the screens, which LazyScreenManager may not have built yet.
+    """
+    if _invoice_manager is not None:
+        return
+
+    def warm_up():
+        try:
+            get_invoice_manager()
+            logger.debug("PDF subsystem warmed up")
+        except Exception as e:
+            logger.warning("Warm-up of the PDF subsystem failed: %s", e)
+
+    threading.Thread(target=warm_up, name="invoice-warm-up", daemon=True).start()
 
 
 class InvoiceActionsMixin:
-    """Mixin for invoice-related actions"""
+    """
+    Mixin for invoice-related actions.
+
+    The PDF subsystem (reportlab, font registration) is imported and
+    constructed on first use, not at startup. Receipts go to the print
+    spooler, whose thread loads pyserial, and qrcode only when a receipt with a
+    QR code is printed.
+    """
 
-    def __init__(self):
-        self.invoice_manager = PDFManager()
-        self.printer = ThermalPrinter()  # Direct instantiation of ThermalPrinter
+    @property
+    def invoice_manager(self):
+        return get_invoice_manager()
 
     def _collect_invoice_data(self) -> Dict[str, Any]:
         """Collect invoice data from the current context"""
@@ -18,31 +69,50 @@ class InvoiceActionsMixin:
         """Share invoice as PDF"""
         try:
             invoice_data = self._collect_invoice_data()
+            invoice_id = getattr(self, 'editing_invoice', None)
+            api_controller = getattr(self, 'api_controller', None)
+
+            # Saved invoices are rendered (and cached) by the server
+            if invoice_id and api_controller:
+                api_controller.get_invoice_pdf(
+                    int(invoice_id),
+                    success_callback=self.invoice_manager.share_pdf_bytes,
+                    error_callback=lambda error: self.invoice_manager.share_invoice(invoice_data)
+                )
+                return
+
             self.invoice_manager.share_invoice(invoice_data)
         except Exception as e:
-            logger.error(f"Error sharing invoice: {str(e)}")
+            logger.error("Error sharing invoice: %s", e)
 
     def print_invoice(self) -> None:
-        """Print invoice on thermal printer"""
+        """Queue the invoice for the thermal printer; it is printed in the background"""
         try:
             invoice_data = self._collect_invoice_data()
+        except Exception as e:
+            logger.error("Error: %s", e)
+            return
 
-            # Connect printer if not already connected
-            if not self.printer.connected:
-                if not self.printer.connect():
-                    logger.error("Failed to connect to printer")
-                    return
+        spooler = get_print_spooler()
+        if spooler is None:
+            logger.error("Print spooler is not running")
+            return
+        spooler.submit(invoice_data, progress_callback=self._on_print_progress)
 
-            if self.printer.print_invoice(invoice_data):
-                logger.info("Invoice successfully sent to printer")
-            else:
-                logger.error("Error printing invoice")
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
-        finally:
-            self.printer.close()
+    def _on_print_progress(self, job, status: str, error: Optional[str]) -> None:
+        show_message = getattr(self, 'show_message', None)
+        if status == PRINT_DONE:
+            logger.info("Invoice successfully sent to printer")
+        elif status == PRINT_FAILED:
+            logger.error("Error printing invoice: %s", error)
+            if show_message:
+                show_message(f"Ошибка печати накладной: {error}")
+        elif status == PRINT_RETRY and job.attempts == 1 and show_message:
+            # Once per job; the spooler keeps retrying in the background
+            show_message(f"Принтер недоступен, печать будет повторена автоматически: {error}")
 
     @staticmethod
     def get_available_printers() -> List[Dict[str, str]]:
         """Get list of available printers"""
+        from utils.printer_manager import ThermalPrinter
         return ThermalPrinter.get_available_ports()
\ No newline at end of file
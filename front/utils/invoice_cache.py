@@ -0,0 +1,55 @@
+"""
+Client-side cache of invoice detail payloads (GET /api/v1/invoices/{id}).
+
+Shared by all controllers so an update made through InvoiceAPIController also
+invalidates what HistoryAPIController has cached.
+"""
+import copy
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class InvoiceDetailsCache:
+    """Size-bounded LRU of invoice payloads keyed by invoice id"""
+
+    def __init__(self, max_entries: int = 50, fresh_seconds: float = 5.0):
+        self.max_entries = max_entries
+        # Entries younger than this are served without revalidation
+        self.fresh_seconds = fresh_seconds
+        self._entries: "OrderedDict[int, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        # Bumped on invalidation so a fetch started earlier cannot store an outdated payload
+        self._generations: Dict[int, int] = {}
+
+    def get(self, invoice_id: int) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Copy of the cached payload and its age in seconds"""
+        entry = self._entries.get(invoice_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(invoice_id)
+        payload, stored_at = entry
+        return copy.deepcopy(payload), time.monotonic() - stored_at
+
+    def generation(self, invoice_id: int) -> int:
+        return self._generations.get(invoice_id, 0)
+
+    def put(self, invoice_id: int, payload: Dict[str, Any], generation: int) -> bool:
+        """Store a fetched payload unless the invoice was invalidated since the fetch started"""
+        if generation != self.generation(invoice_id):
+            return False
+        self._entries[invoice_id] = (copy.deepcopy(payload), time.monotonic())
+        self._entries.move_to_end(invoice_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return True
+
+    def invalidate(self, invoice_id: int) -> None:
+        self._entries.pop(invoice_id, None)
+        self._generations[invoice_id] = self.generation(invoice_id) + 1
+
+    def clear(self) -> None:
+        for invoice_id in list(self._entries):
+            self.invalidate(invoice_id)
+
+
+invoice_details_cache = InvoiceDetailsCache()
@@ -0,0 +1,183 @@
+"""
+Column index over the HistoryView display rows.
+
+Every row is parsed once when it is added: the date into an ordinal, the total
+into a float, number and contact into lowercase strings. Filtering then runs a
+single pass over the typed columns, and sorting reuses an order computed once
+per field and direction until rows change.
+"""
+from collections.abc import Mapping
+from datetime import date
+from itertools import compress
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def _date_ordinal(value: str) -> int:
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _to_int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class InvoiceFilterIndex:
+    def __init__(self, rows: Optional[List[Mapping]] = None):
+        # The indexed list itself; HistoryView compares it by identity to know the index is current
+        self.rows: List[Mapping] = []
+        self.shop_ids: List[Any] = []
+        self.numbers: List[str] = []
+        self.number_values: List[int] = []
+        self.dates: List[int] = []
+        self.contacts: List[str] = []
+        self.totals: List[float] = []
+        self.paid: List[bool] = []
+        # id(row) -> position; rows are kept referenced above, so ids stay unique
+        self._positions: Dict[int, int] = {}
+        # (field, reverse) -> positions in that order
+        self._orders: Dict[Tuple[str, bool], List[int]] = {}
+        if rows is not None:
+            self.rebuild(rows)
+
+    def _columns(self) -> Tuple[List[Any], ...]:
+        return (self.shop_ids, self.numbers, self.number_values, self.dates,
+                self.contacts, self.totals, self.paid)
+
+    @staticmethod
+    def _parse(row: Mapping) -> Tuple[Any, ...]:
+        """Column values of a row, in the order of _columns()"""
+        number = str(row.get('number', ''))
+        return (
+            row.get('shop_id'),
+            number.lower(),
+            _to_int(number),
+            _date_ordinal(row.get('date', '')),
+            str(row.get('contact', '')).lower(),
+            _to_float(row.get('total', 0.0)),
+            bool(row.get('is_paid', False)),
+        )
+
+    def rebuild(self, rows: List[Mapping]) -> None:
+        self.rows = rows
+        for column in self._columns():
+            column.clear()
+        self._positions.clear()
+        self._append_columns(rows)
+
+    def extend(self, rows: List[Mapping]) -> None:
+        """Index rows that were just appended to the indexed list"""
+        self._append_columns(rows)
+
+    def update_row(self, row: Mapping) -> bool:
+        """Re-read a row changed in place; False if the row is not indexed"""
+        position = self._positions.get(id(row))
+        if position is None:
+            return False
+        for column, value in zip(self._columns(), self._parse(row)):
+            column[position] = value
+        self._orders.clear()
+        return True
+
+    def _append_columns(self, rows: List[Mapping]) -> None:
+        start = len(self.numbers)
+        columns = self._columns()
+        for offset, row in enumerate(rows):
+            for column, value in zip(columns, self._parse(row)):
+                column.append(value)
+            self._positions[id(row)] = start + offset
+        self._orders.clear()
+
+    def filter(
+            self,
+            shop_id: Any = None,
+            number: Optional[str] = None,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            contact: Optional[str] = None,
+            min_total: Optional[float] = None,
+            max_total: Optional[float] = None,
+            is_paid: Optional[bool] = None
+    ) -> List[Mapping]:
+        """Rows matching all given conditions, in index order; number and contact match as lowercase substrings"""
+        shop_ids, numbers, dates, contacts = self.shop_ids, self.numbers, self.dates, self.contacts
+        totals, paid, rows = self.totals, self.paid, self.rows
+        number = number.lower() if number else None
+        contact = contact.lower() if contact else None
+        first_day = date_from.toordinal() if date_from else None
+        last_day = date_to.toordinal() if date_to else None
+
+        matched = []
+        append = matched.append
+        for i in range(len(numbers)):
+            if shop_ids[i] != shop_id:
+                continue
+            if number is not None and number not in numbers[i]:
+                continue
+            if first_day is not None and dates[i] < first_day:
+                continue
+            if last_day is not None and dates[i] > last_day:
+                continue
+            if contact is not None and contact not in contacts[i]:
+                continue
+            if min_total is not None and totals[i] < min_total:
+                continue
+            if max_total is not None and totals[i] > max_total:
+                continue
+            if is_paid is not None and paid[i] != is_paid:
+                continue
+            append(rows[i])
+        return matched
+
+    def _sort_column(self, field: str) -> List[Any]:
+        columns = {
+            'number': self.number_values,
+            'date': self.dates,
+            'total': self.totals,
+            'contact': self.contacts,
+        }
+        if field in columns:
+            return columns[field]
+        return [str(row.get(field, '')).lower() for row in self.rows]
+
+    def _order(self, field: str, reverse: bool) -> List[int]:
+        order = self._orders.get((field, reverse))
+        if order is None:
+            column = self._sort_column(field)
+            order = sorted(range(len(column)), key=column.__getitem__, reverse=reverse)
+            self._orders[(field, reverse)] = order
+        return order
+
+    def sort_rows(self, rows: List[Mapping], field: str, reverse: bool,
+                  fallback_key: Callable[[Mapping], Any]) -> List[Mapping]:
+        """
+        Sort indexed rows by a cached order instead of re-parsing them.
+
+        Rows that are not in the index are sorted with fallback_key instead.
+        """
+        try:
+            positions = list(map(self._positions.__getitem__, map(id, rows)))
+        except KeyError:
+            return sorted(rows, key=fallback_key, reverse=reverse)
+
+        order = self._order(field, reverse)
+        indexed = self.rows
+        if len(positions) == len(indexed):
+            return list(map(indexed.__getitem__, order))
+
+        # A walk over the cached order keeps the selected rows, no sorting needed
+        selected = bytearray(len(indexed))
+        for i in positions:
+            selected[i] = 1
+        return list(compress(map(indexed.__getitem__, order), map(selected.__getitem__, order)))
@@ -0,0 +1,99 @@
+"""
+Lines of the invoice being edited, with a running total.
+
+Quantities and prices are kept as typed and parsed with Decimal, so line sums
+and the total are exact to the kopeck. An edit moves the total by the change in
+its own line's sum instead of re-adding every line.
+
+The row dicts are the data of the editor's RecycleView and are changed in
+place, so recycled row widgets always show the current values.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Dict, List
+
+CENTS = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def parse_decimal(text: Any) -> Decimal:
+    """Decimal of a typed number, zero when empty or not a number"""
+    try:
+        value = Decimal(str(text).strip())
+    except InvalidOperation:
+        return ZERO
+    return value if value.is_finite() else ZERO
+
+
+def line_sum(quantity: Any, price: Any) -> Decimal:
+    """Sum of a line in kopecks; zero when it has too many digits to be exact"""
+    try:
+        return (parse_decimal(quantity) * parse_decimal(price)).quantize(CENTS, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        return ZERO
+
+
+class InvoiceLines:
+    def __init__(self):
+        self.rows: List[Dict[str, Any]] = []
+        self.total = ZERO
+
+    @staticmethod
+    def _row(name: str = '', quantity: str = '', price: str = '') -> Dict[str, Any]:
+        amount = line_sum(quantity, price)
+        return {'name': name, 'quantity': quantity, 'price': price, 'amount': amount, 'sum': f"{amount:.2f}"}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, count: int = 1) -> None:
+        """Append empty lines"""
+        self.rows.extend(self._row() for _ in range(count))
+
+    def remove_last(self) -> bool:
+        if not self.rows:
+            return False
+        self.total -= self.rows.pop()['amount']
+        return True
+
+    def load(self, items: List[Dict[str, Any]]) -> None:
+        """Replace the lines with the items of a saved invoice"""
+        self.rows = [
+            self._row(item.get('name', ''), str(item.get('quantity', '0')), str(item.get('price', '0')))
+            for item in items
+        ]
+        self.total = sum((row['amount'] for row in self.rows), ZERO)
+
+    def reset(self) -> None:
+        """Empty every line, keeping their number"""
+        self.rows = [self._row() for _ in self.rows]
+        self.total = ZERO
+
+    def set(self, index: int, field: str, text: str) -> Dict[str, Any]:
+        """Store a typed value; a quantity or price also updates the line's sum and the total"""
+        row = self.rows[index]
+        row[field] = text
+        if field in ('quantity', 'price'):
+            amount = line_sum(row['quantity'], row['price'])
+            self.total += amount - row['amount']
+            row['amount'] = amount
+            row['sum'] = f"{amount:.2f}"
+        return row
+
+    def items(self) -> List[Dict[str, Any]]:
+        """
+        Filled lines in the API format; raises ValueError for a quantity or price
+        that is not a number and for a line whose sum is too large to count
+        """
+        items = []
+        for number, row in enumerate(self.rows, 1):
+            if not (row['quantity'] and row['price']):
+                continue
+            if not row['amount'] and parse_decimal(row['quantity']) * parse_decimal(row['price']):
+                raise ValueError(f"Ошибка: слишком большая сумма в строке {number}")
+            items.append({
+                "name": row['name'],
+                "quantity": float(row['quantity']),
+                "price": float(row['price']),
+                "sum": float(row['amount'])
+            })
+        return items
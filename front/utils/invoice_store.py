@@ -0,0 +1,166 @@
+"""
+ID-keyed store of the rows shown in HistoryView.
+
+Rows are compact __slots__ records rather than dicts. They behave as read-only
+mappings, so the RecycleView, the filter index and the row widgets read them
+exactly like the dicts they replace. Changes go through the store, which keeps
+a dict by key and secondary indexes by date and paid status current in O(1).
+"""
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class InvoiceRecord(Mapping):
+    """
+    One history row.
+
+    key is the invoice id, or the idempotency key for an invoice still waiting
+    in the local write queue; seq is the position in server order, assigned by
+    the store. Neither is exposed to the RecycleView. number is the per-shop
+    number shown to the user; invoice_id is 0 until the server has the invoice.
+    """
+
+    __slots__ = ('key', 'seq', 'invoice_id', 'number', 'date', 'contact', 'total', 'is_paid', 'shop_id',
+                 'is_pending', 'pending_key')
+
+    # Keys seen by the RecycleView and the rest of HistoryView
+    FIELDS = ('invoice_id', 'number', 'date', 'contact', 'total', 'is_paid', 'shop_id', 'is_pending', 'pending_key',
+              'is_group_header')
+
+    # Group headers are plain dicts; a record resets the flag on a recycled row widget
+    is_group_header = False
+
+    def __init__(self, key: Any, invoice_id: int = 0, number: str = '', date: str = '', contact: str = '',
+                 total: str = '0.00', is_paid: bool = False, shop_id: Optional[int] = None,
+                 is_pending: bool = False, pending_key: str = ''):
+        self.key = key
+        self.seq = 0
+        self.invoice_id = invoice_id
+        self.number = number
+        self.date = date
+        self.contact = contact
+        self.total = total
+        self.is_paid = is_paid
+        self.shop_id = shop_id
+        self.is_pending = is_pending
+        self.pending_key = pending_key
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    # Records are compared by identity, like the widgets' data items
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __repr__(self) -> str:
+        return f"InvoiceRecord({self.key!r}, number={self.number!r}, total={self.total!r})"
+
+
+class InvoiceStore:
+    # Fields with a secondary index: value -> {key: record}
+    INDEXED_FIELDS = ('date', 'is_paid')
+
+    def __init__(self):
+        # All rows in server order (newest first); HistoryView's original_data
+        self.rows: List[InvoiceRecord] = []
+        self._records: Dict[Any, InvoiceRecord] = {}
+        self._secondary: Dict[str, Dict[Any, Dict[Any, InvoiceRecord]]] = {
+            field: {} for field in self.INDEXED_FIELDS
+        }
+        # seq of the newest and the oldest row, extended in both directions
+        self._first_seq = 0
+        self._last_seq = -1
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._records
+
+    def get(self, key: Any) -> Optional[InvoiceRecord]:
+        return self._records.get(key)
+
+    def _index(self, record: InvoiceRecord) -> None:
+        for field in self.INDEXED_FIELDS:
+            self._secondary[field].setdefault(getattr(record, field), {})[record.key] = record
+
+    def _unindex(self, record: InvoiceRecord) -> None:
+        for field in self.INDEXED_FIELDS:
+            bucket = self._secondary[field].get(getattr(record, field))
+            if bucket is not None:
+                bucket.pop(record.key, None)
+                if not bucket:
+                    del self._secondary[field][getattr(record, field)]
+
+    def replace(self, records: List[InvoiceRecord]) -> None:
+        """Load a fresh first page; the list is taken over, not copied"""
+        self.rows = records
+        self._records = {}
+        self._secondary = {field: {} for field in self.INDEXED_FIELDS}
+        self._first_seq = 0
+        self._last_seq = -1
+        self.extend(records, append=False)
+
+    def extend(self, records: List[InvoiceRecord], append: bool = True) -> List[InvoiceRecord]:
+        """Add an older page below the loaded rows, skipping rows already present; returns the added ones"""
+        added = [record for record in records if record.key not in self._records]
+        for record in added:
+            self._last_seq += 1
+            record.seq = self._last_seq
+            self._records[record.key] = record
+            self._index(record)
+        if append:
+            self.rows.extend(added)
+        return added
+
+    def insert_first(self, record: InvoiceRecord) -> None:
+        """Put a new invoice on top of the list"""
+        if record.key in self._records:
+            self.remove(record.key)
+        self._first_seq -= 1
+        record.seq = self._first_seq
+        self._records[record.key] = record
+        self._index(record)
+        self.rows.insert(0, record)
+
+    def update(self, key: Any, **fields: Any) -> Optional[InvoiceRecord]:
+        """Change fields of a record in place; the lists holding it see the change"""
+        record = self._records.get(key)
+        if record is None:
+            return None
+        self._unindex(record)
+        for field, value in fields.items():
+            setattr(record, field, value)
+        self._index(record)
+        return record
+
+    def remove(self, key: Any) -> Optional[InvoiceRecord]:
+        record = self._records.pop(key, None)
+        if record is not None:
+            self._unindex(record)
+            self.rows.remove(record)
+        return record
+
+    def with_value(self, field: str, value: Any) -> List[InvoiceRecord]:
+        """Records with field == value, in server order, from the secondary index"""
+        bucket = self._secondary[field].get(value, {})
+        return sorted(bucket.values(), key=attrgetter('seq'))
+
+    def group(self, field: str) -> Optional[Dict[Any, List[InvoiceRecord]]]:
+        """
+        All records grouped by an indexed field, each group in server order.
+
+        Returns None for fields without an index, so the caller can scan instead.
+        """
+        if field not in self._secondary:
+            return None
+        return {value: self.with_value(field, value) for value in self._secondary[field]}
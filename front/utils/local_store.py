@@ -0,0 +1,259 @@
+"""
+Offline-first local store of the client (SQLite, stdlib sqlite3).
+
+Keeps the invoices of the last loaded history pages, so HistoryView can render
+before the server answers, and a queue of invoice writes that could not reach
+the server. Rows are scoped by the login that wrote them, so a different user
+logging in on the same device neither sees nor replays them.
+
+The store is only used from the Kivy main thread; every call is a few small
+indexed statements on a WAL database.
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    owner TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (owner, id)
+);
+CREATE TABLE IF NOT EXISTS history_pages (
+    owner TEXT NOT NULL,
+    page_key TEXT NOT NULL,
+    invoice_ids TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (owner, page_key)
+);
+CREATE TABLE IF NOT EXISTS pending_writes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    invoice_id INTEGER,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_pending_writes_owner_status ON pending_writes (owner, status, seq);
+"""
+
+WRITE_CREATE = 'create'
+WRITE_UPDATE = 'update'
+
+# Queued writes the server rejected; kept for inspection instead of being retried forever
+STATUS_QUEUED = 'queued'
+STATUS_REJECTED = 'rejected'
+
+_store: Optional["LocalInvoiceStore"] = None
+
+
+class PendingWrite:
+    """An invoice write waiting in the queue, payload already in API format"""
+
+    __slots__ = ('seq', 'kind', 'invoice_id', 'idempotency_key', 'payload', 'attempts', 'created_at')
+
+    def __init__(self, seq: int, kind: str, invoice_id: Optional[int], idempotency_key: str,
+                 payload: Dict[str, Any], attempts: int, created_at: float):
+        self.seq = seq
+        self.kind = kind
+        self.invoice_id = invoice_id
+        self.idempotency_key = idempotency_key
+        self.payload = payload
+        self.attempts = attempts
+        self.created_at = created_at
+
+
+def new_idempotency_key() -> str:
+    return uuid.uuid4().hex
+
+
+def page_key(filters: Optional[Dict[str, Any]] = None) -> str:
+    """Stable key of a history page for a set of list filters"""
+    return json.dumps({key: value for key, value in (filters or {}).items() if value is not None},
+                      sort_keys=True, default=str)
+
+
+class LocalInvoiceStore:
+    def __init__(self, path: str):
+        self.path = path
+        # Login of the authenticated user; nothing is read or written without one
+        self.owner: Optional[str] = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # History pages
+
+    def save_history_page(self, key: str, invoices: List[Dict[str, Any]]) -> None:
+        """Replace a cached page with the invoices the server returned for it"""
+        if not self.owner:
+            return
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO invoices (owner, id, payload, stored_at) VALUES (?, ?, ?, ?)",
+                [(self.owner, int(invoice['id']), json.dumps(invoice), now)
+                 for invoice in invoices if invoice.get('id') is not None]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO history_pages (owner, page_key, invoice_ids, stored_at) VALUES (?, ?, ?, ?)",
+                (self.owner, key, json.dumps([invoice.get('id') for invoice in invoices]), now)
+            )
+
+    def load_history_page(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Invoices of a cached page in the order the server returned them, None if never loaded"""
+        if not self.owner:
+            return None
+        row = self._conn.execute(
+            "SELECT invoice_ids FROM history_pages WHERE owner = ? AND page_key = ?", (self.owner, key)
+        ).fetchone()
+        if row is None:
+            return None
+
+        invoice_ids = [invoice_id for invoice_id in json.loads(row['invoice_ids']) if invoice_id is not None]
+        payloads = {}
+        # Chunked to stay below SQLite's bound parameter limit
+        for start in range(0, len(invoice_ids), 500):
+            chunk = invoice_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for invoice_row in self._conn.execute(
+                    f"SELECT id, payload FROM invoices WHERE owner = ? AND id IN ({placeholders})",
+                    [self.owner, *chunk]
+            ):
+                payloads[invoice_row['id']] = json.loads(invoice_row['payload'])
+        return [payloads[invoice_id] for invoice_id in invoice_ids if invoice_id in payloads]
+
+    def remember_invoice(self, invoice: Dict[str, Any], key: Optional[str] = None) -> None:
+        """Store an invoice the server returned after a write; with key, also put it on top of that page"""
+        if not self.owner or invoice.get('id') is None:
+            return
+        invoice_id = int(invoice['id'])
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO invoices (owner, id, payload, stored_at) VALUES (?, ?, ?, ?)",
+                (self.owner, invoice_id, json.dumps(invoice), time.time())
+            )
+            if key is None:
+                return
+            row = self._conn.execute(
+                "SELECT invoice_ids FROM history_pages WHERE owner = ? AND page_key = ?", (self.owner, key)
+            ).fetchone()
+            if row is not None:
+                invoice_ids = json.loads(row['invoice_ids'])
+                if invoice_id not in invoice_ids:
+                    self._conn.execute(
+                        "UPDATE history_pages SET invoice_ids = ? WHERE owner = ? AND page_key = ?",
+                        (json.dumps([invoice_id] + invoice_ids), self.owner, key)
+                    )
+
+    def forget_invoice(self, invoice_id: int) -> None:
+        """Drop a deleted invoice; pages keep its id and skip it when loaded"""
+        if not self.owner:
+            return
+        with self._conn:
+            self._conn.execute("DELETE FROM invoices WHERE owner = ? AND id = ?", (self.owner, int(invoice_id)))
+
+    # Write queue
+
+    def enqueue_write(self, kind: str, payload: Dict[str, Any], invoice_id: Optional[int] = None,
+                      idempotency_key: Optional[str] = None) -> Optional[PendingWrite]:
+        """
+        Queue a write for replay.
+
+        A queued update replaces an earlier queued update of the same invoice,
+        since each carries the full invoice.
+        """
+        if not self.owner:
+            return None
+        key = idempotency_key or new_idempotency_key()
+        now = time.time()
+        with self._conn:
+            if kind == WRITE_UPDATE:
+                self._conn.execute(
+                    "DELETE FROM pending_writes WHERE owner = ? AND kind = ? AND invoice_id = ? AND status = ?",
+                    (self.owner, WRITE_UPDATE, invoice_id, STATUS_QUEUED)
+                )
+            cursor = self._conn.execute(
+                "INSERT INTO pending_writes (owner, kind, invoice_id, idempotency_key, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.owner, kind, invoice_id, key, json.dumps(payload), now)
+            )
+        logger.info("Queued %s of invoice %s for replay", kind, invoice_id if invoice_id is not None else key)
+        return PendingWrite(cursor.lastrowid, kind, invoice_id, key, payload, 0, now)
+
+    def pending_writes(self, limit: Optional[int] = None) -> List[PendingWrite]:
+        """Queued writes of the current owner, oldest first"""
+        if not self.owner:
+            return []
+        rows = self._conn.execute(
+            "SELECT seq, kind, invoice_id, idempotency_key, payload, attempts, created_at FROM pending_writes "
+            "WHERE owner = ? AND status = ? ORDER BY seq LIMIT ?",
+            (self.owner, STATUS_QUEUED, -1 if limit is None else limit)
+        ).fetchall()
+        return [
+            PendingWrite(row['seq'], row['kind'], row['invoice_id'], row['idempotency_key'],
+                         json.loads(row['payload']), row['attempts'], row['created_at'])
+            for row in rows
+        ]
+
+    def pending_count(self) -> int:
+        if not self.owner:
+            return 0
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM pending_writes WHERE owner = ? AND status = ?", (self.owner, STATUS_QUEUED)
+        ).fetchone()[0]
+
+    def complete_write(self, seq: int) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM pending_writes WHERE seq = ?", (seq,))
+
+    def fail_write(self, seq: int, error: str, rejected: bool = False) -> None:
+        """Record a failed replay; rejected writes leave the queue"""
+        with self._conn:
+            self._conn.execute(
+                "UPDATE pending_writes SET attempts = attempts + 1, last_error = ?, status = ? WHERE seq = ?",
+                (error[:500], STATUS_REJECTED if rejected else STATUS_QUEUED, seq)
+            )
+
+
+def open_local_store(path: str) -> Optional[LocalInvoiceStore]:
+    """Open the process-wide store; the client keeps working online-only if that fails"""
+    global _store
+    if _store is None:
+        try:
+            _store = LocalInvoiceStore(path)
+        except sqlite3.Error as e:
+            logger.error("Local store unavailable at %s: %s", path, e)
+    return _store
+
+
+def get_local_store() -> Optional[LocalInvoiceStore]:
+    return _store
+
+
+def close_local_store() -> None:
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
@@ -0,0 +1,84 @@
+"""
+Queued logging for the Kivy client.
+
+Loggers only enqueue records; a background thread formats and writes them to
+a size-rotated file (and the console), so logging never does file I/O on the
+UI thread. Debug output is off unless INVOICE_LOG_LEVEL=DEBUG is set.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import traceback
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(threadName)s %(name)s: %(message)s"
+MAX_BYTES = 2 * 1024 * 1024
+BACKUP_COUNT = 3
+QUEUE_SIZE = 5000
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Renders only the message on the caller's thread and drops records when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info))
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(log_file: Optional[str] = None, level: Optional[str] = None, console: bool = True) -> None:
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.environ.get("INVOICE_LOG_LEVEL", "INFO")).upper()
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    # Our application loggers go through the queue; Kivy keeps its own handlers
+    for name in ("controllers", "views", "utils", "front"):
+        app_logger = logging.getLogger(name)
+        app_logger.addHandler(DroppingQueueHandler(log_queue))
+        app_logger.setLevel(level)
+        app_logger.propagate = False
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
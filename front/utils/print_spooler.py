@@ -0,0 +1,254 @@
+"""
+Background print spooler for the thermal printer.
+
+Receipts are printed on a worker thread, so the UI never waits for the serial
+port. The port stays open between jobs and is closed after idle_timeout
+seconds without printing. Each receipt is assembled into one buffer and sent
+with a single write. Progress reaches the UI through Clock, on the main thread.
+
+Pending jobs are kept in a JSON journal and printed after a restart. A job
+leaves the journal once it has been written, so a crash right after writing
+may print that receipt once more.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from kivy.clock import Clock
+
+logger = logging.getLogger(__name__)
+
+# Progress of a job, passed to its callback and to the listeners
+PRINT_PRINTING = 'printing'
+PRINT_DONE = 'done'
+# The printer could not be reached; the job stays queued and is tried again
+PRINT_RETRY = 'retry'
+# The receipt could not be built from the invoice; the job is dropped
+PRINT_FAILED = 'failed'
+
+_spooler: Optional["PrintSpooler"] = None
+
+
+class PrintJob:
+    """A receipt waiting to be printed"""
+
+    __slots__ = ('job_id', 'invoice', 'attempts', 'created_at')
+
+    def __init__(self, job_id: str, invoice: Dict[str, Any], attempts: int = 0, created_at: Optional[float] = None):
+        self.job_id = job_id
+        self.invoice = invoice
+        self.attempts = attempts
+        self.created_at = time.time() if created_at is None else created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'job_id': self.job_id, 'invoice': self.invoice, 'attempts': self.attempts,
+                'created_at': self.created_at}
+
+
+def _thermal_printer() -> Any:
+    # pyserial is imported on the spooler thread, on first use
+    from utils.printer_manager import ThermalPrinter
+    return ThermalPrinter()
+
+
+class PrintSpooler:
+    def __init__(
+            self,
+            journal_path: str,
+            printer_factory: Callable[[], Any] = _thermal_printer,
+            idle_timeout: float = 60.0,
+            retry_delay: float = 5.0,
+            max_retry_delay: float = 120.0
+    ):
+        self.journal_path = journal_path
+        self.idle_timeout = idle_timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._printer_factory = printer_factory
+        # Used on the spooler thread only
+        self._printer = None
+        self._last_used = 0.0
+
+        # Jobs and retry state, shared with the main thread under the condition's lock
+        self._cond = threading.Condition()
+        self._jobs: List[PrintJob] = self._load_journal()
+        self._callbacks: Dict[str, Callable[[PrintJob, str, Optional[str]], None]] = {}
+        self._retry_at = 0.0
+        self._delay = retry_delay
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        # Called on the main thread with (job, status, error) for every job
+        self.listeners: List[Callable[[PrintJob, str, Optional[str]], None]] = []
+
+    def start(self) -> None:
+        if self._jobs:
+            logger.info("Resuming %d print jobs from the previous session", len(self._jobs))
+        self._thread = threading.Thread(target=self._run, name="print-spooler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop after the receipt being printed; queued jobs stay in the journal"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, invoice: Dict[str, Any],
+               progress_callback: Optional[Callable[[PrintJob, str, Optional[str]], None]] = None) -> PrintJob:
+        """Queue a receipt; progress_callback(job, status, error) runs on the main thread"""
+        job = PrintJob(uuid.uuid4().hex, invoice)
+        with self._cond:
+            self._jobs.append(job)
+            if progress_callback:
+                self._callbacks[job.job_id] = progress_callback
+            self._save_journal()
+            # A new job is tried right away, even while an earlier one waits for the printer
+            self._retry_at = 0.0
+            self._cond.notify()
+        return job
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    # Journal
+
+    def _load_journal(self) -> List[PrintJob]:
+        try:
+            with open(self.journal_path, encoding='utf-8') as f:
+                return [PrintJob(**job) for job in json.load(f)]
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError, TypeError) as e:
+            logger.error("Print journal %s unreadable, starting empty: %s", self.journal_path, e)
+            return []
+
+    def _save_journal(self) -> None:
+        """Rewrite the journal; called with the lock held"""
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.journal_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump([job.to_dict() for job in self._jobs], f, ensure_ascii=False, default=str)
+            os.replace(temp_path, self.journal_path)
+        except OSError as e:
+            logger.error("Could not save print journal: %s", e)
+
+    # Spooler thread
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopping:
+                    break
+                job = self._jobs[0] if self._jobs and time.monotonic() >= self._retry_at else None
+                if job is None:
+                    self._cond.wait(self._wait_time())
+            if job is None:
+                self._close_if_idle()
+            else:
+                self._print(job)
+        self._close_port()
+
+    def _wait_time(self) -> Optional[float]:
+        """Seconds until a retry or the idle timeout is due; None to wait for a new job"""
+        now = time.monotonic()
+        deadlines = []
+        if self._jobs:
+            deadlines.append(self._retry_at - now)
+        if self._printer is not None and self._printer.connected:
+            deadlines.append(self._last_used + self.idle_timeout - now)
+        return max(min(deadlines), 0.0) if deadlines else None
+
+    def _close_if_idle(self) -> None:
+        if self._printer is not None and self._printer.connected and \
+                time.monotonic() - self._last_used >= self.idle_timeout:
+            logger.debug("Printer idle for %.0f s, closing the port", self.idle_timeout)
+            self._close_port()
+
+    def _close_port(self) -> None:
+        if self._printer is not None:
+            self._printer.close()
+
+    def _print(self, job: PrintJob) -> None:
+        self._report(job, PRINT_PRINTING)
+        try:
+            if self._printer is None:
+                self._printer = self._printer_factory()
+            receipt = self._printer.render_receipt(job.invoice)
+        except Exception as e:
+            logger.error("Print job %s dropped: %s", job.job_id, e)
+            self._finish(job, PRINT_FAILED, str(e))
+            return
+
+        try:
+            if not self._printer.connected and not self._printer.connect():
+                raise ConnectionError("Printer is not available")
+            self._printer.write(receipt)
+        except Exception as e:
+            # The port is opened again for the retry
+            self._close_port()
+            with self._cond:
+                job.attempts += 1
+                self._retry_at = time.monotonic() + self._delay
+                logger.warning("Printing job %s failed, retry in %.0f s: %s", job.job_id, self._delay, e)
+                self._delay = min(self._delay * 2, self.max_retry_delay)
+                self._save_journal()
+            self._report(job, PRINT_RETRY, str(e))
+            return
+
+        self._last_used = time.monotonic()
+        with self._cond:
+            self._delay = self.retry_delay
+        logger.info("Printed job %s (%d bytes)", job.job_id, len(receipt))
+        self._finish(job, PRINT_DONE)
+
+    def _finish(self, job: PrintJob, status: str, error: Optional[str] = None) -> None:
+        with self._cond:
+            if job in self._jobs:
+                self._jobs.remove(job)
+            self._save_journal()
+        self._report(job, status, error)
+
+    def _report(self, job: PrintJob, status: str, error: Optional[str] = None) -> None:
+        # Clock.schedule_once may be called from any thread; the callback runs on the main thread
+        Clock.schedule_once(lambda dt: self._dispatch(job, status, error), 0)
+
+    def _dispatch(self, job: PrintJob, status: str, error: Optional[str]) -> None:
+        with self._cond:
+            if status in (PRINT_DONE, PRINT_FAILED):
+                callback = self._callbacks.pop(job.job_id, None)
+            else:
+                callback = self._callbacks.get(job.job_id)
+        for listener in ([callback] if callback else []) + self.listeners:
+            try:
+                listener(job, status, error)
+            except Exception:
+                logger.exception("Print progress listener failed")
+
+
+def start_print_spooler(journal_path: str) -> PrintSpooler:
+    global _spooler
+    if _spooler is None:
+        _spooler = PrintSpooler(journal_path)
+        _spooler.start()
+    return _spooler
+
+
+def get_print_spooler() -> Optional[PrintSpooler]:
+    return _spooler
+
+
+def stop_print_spooler() -> None:
+    global _spooler
+    if _spooler is not None:
+        _spooler.stop()
+        _spooler = None
@@ -1,7 +1,10 @@
 from datetime import datetime
+import logging
 import os
 import textwrap
 
+logger = logging.getLogger(__name__)
+
 
 class PrinterEmulator:
     """Эмулятор термопринтера для предварительного просмотра чека в текстовом виде"""
@@ -209,7 +212,7 @@ class ThermalPrinterEmulator:
             return True
 
         except Exception as e:
-            print(f"Ошибка эмуляции печати: {str(e)}")
+            logger.error("Ошибка эмуляции печати: %s", e)
             return False
 
     def print_preview(self):
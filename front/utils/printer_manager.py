@@ -1,12 +1,9 @@
 import textwrap
 import serial
 import serial.tools.list_ports
-import qrcode
 from typing import Dict, List, Optional, Any
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -16,6 +13,8 @@ class ThermalPrinter:
         self.baudrate = baudrate
         self.printer = None
         self.connected = False
+        # Receipt being assembled by render_receipt
+        self._receipt: Optional[bytearray] = None
 
         # Settings for 80mm printer
         self.chars_per_line = {
@@ -80,14 +79,36 @@ class ThermalPrinter:
 
     def print_invoice(self, invoice_data: Dict[str, Any]) -> bool:
         """Print invoice on thermal printer"""
-        if not self._validate_invoice_data(invoice_data):
-            logger.error("Invalid invoice data")
+        try:
+            receipt = self.render_receipt(invoice_data)
+        except ValueError as e:
+            logger.error(f"Invalid invoice data: {str(e)}")
             return False
 
         try:
             if not self.connected and not self.connect():
                 return False
+            self.write(receipt)
+            return True
 
+        except Exception as e:
+            logger.error(f"Error printing invoice: {str(e)}")
+            return False
+
+    def write(self, data: bytes) -> None:
+        """Send a whole receipt in one write; raises on I/O errors"""
+        if not self.printer or not self.printer.is_open:
+            raise ConnectionError("Printer is not connected")
+        self.printer.write(data)
+        self.printer.flush()
+
+    def render_receipt(self, invoice_data: Dict[str, Any]) -> bytes:
+        """Assemble the receipt into one buffer of printer commands and cp866 text"""
+        if not self._validate_invoice_data(invoice_data):
+            raise ValueError("required fields are missing")
+
+        self._receipt = bytearray()
+        try:
             # Initialize printer commands
             self._send_command(b'\x1B\x40')  # Initialize printer
 
@@ -118,11 +139,9 @@ class ThermalPrinter:
 
             # Cut paper
             self._send_command(b'\x1D\x56\x41')  # Full cut with feed
-            return True
-
-        except Exception as e:
-            logger.error(f"Error printing invoice: {str(e)}")
-            return False
+            return bytes(self._receipt)
+        finally:
+            self._receipt = None
 
     def _validate_invoice_data(self, invoice_data: Dict[str, Any]) -> bool:
         """Validate invoice data structure"""
@@ -130,14 +149,12 @@ class ThermalPrinter:
         return all(field in invoice_data for field in required_fields)
 
     def _send_command(self, command: bytes) -> None:
-        """Send raw command to printer"""
-        if self.printer and self.printer.is_open:
-            self.printer.write(command)
+        """Add raw command to the receipt"""
+        self._receipt += command
 
     def _print_text(self, text: str) -> None:
-        """Print text with proper encoding"""
-        if self.printer and self.printer.is_open:
-            self.printer.write(text.encode('cp866'))
+        """Add text to the receipt with proper encoding"""
+        self._receipt += text.encode('cp866', errors='replace')
 
     def _print_items(self, items: List[Dict[str, Any]]) -> None:
         """Print invoice items"""
@@ -165,6 +182,8 @@ class ThermalPrinter:
 
     def _print_qr_code(self, invoice_id: str) -> None:
         """Print QR code for invoice"""
+        import qrcode
+
         qr = qrcode.QRCode(version=1, box_size=2)
         qr.add_data(f"invoice_id:{invoice_id}")
         qr.make(fit=True)
@@ -0,0 +1,46 @@
+"""
+Coalescing render scheduler for a screen.
+
+Mutations mark the screen stale instead of scheduling a refresh each; a render
+runs at most once per frame, and not at all while the screen is inactive: a
+screen that went stale meanwhile is rendered when it becomes active. A render
+rebuilds the shown list as a whole, so what changed is not recorded.
+"""
+import logging
+from typing import Callable
+
+from kivy.clock import Clock
+
+logger = logging.getLogger(__name__)
+
+
+class RenderScheduler:
+    def __init__(self, render: Callable[[], None], is_active: Callable[[], bool]):
+        self._render = render
+        self._is_active = is_active
+        # Something changed since the last render
+        self.pending = False
+        self.renders = 0
+        # A trigger runs once on the next frame however often it is called before that
+        self._trigger = Clock.create_trigger(self._flush, 0)
+
+    def request(self) -> None:
+        self.pending = True
+        if self._is_active():
+            self._trigger()
+
+    def resume(self) -> None:
+        """The screen became active; render what changed while it was hidden"""
+        if self.pending:
+            self._trigger()
+
+    def cancel(self) -> None:
+        self._trigger.cancel()
+
+    def _flush(self, dt: float) -> None:
+        if not self.pending or not self._is_active():
+            return
+        self.pending = False
+        self.renders += 1
+        logger.debug("Rendering")
+        self._render()
@@ -0,0 +1,111 @@
+"""
+Lazy construction of the application screens.
+
+Each screen is imported, gets its KV rules loaded and is instantiated the
+first time it is navigated to (sm.current = name or sm.get_screen(name)),
+so startup only pays for the login screen.
+"""
+import importlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from kivy.lang import Builder
+from kivy.uix.screenmanager import ScreenManager
+
+logger = logging.getLogger(__name__)
+
+KV_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'views', 'kv_view')
+
+# Rules used by every screen (CustomButton and friends)
+SHARED_KV = ['styles.kv']
+
+# name -> (module, class, KV files the screen and its child widgets need)
+SCREENS: Dict[str, Tuple[str, str, List[str]]] = {
+    'auth': ('front.views.auth_view', 'AuthView', ['auth.kv']),
+    'main': ('front.views.main_view', 'MainView', ['main.kv']),
+    'invoice': ('front.views.invoice_view', 'InvoiceView', ['invoice_table.kv', 'invoice.kv']),
+    'history': ('front.views.history_view', 'HistoryView',
+                ['date_picker.kv', 'invoice_history_item.kv', 'history.kv']),
+    'analytics': ('front.views.analytics_view', 'AnalyticsView', ['analytics.kv']),
+}
+
+
+class StartupProfiler:
+    """Collects how long each startup step took; reported when INVOICE_PROFILE_STARTUP=1"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.steps: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def measure(self, label: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((label, (time.perf_counter() - started) * 1000))
+
+    def report(self, title: str) -> None:
+        if not self.enabled or not self.steps:
+            return
+        lines = [f"{label:<45} {elapsed:8.1f} ms" for label, elapsed in self.steps]
+        total = sum(elapsed for _, elapsed in self.steps)
+        logger.info("%s\n%s\n%-45s %8.1f ms", title, "\n".join(lines), "total", total)
+        self.steps.clear()
+
+
+class ScreenRegistry:
+    def __init__(self, auth_controller: Any = None, profiler: Optional[StartupProfiler] = None):
+        self.auth_controller = auth_controller
+        self.profiler = profiler or StartupProfiler()
+        self._loaded_kv = set()
+
+    def knows(self, name: str) -> bool:
+        return name in SCREENS
+
+    def load_kv(self, file_name: str) -> None:
+        """Load a KV file once; loading it twice would apply its rules twice"""
+        if file_name in self._loaded_kv:
+            return
+        with self.profiler.measure(f"kv {file_name}"):
+            Builder.load_file(os.path.join(KV_DIR, file_name))
+        self._loaded_kv.add(file_name)
+
+    def load_shared_kv(self) -> None:
+        for file_name in SHARED_KV:
+            self.load_kv(file_name)
+
+    def build(self, sm: ScreenManager, name: str):
+        module_name, class_name, kv_files = SCREENS[name]
+        with self.profiler.measure(f"import {module_name}"):
+            screen_class = getattr(importlib.import_module(module_name), class_name)
+        for file_name in kv_files:
+            self.load_kv(file_name)
+
+        with self.profiler.measure(f"screen {name}"):
+            # Screens add themselves to the manager in __init__
+            screen = screen_class(sm)
+            if self.auth_controller is not None and hasattr(screen, 'auth_controller'):
+                screen.auth_controller = self.auth_controller
+        logger.debug("Screen %s built", name)
+        return screen
+
+
+class LazyScreenManager(ScreenManager):
+    """ScreenManager that asks the registry to build screens it does not have yet"""
+
+    def __init__(self, registry: ScreenRegistry, **kwargs):
+        self.registry = registry
+        super().__init__(**kwargs)
+
+    def get_screen(self, name):
+        if name not in self.screen_names and self.registry.knows(name):
+            self.registry.build(self, name)
+            self.registry.profiler.report(f"Startup profile: screen '{name}'")
+        return super().get_screen(name)
+
+    def has_screen(self, name):
+        return super().has_screen(name) or self.registry.knows(name)
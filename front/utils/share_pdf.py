@@ -18,14 +18,21 @@ class PDFManager:
             # Генерируем PDF в памяти
             pdf_buffer = self.pdf_generator.generate_pdf_in_memory(invoice_data)
             pdf_buffer.seek(0)
+            self.share_pdf_bytes(pdf_buffer.getvalue())
 
+        except Exception as e:
+            MessagePopup.show_message(f"Ошибка при отправке накладной: {str(e)}")
+
+    def share_pdf_bytes(self, content):
+        """Отправка готового PDF (например, отрисованного на сервере)"""
+        try:
             # Создаем временный файл
             temp_dir = os.path.join(os.path.expanduser('~'), '.temp_invoices')
             os.makedirs(temp_dir, exist_ok=True)
             temp_file = os.path.join(temp_dir, f'invoice_{os.getpid()}.pdf')
 
             with open(temp_file, 'wb') as f:
-                f.write(pdf_buffer.getvalue())
+                f.write(content)
 
             if platform == 'android':
                 self._share_file_android(temp_file)
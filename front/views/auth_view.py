@@ -1,7 +1,12 @@
 # views/auth_view.py
+from kivy.clock import Clock
 from kivy.uix.screenmanager import Screen
 from kivy.properties import ObjectProperty
 from views.popup_view import MessagePopup
+from front.utils.invoice_actions import WARM_UP_AFTER_LOGIN, warm_up_subsystems
+import logging
+
+logger = logging.getLogger(__name__)
 
 class AuthView(Screen):
     auth_controller = ObjectProperty(None)  # Добавляем как свойство
@@ -16,7 +21,7 @@ class AuthView(Screen):
     def on_login_success(self, result):
         if self.auth_controller:
             self.auth_controller.token = result.get('access_token')
-            print(f"Token received: {self.auth_controller.token}")  # Отладка
+            logger.debug("Token received")
             for screen in self.sm.screens:
                 if hasattr(screen, 'auth_controller'):
                     screen.auth_controller = self.auth_controller
@@ -24,6 +29,9 @@ class AuthView(Screen):
                         screen.on_auth_controller(screen, self.auth_controller)
 
         self.sm.current = 'main'
+        if WARM_UP_AFTER_LOGIN:
+            # Give the main screen its first frames before loading PDF/printing in the background
+            Clock.schedule_once(lambda dt: warm_up_subsystems(), 1)
 
     def on_login_error(self, error):
         self.show_message(f"Ошибка авторизации: {error}")
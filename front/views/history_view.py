@@ -1,27 +1,46 @@
 from kivy.factory import Factory
 from front.views.invoice_history_item import InvoiceItemWidget
 from kivy.uix.screenmanager import Screen
+from kivy.properties import ObjectProperty
 from front.controllers.history_api_controller import HistoryAPIController
+from front.controllers.sync_controller import get_sync_controller
 from kivy.uix.popup import Popup
 from kivy.uix.label import Label
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from front.utils.date_picker import CustomDatePicker as DatePicker
+from front.utils.invoice_index import InvoiceFilterIndex
+from front.utils.invoice_store import InvoiceRecord, InvoiceStore
+from front.utils.local_store import PendingWrite, WRITE_CREATE, get_local_store, page_key
+from front.utils.render_scheduler import RenderScheduler
 from kivy.clock import Clock
 
 from views.popup_view import MessagePopup
+import logging
+
+logger = logging.getLogger(__name__)
 
 Factory.register('InvoiceItemWidget', InvoiceItemWidget)
 
 
 class HistoryView(Screen):
+    auth_controller = ObjectProperty(None)
+    # Invoices per request of the server list
+    PAGE_SIZE = 50
+    # The next page is requested once fewer rows than this are left below the viewport
+    PREFETCH_ROWS = 25
+    MAX_PAGES_IN_FLIGHT = 2
+    # Pause in typing after which the filters are applied
+    LIVE_SEARCH_DELAY = 0.3
+
     def __init__(self, screen_manager, **kwargs):
         super().__init__(name='history', **kwargs)
         self.sm = screen_manager
         self.sm.add_widget(self)
         self.api_controller: HistoryAPIController = None
-        self.original_data: List[Dict[str, Any]] = []
-        self.current_data: List[Dict[str, Any]] = []
+        # Loaded rows by invoice id; original_data is its list in server order
+        self._store = InvoiceStore()
+        self.current_data: List[InvoiceRecord] = []
         self.sort_field: str = 'date'
         self.sort_reverse: bool = True
         self.current_grouping: str = None
@@ -29,8 +48,36 @@ class HistoryView(Screen):
         self.current_shop_id = None
         self.last_invoice_id = None
 
+        # Paging through the server list: skip -> request handle / loaded page waiting for its turn
+        self._page_filters: Dict[str, Any] = {}
+        self._pages_in_flight: Dict[int, Any] = {}
+        self._buffered_pages: Dict[int, List[Dict[str, Any]]] = {}
+        self._next_skip = 0
+        self._appended_skip = 0
+        self._has_more = False
+
+        # Typed columns of original_data for filtering and sorting
+        self._index = InvoiceFilterIndex()
+        self._index_dirty = False
+        # id(record) -> position in invoice_list.data, built on demand after a full display
+        self._display_positions: Optional[Dict[int, int]] = None
+        # Every change of the shown list is rendered through here, at most once per frame
+        self._renderer = RenderScheduler(self.update_display, lambda: self.is_active)
+
+        # Live search: matches the server found beyond the loaded pages, and the request
+        # still looking for them; responses to an older generation are dropped
+        self._remote_matches = InvoiceStore()
+        self._search_request = None
+        self._search_generation = 0
+        self._live_search_trigger = Clock.create_trigger(self._run_live_search, self.LIVE_SEARCH_DELAY)
+
         # Cache UI elements
         self._cache_ui_elements()
+        self.invoice_list.bind(scroll_y=self._maybe_prefetch)
+
+    @property
+    def original_data(self) -> List[InvoiceRecord]:
+        return self._store.rows
 
     def _cache_ui_elements(self):
         self.invoice_number_filter = self.ids.invoice_number_filter
@@ -44,12 +91,15 @@ class HistoryView(Screen):
 
     def on_enter(self):
         self.is_active = True
+        self._renderer.resume()
         Clock.schedule_once(lambda dt: self.refresh_list(), 0.1)
         if self.api_controller:
             self.load_invoice_stats()
 
     def on_leave(self):
         self.is_active = False
+        self._live_search_trigger.cancel()
+        self._cancel_server_search()
 
     def load_invoice_stats(self) -> None:
         if not self.api_controller:
@@ -59,7 +109,7 @@ class HistoryView(Screen):
             pass
 
         def on_stats_error(error):
-            print(f"Error loading stats: {error}")
+            logger.error("Error loading stats: %s", error)
 
         self.api_controller.get_invoice_stats(
             shop_id=self.current_shop_id,
@@ -76,7 +126,7 @@ class HistoryView(Screen):
         self.amount_to_filter.text = ''
         self.payment_status_filter.text = 'Все'
         self.current_data = self.original_data.copy()
-        Clock.schedule_once(lambda dt: self.update_display(), 0.1)
+        self._renderer.request()
 
     def show_date_picker_from(self, instance):
         date_picker = DatePicker(callback=self.set_date_from)
@@ -121,30 +171,50 @@ class HistoryView(Screen):
             self.sort_reverse = False
 
         try:
-            if field == 'total':
-                self.current_data.sort(key=lambda x: float(x.get(field, 0.0)), reverse=self.sort_reverse)
-            elif field == 'date':
-                self.current_data.sort(key=lambda x: datetime.strptime(x.get(field, ''), "%Y-%m-%d"),
-                                       reverse=self.sort_reverse)
-            elif field == 'number':
-                # Convert invoice number to integer for proper numeric sorting
-                self.current_data.sort(key=lambda x: int(x.get(field, '0')), reverse=self.sort_reverse)
-            else:
-                self.current_data.sort(key=lambda x: x.get(field, '').lower(), reverse=self.sort_reverse)
-            Clock.schedule_once(lambda dt: self.update_display(), 0.1)
+            self._apply_sort()
+            self._renderer.request()
         except Exception as e:
             self.show_message(f"Ошибка при сортировке: {str(e)}")
 
+    def _apply_sort(self) -> None:
+        self.current_data = self._filter_index().sort_rows(
+            self.current_data, self.sort_field, self.sort_reverse, self._sort_key(self.sort_field)
+        )
+
+    @staticmethod
+    def _sort_key(field: str) -> Callable[[Dict[str, Any]], Any]:
+        """Sort key parsing a row directly, for rows not in the filter index"""
+        if field == 'total':
+            return lambda x: float(x.get(field, 0.0))
+        if field == 'date':
+            return lambda x: datetime.strptime(x.get(field, ''), "%Y-%m-%d")
+        if field == 'number':
+            # Convert invoice number to integer for proper numeric sorting
+            return lambda x: int(x.get(field) or 0)
+        return lambda x: x.get(field, '').lower()
+
+    def _filter_index(self) -> InvoiceFilterIndex:
+        """Index of original_data, rebuilt after the list was replaced or changed in place"""
+        if self._index.rows is not self.original_data or self._index_dirty:
+            self._index.rebuild(self.original_data)
+            self._index_dirty = False
+        return self._index
+
     def group_invoices(self, field: str) -> None:
         if not self.current_data:
             return
 
         self.current_grouping = field
-        grouped_data = {}
+        grouped_data = None
+        if len(self.current_data) == len(self._store) and (self.sort_field, self.sort_reverse) == ('date', True):
+            # Unfiltered and in server order: the groups come from the store's secondary index
+            grouped_data = self._store.group(field)
 
-        for invoice in self.current_data:
-            key = invoice.get(field, 'Не указано')
-            grouped_data.setdefault(key, []).append(invoice)
+        if grouped_data is None:
+            grouped_data = {}
+            for invoice in self.current_data:
+                key = invoice.get(field, 'Не указано')
+                grouped_data.setdefault(key, []).append(invoice)
 
         display_data = []
         for key, group in sorted(grouped_data.items(), key=lambda x: x[0]):
@@ -153,49 +223,169 @@ class HistoryView(Screen):
             total_amount = sum(float(inv.get('total', 0.0)) for inv in group)
             display_data.append({
                 'is_group_header': True,
+                'invoice_id': 0,
+                'pending_key': '',
                 'number': '',
                 'date': '',
                 'contact': f"{header_text} ({len(group)} шт.)",
                 'total': f"{total_amount:.2f}",
-                'is_paid': all(inv.get('is_paid', False) for inv in group)
+                'is_paid': all(inv.get('is_paid', False) for inv in group),
+                'is_pending': False
             })
             display_data.extend(group)
 
         self.invoice_list.data = display_data
-        self.invoice_list.refresh_from_data()
+        self._display_positions = None
 
     def clear_grouping(self) -> None:
         self.current_grouping = None
-        Clock.schedule_once(lambda dt: self.update_display(), 0.1)
+        self._renderer.request()
 
-    def _convert_invoice_to_display_format(self, invoice: Dict[str, Any]) -> Dict[str, Any]:
+    def _display_fields(self, invoice: Dict[str, Any]) -> Dict[str, Any]:
         return {
-            'number': str(invoice.get('id', '')),
+            'invoice_id': int(invoice.get('id') or 0),
+            # The per-shop number; invoices from before numbering only have their id
+            'number': str(invoice.get('number') or invoice.get('id', '')),
             'date': invoice.get('created_at', '').split('T')[0] if 'T' in invoice.get('created_at', '')
             else invoice.get('created_at', ''),
             'contact': invoice.get('contact_info', ''),
             'total': f"{float(invoice.get('total_amount', 0.0)):.2f}",
             'is_paid': invoice.get('is_paid', False),
-            'shop_id': invoice.get('shop_id', self.current_shop_id)  # Include shop_id
+            'shop_id': invoice.get('shop_id', self.current_shop_id),  # Include shop_id
+            'is_pending': False,
+            'pending_key': ''
         }
 
+    def _convert_invoice_to_display_format(self, invoice: Dict[str, Any]) -> InvoiceRecord:
+        return InvoiceRecord(int(invoice['id']), **self._display_fields(invoice))
+
+    def _apply_pending_write(self, write: PendingWrite) -> Optional[InvoiceRecord]:
+        """Show a write still waiting in the local queue: a new invoice on top, an edit over its row"""
+        payload = write.payload
+        pending = {
+            'contact': payload.get('contact_info', ''),
+            'total': f"{float(payload.get('total_amount', 0.0)):.2f}",
+            'is_paid': payload.get('is_paid', False),
+            'is_pending': True,
+            'pending_key': write.idempotency_key
+        }
+        if write.kind != WRITE_CREATE:
+            return self._store.update(write.invoice_id, **pending)
+
+        # The server allocates the number when the queued create reaches it
+        record = InvoiceRecord(
+            write.idempotency_key,
+            date=datetime.fromtimestamp(write.created_at).strftime("%Y-%m-%d"),
+            shop_id=payload.get('shop_id', self.current_shop_id),
+            **pending
+        )
+        self._store.insert_first(record)
+        return record
+
+    def _set_invoices(self, result: List[Dict[str, Any]]) -> None:
+        self._store.replace([self._convert_invoice_to_display_format(invoice) for invoice in result])
+        store = get_local_store()
+        if store:
+            for write in store.pending_writes():
+                self._apply_pending_write(write)
+
+        self.current_data = list(self._store.rows)
+        self._renderer.request()
+
+    def _display_index(self, record: InvoiceRecord) -> Optional[int]:
+        if self._display_positions is None:
+            self._display_positions = {id(row): i for i, row in enumerate(self.invoice_list.data)}
+        return self._display_positions.get(id(record))
+
+    def _can_patch_display(self) -> bool:
+        """
+        Whether a row change can go to the RecycleView as a diff.
+
+        Not while hidden or grouped (group headers carry sums), nor with a
+        render already pending, which will show the change anyway.
+        """
+        return self.is_active and not self.current_grouping and not self._renderer.pending
+
+    def _refresh_row(self, record: InvoiceRecord) -> None:
+        """Pass the RecycleView a one-row change for a record updated in place"""
+        if self._index.rows is self._store.rows and not self._index_dirty:
+            self._index.update_row(record)
+        if not self._can_patch_display():
+            self._renderer.request()
+            return
+        index = self._display_index(record)
+        if index is not None:
+            self.invoice_list.data[index] = record
+
+    def _show_first(self, record: InvoiceRecord) -> None:
+        """Put a record just inserted into the store on top of the shown list"""
+        self.current_data.insert(0, record)
+        self._index_dirty = True
+        if not self._can_patch_display():
+            self._renderer.request()
+            return
+        self.invoice_list.data.insert(0, record)
+        self._display_positions = None
+
+    def _hide(self, record: InvoiceRecord) -> None:
+        """Take a record just removed from the store out of the shown list"""
+        if record in self.current_data:
+            self.current_data.remove(record)
+        self._index_dirty = True
+        if not self._can_patch_display():
+            self._renderer.request()
+            return
+        index = self._display_index(record)
+        if index is not None:
+            del self.invoice_list.data[index]
+            self._display_positions = None
+
+    def show_pending_write(self, write: PendingWrite) -> None:
+        """A write was queued locally because the server could not be reached"""
+        if write.kind == WRITE_CREATE:
+            self._show_first(self._apply_pending_write(write))
+            return
+        record = self._apply_pending_write(write)
+        if record is not None:
+            self._refresh_row(record)
+
+    def on_write_synced(self, write: PendingWrite, result: Optional[Dict[str, Any]]) -> None:
+        """A queued write reached the server (result) or was rejected by it (None)"""
+        placeholder = self._store.remove(write.idempotency_key)
+        if placeholder is not None:
+            self._hide(placeholder)
+
+        if result is None:
+            self.show_message("Сервер отклонил накладную, сохраненную без связи")
+            if self.is_active:
+                self.refresh_list()
+        elif write.kind == WRITE_CREATE:
+            self.add_invoice_to_list(result)
+        else:
+            self.update_invoice_in_list(result)
+
     def update_display(self) -> None:
         if not self.is_active:
             return
+        # Rendered now, so a refresh still waiting for the next frame has nothing left to do
+        self._renderer.pending = False
 
         if self.current_grouping:
             self.group_invoices(self.current_grouping)
         else:
+            # Assigning data makes the RecycleView refresh by itself
             self.invoice_list.data = self.current_data
-            self.invoice_list.refresh_from_data()
+            self._display_positions = None
+            # Back to the plain list, e.g. after the filters were cleared, which may not fill the viewport
+            Clock.schedule_once(self._maybe_prefetch, 0)
 
     def edit_invoice(self, invoice_id: int) -> None:
         try:
-            print(f"HistoryView: Loading invoice {invoice_id} for editing")
+            logger.debug("HistoryView: Loading invoice %s for editing", invoice_id)
 
             def on_invoice_loaded(invoice_data: Dict[str, Any]):
                 try:
-                    print(f"HistoryView: Invoice data loaded: {invoice_data}")
+                    logger.debug("HistoryView: Invoice data loaded: %s", invoice_data)
                     invoice_view: Screen = self.sm.get_screen('invoice')
                     if invoice_view:
                         invoice_view.load_invoice_data(invoice_data)
@@ -203,70 +393,82 @@ class HistoryView(Screen):
                     else:
                         raise ValueError("Invoice view not found")
                 except Exception as e:
-                    print(f"Error in on_invoice_loaded: {e}")
+                    logger.error("Error in on_invoice_loaded: %s", e)
                     self.show_message(f"Ошибка при загрузке данных накладной: {str(e)}")
 
+            def on_invoice_revalidated(invoice_data: Dict[str, Any]):
+                # The cached copy was shown; refresh it if the clerk is still on that invoice
+                invoice_view = self.sm.get_screen('invoice')
+                if self.sm.current == 'invoice' and str(invoice_view.editing_invoice) == str(invoice_id):
+                    invoice_view.load_invoice_data(invoice_data)
+
             if self.api_controller:
                 self.api_controller.get_invoice_details(
                     invoice_id,
                     success_callback=on_invoice_loaded,
-                    error_callback=lambda error: self.show_message(f"Ошибка загрузки накладной: {error}")
+                    error_callback=lambda error: self.show_message(f"Ошибка загрузки накладной: {error}"),
+                    revalidated_callback=on_invoice_revalidated
                 )
             else:
                 raise ValueError("API controller not initialized")
 
         except Exception as e:
-            print(f"Error in edit_invoice: {e}")
+            logger.error("Error in edit_invoice: %s", e)
             self.show_message(f"Ошибка при редактировании накладной: {str(e)}")
 
-    def on_invoices_loaded(self, result: List[Dict[str, Any]]) -> None:
+    def on_invoices_loaded(self, result: List[Dict[str, Any]], key: Optional[str] = None) -> None:
         """Callback for successful invoice load."""
         try:
-            invoice_data = [self._convert_invoice_to_display_format(invoice) for invoice in result]
-
             # Update last_invoice_id if available
             if result and self.auth_controller:
                 latest_id = max(int(invoice.get('id', 0)) for invoice in result)
                 self.last_invoice_id = latest_id
                 self.auth_controller.last_invoice_id = latest_id
 
-            self.original_data = invoice_data.copy()
-            self.current_data = invoice_data.copy()
+            store = get_local_store()
+            if store and key is not None and isinstance(result, list):
+                store.save_history_page(key, result)
+                # The server answered, so anything still queued can go out now
+                sync_controller = get_sync_controller()
+                if sync_controller and store.pending_count():
+                    sync_controller.kick()
 
-            Clock.schedule_once(lambda dt: self.update_display(), 0.1)
+            self._set_invoices(result)
 
         except Exception as e:
-            print(f"Error in on_invoices_loaded: {e}")
+            logger.error("Error in on_invoices_loaded: %s", e)
             self.show_message(f"Ошибка обработки данных накладных: {str(e)}")
 
     def on_auth_controller(self, instance, value) -> None:
         """Set up API controller when auth_controller changes."""
         if value:
-            print(f"HistoryView: Setting auth_controller with token: {value.token}")
+            logger.debug("HistoryView: Setting auth_controller")
             self.api_controller = HistoryAPIController(auth_controller=value)
             self.current_shop_id = getattr(value, 'current_shop_id', None)
             self.last_invoice_id = getattr(value, 'last_invoice_id', None)
 
+            sync_controller = get_sync_controller()
+            if sync_controller and self.on_write_synced not in sync_controller.listeners:
+                sync_controller.listeners.append(self.on_write_synced)
+
             if value.token:
-                print("HistoryView: Token present, loading invoices")
+                logger.debug("HistoryView: Token present, loading invoices")
                 Clock.schedule_once(lambda dt: self.refresh_list(), 0.1)
             else:
-                print("HistoryView: No token available")
+                logger.debug("HistoryView: No token available")
 
     def update_invoice_in_list(self, updated_invoice: Dict[str, Any]) -> None:
         try:
-            invoice_number = str(updated_invoice.get('id'))
-            invoice_data = self._convert_invoice_to_display_format(updated_invoice)
-            for data_list in [self.original_data, self.current_data]:
-                for i, invoice in enumerate(data_list):
-                    if invoice['number'] == invoice_number:
-                        data_list[i] = invoice_data.copy()
-                        break
-
-            Clock.schedule_once(lambda dt: self.update_display(), 0.1)
+            # The record is shared by every list showing it, so it is changed in place
+            key, fields = int(updated_invoice['id']), self._display_fields(updated_invoice)
+            record = self._store.update(key, **fields)
+            if record is None:
+                record = self._remote_matches.update(key, **fields)
+            if record is not None:
+                self._refresh_row(record)
 
         except Exception as e:
-            print(f"Error in update_invoice_in_list: {e}")
+            logger.error("Error in update_invoice_in_list: %s", e)
             self.show_message(f"Ошибка при обновлении накладной: {str(e)}")
 
     def remove_invoice_from_list(self, invoice_id: int) -> None:
@@ -278,127 +480,295 @@ class HistoryView(Screen):
                 if self.auth_controller:
                     self.auth_controller.last_invoice_id = None
 
-            self.original_data = [inv for inv in self.original_data if inv['number'] != invoice_id_str]
-            self.current_data = [inv for inv in self.current_data if inv['number'] != invoice_id_str]
-            Clock.schedule_once(lambda dt: self.update_display(), 0.1)
+            record = self._store.remove(int(invoice_id))
+            if record is None:
+                record = self._remote_matches.remove(int(invoice_id))
+            if record is not None:
+                self._hide(record)
         except Exception as e:
-            print(f"Error in remove_invoice_from_list: {e}")
+            logger.error("Error in remove_invoice_from_list: %s", e)
             self.show_message(f"Ошибка при удалении накладной: {str(e)}")
 
     def add_invoice_to_list(self, new_invoice: Dict[str, Any]) -> None:
         try:
-            invoice_data = self._convert_invoice_to_display_format(new_invoice)
-            if new_invoice.get('id'):
-                self.last_invoice_id = int(new_invoice['id'])
-                if self.auth_controller:
-                    self.auth_controller.last_invoice_id = self.last_invoice_id
-
-            self.original_data.insert(0, invoice_data.copy())
-            self.current_data.insert(0, invoice_data.copy())
+            record = self._convert_invoice_to_display_format(new_invoice)
+            self.last_invoice_id = record.key
+            if self.auth_controller:
+                self.auth_controller.last_invoice_id = self.last_invoice_id
 
-            Clock.schedule_once(lambda dt: self.update_display(), 0.1)
+            previous = self._store.get(record.key)
+            if previous is not None:
+                self._hide(previous)
+            self._store.insert_first(record)
+            self._show_first(record)
 
         except Exception as e:
-            print(f"Error in add_invoice_to_list: {e}")
+            logger.error("Error in add_invoice_to_list: %s", e)
             self.show_message(f"Ошибка при добавлении накладной: {str(e)}")
 
     def show_message(self, message):
         MessagePopup.show_message(message)
 
-    def on_load_error(self, error: str) -> None:
-        print(f"HistoryView: Load error: {error}")
-        self.show_message(f"Ошибка загрузки накладных: {error}")
+    def on_load_error(self, error: str, showing_local_copy: bool = False) -> None:
+        logger.error("HistoryView: Load error: %s", error)
+        if showing_local_copy:
+            self.show_message(f"Нет связи с сервером, показаны сохраненные накладные: {error}")
+        else:
+            self.show_message(f"Ошибка загрузки накладных: {error}")
+
+    def _search_filters(self) -> Dict[str, Any]:
+        """Current filter fields, parsed; unset or unparsable ones are None"""
+        def parse_date(text):
+            return datetime.strptime(text, "%Y-%m-%d").date() if text else None
+
+        def parse_amount(text):
+            try:
+                return float(text) if text else None
+            except ValueError:
+                # Half-typed input such as "."
+                return None
+
+        payment_status = self.payment_status_filter.text
+        return {
+            'number': self.invoice_number_filter.text.strip() or None,
+            'date_from': parse_date(self.date_from_filter.text),
+            'date_to': parse_date(self.date_to_filter.text),
+            'contact': self.contact_filter.text.strip() or None,
+            'min_total': parse_amount(self.amount_from_filter.text),
+            'max_total': parse_amount(self.amount_to_filter.text),
+            'is_paid': None if payment_status == 'Все' else payment_status == 'Оплачено'
+        }
 
     def search_invoices(self, instance=None) -> None:
         if not self.validate_date_range():
             return
 
         try:
-            filtered_data = [
-                invoice for invoice in self.original_data
-                if invoice.get('shop_id', self.current_shop_id) == self.current_shop_id
-            ]
-
-            if self.invoice_number_filter.text:
-                search_number = self.invoice_number_filter.text.strip().lower()
-                filtered_data = [
-                    invoice for invoice in filtered_data
-                    if search_number in invoice['number'].lower()
-                ]
-
-            if self.date_from_filter.text:
-                date_from = datetime.strptime(self.date_from_filter.text, "%Y-%m-%d")
-                filtered_data = [
-                    invoice for invoice in filtered_data
-                    if datetime.strptime(invoice['date'], "%Y-%m-%d") >= date_from
-                ]
-
-            if self.date_to_filter.text:
-                date_to = datetime.strptime(self.date_to_filter.text, "%Y-%m-%d")
-                filtered_data = [
-                    invoice for invoice in filtered_data
-                    if datetime.strptime(invoice['date'], "%Y-%m-%d") <= date_to
-                ]
-
-            if self.contact_filter.text:
-                search_contact = self.contact_filter.text.strip().lower()
-                filtered_data = [
-                    invoice for invoice in filtered_data
-                    if search_contact in invoice['contact'].lower()
-                ]
-
-            if self.amount_from_filter.text:
-                min_amount = float(self.amount_from_filter.text)
-                filtered_data = [
-                    invoice for invoice in filtered_data
-                    if float(invoice['total']) >= min_amount
-                ]
-
-            if self.amount_to_filter.text:
-                max_amount = float(self.amount_to_filter.text)
-                filtered_data = [
-                    invoice for invoice in filtered_data
-                    if float(invoice['total']) <= max_amount
-                ]
-
-            if self.payment_status_filter.text != 'Все':
-                is_paid = self.payment_status_filter.text == 'Оплачено'
-                filtered_data = [
-                    invoice for invoice in filtered_data
-                    if invoice['is_paid'] == is_paid
-                ]
-
-            self.current_data = filtered_data
-            Clock.schedule_once(lambda dt: self.update_display(), 0.1)
+            self.current_data = self._filter_index().filter(shop_id=self.current_shop_id, **self._search_filters())
+            # Server matches beyond the loaded pages follow the local ones
+            self.current_data.extend(
+                record for record in self._remote_matches.rows if record.key not in self._store
+            )
+            self._renderer.request()
 
         except Exception as e:
-            print(f"Error in search_invoices: {e}")
+            logger.error("Error in search_invoices: %s", e)
             self.show_message(f"Ошибка при фильтрации данных: {str(e)}")
 
+    def on_filter_text(self, instance=None) -> None:
+        """A filter changed while typing; the search runs once typing pauses"""
+        self._live_search_trigger()
+
+    def _cancel_server_search(self) -> None:
+        self._search_generation += 1
+        if self._search_request is not None:
+            self._search_request.cancel()
+            self._search_request = None
+
+    def _run_live_search(self, dt: float) -> None:
+        """Show local matches right away and ask the server for those the loaded pages may lack"""
+        self._cancel_server_search()
+        self._remote_matches.replace([])
+        if not self.validate_date_range():
+            return
+        self.search_invoices()
+
+        # The loaded rows are the newest ones, so once they hold a page of matches, or
+        # the whole list is loaded, the server has nothing to add
+        if not self._has_local_filters() or not self._has_more or len(self.current_data) >= self.PAGE_SIZE:
+            return
+        if not self.api_controller:
+            return
+
+        search = self._search_filters()
+        filters = {
+            'shop_id': self.current_shop_id,
+            'number_contains': search['number'],
+            'contact': search['contact'],
+            'min_amount': search['min_total'],
+            'max_amount': search['max_total'],
+            'is_paid': search['is_paid'],
+            'created_after': datetime.combine(search['date_from'], datetime.min.time())
+            if search['date_from'] else None,
+            'created_before': datetime.combine(search['date_to'], datetime.max.time())
+            if search['date_to'] else None,
+            'skip': 0,
+            'limit': self.PAGE_SIZE
+        }
+        generation = self._search_generation
+        logger.debug("HistoryView: Searching the server for %s", filters)
+        self._search_request = self.api_controller.get_invoices(
+            success_callback=lambda result: self._on_server_search(generation, result),
+            error_callback=lambda error: self._on_server_search_error(generation, error),
+            filters=filters
+        )
+
+    def _on_server_search(self, generation: int, result: Any) -> None:
+        if generation != self._search_generation:
+            return
+        self._search_request = None
+        matches = [
+            self._convert_invoice_to_display_format(invoice)
+            for invoice in (result if isinstance(result, list) else [])
+            if invoice.get('id') is not None and int(invoice['id']) not in self._store
+        ]
+        if not matches:
+            return
+        self._remote_matches.replace(matches)
+        self.search_invoices()
+
+    def _on_server_search_error(self, generation: int, error: str) -> None:
+        if generation != self._search_generation:
+            return
+        self._search_request = None
+        # The local matches stay on screen; the search is only incomplete
+        logger.warning("HistoryView: Server search failed: %s", error)
+
     def refresh_list(self, instance=None) -> None:
         if not self.api_controller:
-            print("HistoryView: No API controller")
+            logger.debug("HistoryView: No API controller")
             self.show_message("API контроллер не инициализирован")
             return
 
         if not hasattr(self.sm.get_screen('invoice'), 'auth_controller') or \
                 not self.sm.get_screen('invoice').auth_controller or \
                 not self.sm.get_screen('invoice').auth_controller.token:
-            print("HistoryView: No auth token")
+            logger.debug("HistoryView: No auth token")
             self.show_message("Необходима авторизация для обновления списка накладных")
             return
 
-        print(f"HistoryView: Refreshing list with token: {self.sm.get_screen('invoice').auth_controller.token}")
+        logger.debug("HistoryView: Refreshing list")
 
         filters = {'shop_id': self.current_shop_id} if self.current_shop_id else {}
+        self._load_invoices(filters)
 
-        self.api_controller.get_invoices(
-            success_callback=self.on_invoices_loaded,
-            error_callback=self.on_load_error,
-            filters=filters
+        self.load_invoice_stats()
+
+    def _load_invoices(self, filters: Dict[str, Any]) -> None:
+        """
+        Render the locally stored first page right away and replace it with the
+        server's; later pages are requested as the list is scrolled.
+        """
+        for handle in self._pages_in_flight.values():
+            handle.cancel()
+        self._page_filters = dict(filters)
+        self._pages_in_flight = {}
+        self._buffered_pages = {}
+        self._next_skip = 0
+        self._appended_skip = 0
+        self._has_more = True
+
+        key = page_key(filters)
+        store = get_local_store()
+        cached = store.load_history_page(key) if store else None
+        if cached is not None:
+            logger.debug("HistoryView: Showing %d locally stored invoices", len(cached))
+            self._set_invoices(cached)
+
+        self._request_page(key=key, showing_local_copy=cached is not None)
+
+    def _request_page(self, key: Optional[str] = None, showing_local_copy: bool = False) -> None:
+        skip = self._next_skip
+        self._next_skip += self.PAGE_SIZE
+        # Pages that failed earlier are requested again; those loaded meanwhile are passed over
+        while self._next_skip in self._pages_in_flight or self._next_skip in self._buffered_pages:
+            self._next_skip += self.PAGE_SIZE
+
+        logger.debug("HistoryView: Requesting page at %d", skip)
+        self._pages_in_flight[skip] = self.api_controller.get_invoices(
+            success_callback=lambda result: self._on_page_loaded(skip, result, key),
+            error_callback=lambda error: self._on_page_error(skip, error, showing_local_copy),
+            filters=dict(self._page_filters, skip=skip, limit=self.PAGE_SIZE)
         )
 
-        self.load_invoice_stats()
+    def _on_page_loaded(self, skip: int, result: Any, key: Optional[str]) -> None:
+        self._pages_in_flight.pop(skip, None)
+        page = result if isinstance(result, list) else []
+        if len(page) < self.PAGE_SIZE:
+            self._has_more = False
+
+        if skip == 0:
+            self.on_invoices_loaded(page, key)
+            self._appended_skip = self.PAGE_SIZE
+        else:
+            self._buffered_pages[skip] = page
+
+        # Pages may arrive out of order; they are appended in list order
+        while self._appended_skip in self._buffered_pages:
+            self._append_page(self._buffered_pages.pop(self._appended_skip))
+            self._appended_skip += self.PAGE_SIZE
+
+        Clock.schedule_once(self._maybe_prefetch, 0)
+
+    def _on_page_error(self, skip: int, error: str, showing_local_copy: bool) -> None:
+        self._pages_in_flight.pop(skip, None)
+        self._next_skip = min(self._next_skip, skip)
+        if skip == 0:
+            self.on_load_error(error, showing_local_copy=showing_local_copy)
+        else:
+            # Retried on the next scroll towards the end of the list
+            logger.warning("HistoryView: Loading page at %d failed: %s", skip, error)
+
+    def _has_local_filters(self) -> bool:
+        return any(field.text for field in (
+            self.invoice_number_filter, self.date_from_filter, self.date_to_filter,
+            self.contact_filter, self.amount_from_filter, self.amount_to_filter
+        )) or self.payment_status_filter.text != 'Все'
+
+    def _shows_server_order(self) -> bool:
+        """Whether the shown list is original_data as loaded: not filtered, grouped or re-sorted"""
+        return not self.current_grouping and not self._has_local_filters() and \
+            (self.sort_field, self.sort_reverse) == ('date', True)
+
+    def _append_page(self, page: List[Dict[str, Any]]) -> None:
+        """Add an older page below the loaded rows"""
+        if not page:
+            return
+        rows = self._store.extend([self._convert_invoice_to_display_format(invoice) for invoice in page])
+        if self._index.rows is self._store.rows and not self._index_dirty:
+            self._index.extend(rows)
+
+        if not self._shows_server_order():
+            # A derived view is rebuilt; the server order is newest first, so the
+            # plain list only needs the new rows at its end
+            self.search_invoices()
+            self._apply_sort()
+            return
+
+        self.current_data.extend(rows)
+        if not self._can_patch_display():
+            self._renderer.request()
+        else:
+            # Extending the observable list lets the RecycleView lay out only the new rows
+            start = len(self.invoice_list.data)
+            self.invoice_list.data.extend(rows)
+            if self._display_positions is not None:
+                self._display_positions.update((id(row), start + i) for i, row in enumerate(rows))
+
+    def _maybe_prefetch(self, *args) -> None:
+        """
+        Request the next page once the viewport gets close to the end of original_data.
+
+        Only while the list is shown in server order: the rows of a filtered or
+        grouped view say nothing about how far original_data has been read, and
+        live search asks the server for the matches it lacks.
+        """
+        if not self._has_more or not self._appended_skip or not self.api_controller:
+            return
+        if len(self._pages_in_flight) >= self.MAX_PAGES_IN_FLIGHT:
+            return
+        if not self._shows_server_order():
+            return
+
+        rv = self.invoice_list
+        layout = rv.layout_manager
+        # The layout has no height yet right after data is assigned
+        if layout is None or not rv.data or layout.height <= 0:
+            return
+        hidden_below = rv.scroll_y * max(layout.height - rv.height, 0)
+        rows_below = hidden_below / (layout.height / len(rv.data))
+        if rows_below < self.PREFETCH_ROWS:
+            self._request_page()
 
     def delete_invoice(self, invoice_id: int) -> None:
         try:
@@ -426,18 +796,45 @@ class HistoryView(Screen):
             else:
                 self.show_message("API контроллер не инициализирован")
         except Exception as e:
-            print(f"Error in delete_invoice: {e}")
+            logger.error("Error in delete_invoice: %s", e)
             self.show_message(f"Ошибка при удалении накладной: {str(e)}")
 
+    def download_statement(self, instance=None) -> None:
+        """Выписка по всем накладным за период (по умолчанию — текущий месяц)"""
+        if not self.validate_date_range():
+            return
+        if not self.api_controller:
+            self.show_message("API контроллер не инициализирован")
+            return
+
+        today = datetime.now()
+        try:
+            date_from = datetime.strptime(self.date_from_filter.text, "%Y-%m-%d") \
+                if self.date_from_filter.text else today.replace(day=1)
+            date_to = datetime.strptime(self.date_to_filter.text, "%Y-%m-%d") \
+                if self.date_to_filter.text else today
+        except ValueError:
+            self.show_message("Неверный формат даты")
+            return
+
+        def on_statement_loaded(content: bytes):
+            from utils.share_pdf import PDFManager
+            PDFManager().share_pdf_bytes(content)
+
+        self.api_controller.get_statement_pdf(
+            start_date=date_from.replace(hour=0, minute=0, second=0),
+            end_date=date_to.replace(hour=23, minute=59, second=59),
+            contact=self.contact_filter.text.strip() or None,
+            shop_id=self.current_shop_id,
+            success_callback=on_statement_loaded,
+            error_callback=lambda error: self.show_message(f"Ошибка загрузки выписки: {error}")
+        )
+
     def apply_filters(self, filters: Dict[str, Any]) -> None:
         try:
             if self.current_shop_id:
                 filters['shop_id'] = self.current_shop_id
-            self.api_controller.get_invoices(
-                success_callback=self.on_invoices_loaded,
-                error_callback=self.on_load_error,
-                filters=filters
-            )
+            self._load_invoices(filters)
         except Exception as e:
-            print(f"Error applying filters: {e}")
+            logger.error("Error applying filters: %s", e)
             self.show_message(f"Ошибка при применении фильтров: {str(e)}")
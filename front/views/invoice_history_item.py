@@ -3,34 +3,48 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.properties import StringProperty, NumericProperty, BooleanProperty
 from kivy.app import App
 from views.popup_view import MessagePopup
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class InvoiceItemWidget(BoxLayout):
+    # Server id, used for requests; number is only shown
+    invoice_id = NumericProperty(0)
     number = StringProperty('')
     date = StringProperty('')
     contact = StringProperty('')
     total = NumericProperty(0.0)
     is_paid = BooleanProperty(False)
+    # Saved offline and waiting in the local write queue
+    is_pending = BooleanProperty(False)
+    # Sum row of a group, not an invoice
+    is_group_header = BooleanProperty(False)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
     def edit_invoice(self, instance) -> None:
+        if not self.invoice_id:
+            # A group header or an invoice the server does not have yet
+            return
         try:
             app = App.get_running_app()
             screen_manager = app.root
             history_view = screen_manager.get_screen('history')
 
             if history_view:
-                print(f"Editing invoice {self.number}")  # Отладка
-                history_view.edit_invoice(int(self.number))
+                logger.debug("Editing invoice %s", self.number)
+                history_view.edit_invoice(int(self.invoice_id))
             else:
                 raise ValueError("History view not found")
         except Exception as e:
-            print(f"Error in edit_invoice: {e}")  # Отладка
+            logger.error("Error in edit_invoice: %s", e)
             MessagePopup.show_message(f"Ошибка при редактировании: {str(e)}")
 
     def delete_invoice(self, instance) -> None:
+        if not self.invoice_id:
+            return
         try:
             # В popup_view.py нужно добавить метод для диалога подтверждения
             MessagePopup.show_confirm_dialog(
@@ -39,27 +53,29 @@ class InvoiceItemWidget(BoxLayout):
                 cancel_callback=self.cancel_delete
             )
         except Exception as e:
-            print(f"Error in delete_invoice: {e}")  # Отладка
+            logger.error("Error in delete_invoice: %s", e)
             MessagePopup.show_message(f"Ошибка при удалении: {str(e)}")
 
     def confirm_delete(self) -> None:
+        if not self.invoice_id:
+            return
         try:
             app = App.get_running_app()
             screen_manager = app.root
             history_view = screen_manager.get_screen('history')
 
             if history_view:
-                print(f"Deleting invoice {self.number}")  # Отладка
-                history_view.delete_invoice(int(self.number))
+                logger.debug("Deleting invoice %s", self.number)
+                history_view.delete_invoice(int(self.invoice_id))
             else:
                 raise ValueError("History view not found")
         except Exception as e:
-            print(f"Error in confirm_delete: {e}")  # Отладка
+            logger.error("Error in confirm_delete: %s", e)
             MessagePopup.show_message(f"Ошибка при удалении: {str(e)}")
 
     def cancel_delete(self) -> None:
         try:
-            print("Delete cancelled")  # Отладка
+            logger.debug("Delete cancelled")
         except Exception as e:
-            print(f"Error in cancel_delete: {e}")  # Отладка
+            logger.error("Error in cancel_delete: %s", e)
             MessagePopup.show_message(f"Ошибка при отмене удаления: {str(e)}")
\ No newline at end of file
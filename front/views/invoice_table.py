@@ -1,9 +1,20 @@
 # views/invoice_table.py
 from kivy.uix.boxlayout import BoxLayout
-from typing import Optional, Callable
+from kivy.uix.dropdown import DropDown
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.factory import Factory
+from typing import Optional, Callable, List, Dict, Any
 
 
-class InvoiceTable(BoxLayout):
+class InvoiceTable(RecycleDataViewBehavior, BoxLayout):
+    """
+    Строка редактора накладной.
+
+    Виджеты строк переиспользуются RecycleView: refresh_view_attrs показывает
+    в виджете строку данных с номером index, а правки полей передаются
+    обратно через callback из bind_line_edits.
+    """
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Кэшируем ссылки на элементы интерфейса
@@ -13,40 +24,84 @@ class InvoiceTable(BoxLayout):
         self.sum_label = self.ids.sum
         self.number_label = self.ids.number
 
-        self.bind_row_calculations()
+        self.index: Optional[int] = None
+        # callback(index, field, text) сохраняет правку и возвращает строку данных с новой суммой
+        self._edit_callback: Optional[Callable] = None
+        # Поля заполняются из данных строки, это не правка пользователя
+        self._refreshing = False
+
+        self._suggest_callback: Optional[Callable] = None
+        self._suggestions: Optional[DropDown] = None
+        self._applying_suggestion = False
 
-    def bind_row_calculations(self) -> None:
-        """Привязка изменений количества и цены к пересчету суммы."""
-        self.quantity_input.bind(text=self.calculate_row_sum)
-        self.price_input.bind(text=self.calculate_row_sum)
+        self.name_input.bind(text=lambda instance, value: self._on_field_text('name', value))
+        self.quantity_input.bind(text=lambda instance, value: self._on_field_text('quantity', value))
+        self.price_input.bind(text=lambda instance, value: self._on_field_text('price', value))
 
-    def bind_total_update(self, callback: Callable) -> None:
-        """Привязка изменений количества и цены к обновлению общей суммы."""
-        self.quantity_input.bind(text=callback)
-        self.price_input.bind(text=callback)
+    def refresh_view_attrs(self, rv, index: int, data: Dict[str, Any]) -> None:
+        """Показ строки index в переиспользованном виджете."""
+        # Виджеты создает RecycleView, обработчики берутся у него
+        self._edit_callback = getattr(rv, 'line_edit_callback', None)
+        if self._suggest_callback is None and getattr(rv, 'name_suggest_callback', None):
+            self.bind_name_suggestions(rv.name_suggest_callback)
 
-    def calculate_row_sum(self, instance: Optional[object] = None, value: Optional[str] = None) -> None:
-        """Вычисление суммы строки на основе количества и цены."""
+        self.index = index
+        self.dismiss_suggestions()
+        self._refreshing = True
         try:
-            quantity = float(self.quantity_input.text)
-            price = float(self.price_input.text)
-            total = quantity * price
-            self.sum_label.text = f'{total:.2f}'
-        except ValueError:
-            self.sum_label.text = '0.00'
-
-    def total_sum(self) -> float:
-        """Возвращает сумму строки как float."""
+            self.number_label.text = str(index + 1)
+            self.name_input.text = data['name']
+            self.quantity_input.text = data['quantity']
+            self.price_input.text = data['price']
+            self.sum_label.text = data['sum']
+        finally:
+            self._refreshing = False
+
+    def _on_field_text(self, field: str, value: str) -> None:
+        if self._refreshing or self.index is None or not self._edit_callback:
+            return
+        row = self._edit_callback(self.index, field, value)
+        self.sum_label.text = row['sum']
+
+    def bind_name_suggestions(self, callback: Callable) -> None:
+        """Запрос подсказок названия товара при вводе: callback(row, prefix)."""
+        self._suggest_callback = callback
+        self.name_input.bind(text=self._on_name_text)
+
+    def _on_name_text(self, instance: object, value: str) -> None:
+        if self._applying_suggestion or not self.name_input.focus or len(value.strip()) < 2:
+            self.dismiss_suggestions()
+            return
+        if self._suggest_callback:
+            self._suggest_callback(self, value)
+
+    def show_suggestions(self, prefix: str, suggestions: List[Dict[str, Any]]) -> None:
+        """Показ подсказок, если пользователь не успел изменить текст."""
+        if self.name_input.text != prefix or not self.name_input.focus:
+            return
+
+        self.dismiss_suggestions()
+        if not suggestions:
+            return
+
+        self._suggestions = DropDown()
+        for suggestion in suggestions:
+            button = Factory.CustomButton(text=f"{suggestion['name']}  —  {float(suggestion['price']):.2f}")
+            button.bind(on_release=lambda btn, item=suggestion: self.apply_suggestion(item))
+            self._suggestions.add_widget(button)
+        self._suggestions.open(self.name_input)
+
+    def apply_suggestion(self, suggestion: Dict[str, Any]) -> None:
+        """Подстановка названия и последней цены из подсказки."""
+        self._applying_suggestion = True
         try:
-            return float(self.sum_label.text)
-        except ValueError:
-            return 0.0
-
-    def reset_values(self) -> None:
-        """Сброс значений полей строки."""
-        self.name_input.text = ""
-        self.quantity_input.text = ''
-        self.price_input.text = ''
-        self.quantity_input.hint_text = '0.0'
-        self.price_input.hint_text = '0.0'
-        self.calculate_row_sum()
+            self.name_input.text = suggestion['name']
+            self.price_input.text = f"{float(suggestion['price']):.2f}"
+        finally:
+            self._applying_suggestion = False
+        self.dismiss_suggestions()
+
+    def dismiss_suggestions(self) -> None:
+        if self._suggestions:
+            self._suggestions.dismiss()
+            self._suggestions = None
@@ -1,6 +1,7 @@
 # views/invoice_view.py
 
 from kivy.clock import Clock
+from kivy.factory import Factory
 from datetime import datetime, timedelta
 from typing import Dict, Any
 from kivy.properties import ObjectProperty, StringProperty
@@ -8,7 +9,13 @@ from kivy.uix.screenmanager import Screen
 from front.views.invoice_table import InvoiceTable
 from front.controllers.invoice_api_controller import InvoiceAPIController
 from front.utils.invoice_actions import InvoiceActionsMixin
+from front.utils.invoice_lines import InvoiceLines
 from views.popup_view import MessagePopup
+import logging
+
+logger = logging.getLogger(__name__)
+
+Factory.register('InvoiceTable', cls=InvoiceTable)
 
 
 class InvoiceView(Screen, InvoiceActionsMixin):
@@ -24,12 +31,18 @@ class InvoiceView(Screen, InvoiceActionsMixin):
         self.payment_status_value = 0
         self.api_controller = None
         self.current_shop_id = None
+        self._suggest_request = None
+        self._suggest_trigger = Clock.create_trigger(self._fetch_name_suggestions, 0.25)
+        # Invoice lines with a running total; their dicts are the data of table_content
+        self._lines = InvoiceLines()
         Clock.schedule_once(self._initialize_view)
         self.contact_input = self.ids.contact
         self.additional_info_input = self.ids.additional_info
         self.date_label = self.ids.date
         self.payment_button = self.ids.payment_button
         self.table_content = self.ids.table_content
+        self.table_content.line_edit_callback = self._on_line_edit
+        self.table_content.name_suggest_callback = self.request_name_suggestions
         self.total_sum_label = self.ids.total_sum
 
     def on_auth_controller(self, instance, value):
@@ -56,42 +69,33 @@ class InvoiceView(Screen, InvoiceActionsMixin):
         return {
             "shop_id": self.current_shop_id,
             "id": self.displayed_text,
+            "number": self.displayed_text,
             "contact": self.contact_input.text,
             "additional_info": self.additional_info_input.text,
             "total": self.calculate_total(),
             "is_paid": self.payment_status_value == 1,
             "created_at": self.date_label.text,
-            "items": [
-                {
-                    "name": row.name_input.text,
-                    "quantity": float(row.quantity_input.text),
-                    "price": float(row.price_input.text),
-                    "sum": float(row.sum_label.text)
-                }
-                for row in self.table_content.children
-                if row.quantity_input.text and row.price_input.text
-            ]
+            "items": self._lines.items()
         }
 
     def clear_invoice_form(self) -> None:
         self.contact_input.text = ''
         self.additional_info_input.text = ''
 
-        for row in self.table_content.children:
-            row.reset_values()
+        self._lines.reset()
+        self._show_lines()
 
         self.payment_status_value = 0
         self.payment_button.text = 'Не оплачено!'
         self.editing_invoice = None
-        self.update_total()
         self.update_date_time()
 
     def load_invoice_data(self, invoice_data: Dict[str, Any]):
         try:
-            print(f"Loading invoice data: {invoice_data}")  # Debugging
+            logger.debug("Loading invoice data: %s", invoice_data)
 
             self.editing_invoice = invoice_data.get('id')
-            self.displayed_text = str(invoice_data.get('id'))
+            self.displayed_text = str(invoice_data.get('number') or invoice_data.get('id'))
             self.contact_input.text = invoice_data.get('contact_info', '')
             self.additional_info_input.text = invoice_data.get('additional_info', '')
             self.date_label.text = invoice_data.get('created_at', '').split('T')[0]
@@ -101,26 +105,15 @@ class InvoiceView(Screen, InvoiceActionsMixin):
             self.payment_status_value = 1 if invoice_data.get('is_paid', False) else 0
             self.payment_button.text = 'Оплачено!' if self.payment_status_value == 1 else 'Не оплачено!'
 
-            self.table_content.clear_widgets()
-
-            items = invoice_data.get('items', [])
-            for item in items:
-                table_row = InvoiceTable()
-                table_row.name_input.text = item.get('name', '')
-                table_row.quantity_input.text = str(item.get('quantity', '0'))
-                table_row.price_input.text = str(item.get('price', '0'))
-                table_row.bind_total_update(self.update_total)
-                self.table_content.add_widget(table_row)
-
-            for _ in range(10 - len(self.table_content.children)):
-                self.add_row()
-
-            self._renumber_rows()
-            self.update_total()
-            print("Invoice data loaded successfully")
+            # Row widgets stay; the RecycleView shows the new lines in them
+            self._lines.load(invoice_data.get('items', []))
+            if len(self._lines) < 10:
+                self._lines.add(10 - len(self._lines))
+            self._show_lines()
+            logger.debug("Invoice data loaded successfully")
 
         except Exception as e:
-            print(f"Error loading invoice data: {e}")
+            logger.error("Error loading invoice data: %s", e)
             self.show_message(f"Ошибка при загрузке данных накладной: {str(e)}")
 
     def update_invoice_status(self):
@@ -133,20 +126,21 @@ class InvoiceView(Screen, InvoiceActionsMixin):
 
         try:
             invoice_data = self._collect_invoice_data()
-            print(f"Updating invoice {self.editing_invoice} with status: {self.payment_status_value}")  # Debugging
+            logger.debug("Updating invoice %s with status: %s", self.editing_invoice, self.payment_status_value)
 
             self.api_controller.update_invoice(
                 self.editing_invoice,
                 invoice_data,
                 success_callback=self._on_status_update_success,
-                error_callback=self._on_status_update_error
+                error_callback=self._on_status_update_error,
+                queued_callback=self._on_status_update_queued
             )
         except Exception as e:
-            print(f"Error in update_invoice_status: {e}")  # Debugging
+            logger.error("Error in update_invoice_status: %s", e)
             self.show_message(f"Ошибка при обновлении статуса: {str(e)}")
 
     def _on_status_update_success(self, result):
-        print(f"Status update success: {result}")
+        logger.debug("Status update success: %s", result)
         if 'new_token' in result and self.auth_controller:
             self.auth_controller.token = result['new_token']
 
@@ -156,6 +150,12 @@ class InvoiceView(Screen, InvoiceActionsMixin):
 
         self.show_message("Статус оплаты обновлен")
 
+    def _on_status_update_queued(self, write):
+        history_view = self.sm.get_screen('history')
+        if hasattr(history_view, 'show_pending_write'):
+            history_view.show_pending_write(write)
+        self.show_message("Нет связи с сервером: статус оплаты будет отправлен автоматически")
+
     def _on_status_update_error(self, error):
         self.show_message(f"Ошибка при обновлении статуса: {error}")
         self.payment_status_value = 1 if self.payment_status_value == 0 else 0
@@ -183,13 +183,31 @@ class InvoiceView(Screen, InvoiceActionsMixin):
                 self.editing_invoice,
                 invoice_data,
                 success_callback=self.on_save_success,
+                error_callback=self.on_save_error,
+                queued_callback=self.on_save_queued
             )
         else:
             self.api_controller.create_invoice(
                 invoice_data,
                 success_callback=self.on_save_success,
+                error_callback=self.on_save_error,
+                queued_callback=self.on_save_queued
             )
 
+    def on_save_queued(self, write):
+        """The server could not be reached; the invoice waits in the local queue"""
+        self.show_message("Нет связи с сервером: накладная сохранена на устройстве и будет отправлена автоматически")
+
+        history_view = self.sm.get_screen('history')
+        if hasattr(history_view, 'show_pending_write'):
+            history_view.show_pending_write(write)
+        self.clear_form()
+        self.sm.current = 'history'
+
+    def on_save_error(self, error):
+        # The form is kept, so the clerk can fix the invoice and save again
+        self.show_message(f"Ошибка при сохранении накладной: {error}")
+
     def on_save_success(self, result):
         if 'new_token' in result and self.auth_controller:
             self.auth_controller.token = result['new_token']
@@ -198,53 +216,64 @@ class InvoiceView(Screen, InvoiceActionsMixin):
 
         history_view = self.sm.get_screen('history')
 
-        new_invoice_data = {
-            'number': str(self.displayed_text),
-            'date': result.get('created_at', '').split('T')[0],
-            'contact': result.get('contact_info', ''),
-            'total': result.get('total_amount', 0.0),
-            'is_paid': result.get('is_paid', False)
-        }
-
-        if hasattr(history_view, 'ids') and hasattr(history_view.ids, 'invoice_list'):
-            current_data = history_view.ids.invoice_list.data
-            history_view.ids.invoice_list.data = [new_invoice_data] + current_data
+        # Through the history store, so an edit updates its row instead of adding a second one
+        if result.get('id') is not None:
+            if self.editing_invoice:
+                history_view.update_invoice_in_list(result)
+            else:
+                history_view.add_invoice_to_list(result)
         self.clear_invoice_form()
         self.sm.current = 'history'
 
     def add_initial_rows(self, count: int = 10) -> None:
-        for _ in range(count):
-            self.add_row()
+        self._lines.add(count)
+        self._show_lines()
 
     def add_row(self) -> None:
-        table_row = InvoiceTable()
-        row_count = len(self.table_content.children) + 1
-        table_row.number_label.text = str(row_count)
-        table_row.bind_total_update(self.update_total)
-        self.table_content.add_widget(table_row)
+        self._lines.add()
+        self.table_content.data.append(self._lines.rows[-1])
+
+    def _show_lines(self) -> None:
+        self.table_content.data = self._lines.rows
         self.update_total()
 
+    def _on_line_edit(self, index: int, field: str, text: str) -> Dict[str, Any]:
+        """A row widget changed a field of line index"""
+        row = self._lines.set(index, field, text)
+        if field in ('quantity', 'price'):
+            self.update_total()
+        return row
+
+    def request_name_suggestions(self, row: InvoiceTable, prefix: str) -> None:
+        """Debounced request of item name suggestions for the row being edited."""
+        self._suggest_request = (row, prefix)
+        self._suggest_trigger()
+
+    def _fetch_name_suggestions(self, dt: float) -> None:
+        if not self.api_controller or not self._suggest_request:
+            return
+
+        row, prefix = self._suggest_request
+        self._suggest_request = None
+        self.api_controller.get_item_suggestions(
+            prefix,
+            shop_id=self.current_shop_id,
+            success_callback=lambda suggestions: row.show_suggestions(prefix, suggestions)
+        )
+
     def del_row(self) -> None:
-        if not self.table_content.children:
+        if not self._lines.remove_last():
             return
 
-        self.table_content.remove_widget(self.table_content.children[0])
-        self._renumber_rows()
+        self.table_content.data.pop()
         self.update_total()
 
-    def _renumber_rows(self) -> None:
-        for i, row in enumerate(reversed(self.table_content.children), 1):
-            row.number_label.text = str(i)
-
     def update_total(self, *args) -> None:
-        total = sum(child.total_sum() for child in self.table_content.children)
-        self.total_sum_label.text = f'{total:.2f}'
+        # The running total, kept up to date line by line
+        self.total_sum_label.text = f'{self._lines.total:.2f}'
 
     def calculate_total(self) -> float:
-        try:
-            return float(self.total_sum_label.text)
-        except ValueError:
-            return 0.0
+        return float(self._lines.total)
 
     def update_date_time(self) -> None:
         current_time = datetime.now()
@@ -252,7 +281,7 @@ class InvoiceView(Screen, InvoiceActionsMixin):
         if current_time.second >= 30:
             rounded_time += timedelta(minutes=1)
         self.date_label.text = rounded_time.strftime("%Y-%m-%d")
-        print(f"Updated date: {self.date_label.text}")  # Debugging
+        logger.debug("Updated date: %s", self.date_label.text)
 
     def payment_status(self) -> None:
         if self.payment_status_value == 0: